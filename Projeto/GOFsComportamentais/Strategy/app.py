@@ -1,12 +1,41 @@
-from flask import Flask, render_template, request, redirect, url_for, flash
+from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, Response, session, make_response
+from markupsafe import Markup
 from abc import ABC, abstractmethod
-from typing import List, Optional, Dict, Callable
+from typing import List, Optional, Dict, Callable, Deque, Iterable, Iterator, Tuple, NamedTuple, Hashable, Any
+from collections import Counter, OrderedDict, deque
+from itertools import count
+from bisect import bisect_left, insort
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+import atexit
+import hashlib
+import inspect
+import json
+import os
+import queue
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+import weakref
 from datetime import datetime
+# `comum` fica em Projeto/: entra no sys.path para o exemplo rodar direto da pasta dele
+_PROJETO = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if _PROJETO not in sys.path:
+    sys.path.append(_PROJETO)
+from comum.busca_textual import IndiceInvertido
+from comum.medidas_midia import interpretar_duracao
+from comum.tipos_midia import resolver_tipo
+import indexacao_video
+import processamento_imagem
+import streaming_arquivos
+from werkzeug.exceptions import NotFound
 
 # ===== STRATEGY INTERFACE (Processamento) =====
 class ProcessamentoStrategy(ABC):
     @abstractmethod
-    def processar(self) -> List[str]: # Modificado para retornar logs
+    def processar(self, midia: Optional['MidiaDigital'] = None) -> List[str]: # Modificado para retornar logs
         pass
     @abstractmethod
     def obter_formato(self) -> str:
@@ -16,13 +45,85 @@ class ProcessamentoStrategy(ABC):
         pass
     def __str__(self) -> str: # Adicionado para melhor display na UI
         return self.__class__.__name__
+    def processar_etapa(self, midia: Optional['MidiaDigital'],
+                        contexto: 'ContextoProcessamento') -> List[str]:
+        """Executa como etapa de um pipeline. Estratégias que leem o arquivo da mídia
+        sobrescrevem este método para usar o que as etapas anteriores deixaram no contexto."""
+        return self.processar(midia)
+    def parametros(self) -> tuple:
+        """Identifica a configuração da estratégia (usado na chave do cache de resultados)."""
+        return (type(self).__name__,) + tuple(sorted(
+            (nome, valor) for nome, valor in vars(self).items() if not nome.startswith('_')))
+    def assinatura(self) -> str:
+        """Hash curto de parametros(), usado no nome dos arquivos que a estratégia grava."""
+        return hashlib.sha1(repr(self.parametros()).encode()).hexdigest()[:8]
+    def __setattr__(self, nome, valor):
+        # Instâncias compartilhadas pelo flyweight (obter_strategy) são imutáveis
+        if getattr(self, '_compartilhada', False):
+            raise AttributeError(f"{type(self).__name__} compartilhada não pode ser alterada")
+        super().__setattr__(nome, valor)
 
 # ===== CONCRETE STRATEGIES (Processamento) =====
+def arquivo_imagem_local(midia: Optional['MidiaDigital']) -> Optional[str]:
+    """Caminho real do arquivo se a mídia for uma imagem local (dentro de MIDIAS_RAIZ)
+    e o motor de imagem estiver disponível."""
+    if midia is not None and midia.tipo() == "Imagem" and processamento_imagem.disponivel():
+        return midia.arquivo_local
+    return None
+
+class ContextoProcessamento:
+    """Estado de um processamento, passado em memória de uma etapa para a próxima."""
+    def __init__(self, midia: Optional['MidiaDigital']):
+        self.midia = midia
+        caminho = arquivo_imagem_local(midia)
+        # Decodificada sob demanda pela primeira etapa que precisar dela
+        self.imagem = processamento_imagem.FonteImagem(caminho) if caminho else None
+        self.etapas_anteriores: Tuple['ProcessamentoStrategy', ...] = ()
+        # (largura, caminho) das versões responsivas gravadas pela última etapa que gerou alguma
+        self.variantes: List[Tuple[int, str]] = []
+        # Todos os arquivos gravados pelas etapas (um resultado em cache só vale enquanto existirem)
+        self.arquivos: List[str] = []
+
+    def assinatura(self, etapa: 'ProcessamentoStrategy') -> str:
+        """Assinatura dos arquivos da etapa; num pipeline inclui as etapas que mudaram a imagem antes."""
+        if not self.etapas_anteriores:
+            return etapa.assinatura()
+        return ProcessamentoPipeline(self.etapas_anteriores + (etapa,)).assinatura()
+
+def arquivo_video_local(midia: Optional['MidiaDigital']) -> Optional[str]:
+    """Caminho real do arquivo se a mídia for um vídeo local (dentro de MIDIAS_RAIZ)."""
+    if midia is not None and midia.tipo() == "Vídeo":
+        return midia.arquivo_local
+    return None
+
+def logs_variantes(variantes: List['processamento_imagem.EstatisticasVariante']) -> List[str]:
+    if not variantes:
+        return ["📱 Nenhuma versão responsiva menor que a original"]
+    return [f"📱 {v.tamanho[0]}x{v.tamanho[1]}: {v.bytes_saida} bytes em {v.segundos * 1000:.1f} ms -> {v.caminho_saida}"
+            for v in variantes]
+
 class ProcessamentoVideo(ProcessamentoStrategy):
     def __init__(self, codec: str, qualidade: int):
         self.codec = codec
         self.qualidade = qualidade
-    def processar(self) -> List[str]:
+    def processar(self, midia: Optional['MidiaDigital'] = None) -> List[str]:
+        return self.processar_etapa(midia, ContextoProcessamento(midia))
+    def processar_etapa(self, midia: Optional['MidiaDigital'],
+                        contexto: 'ContextoProcessamento') -> List[str]:
+        caminho = arquivo_video_local(midia)
+        if caminho:
+            # Arquivo local: monta o índice de segmentos (faixas de bytes) para o player
+            indice = indexacao_video.indexar(caminho, midia.duracao)
+            contexto.arquivos.append(indice.caminho_indice)
+            origem = "reaproveitado do disco" if indice.reaproveitado else f"em {indice.segundos * 1000:.1f} ms"
+            return [
+                f"🎬 Processando vídeo com codec {self.codec}",
+                f"📺 Aplicando qualidade: {self.qualidade}p",
+                f"🌐 Índice de streaming ({indice.container}): {len(indice.segmentos)} segmentos de "
+                f"{indice.segundos_por_segmento}s, {origem}",
+                f"💾 Índice gravado em: {indice.caminho_indice}",
+                "✅ Processamento de vídeo concluído!"
+            ]
         return [
             f"🎬 Processando vídeo com codec {self.codec}",
             f"📺 Aplicando qualidade: {self.qualidade}p",
@@ -41,7 +142,30 @@ class ProcessamentoImagem(ProcessamentoStrategy):
     def __init__(self, compressao: str, resolucao: str):
         self.compressao = compressao
         self.resolucao = resolucao
-    def processar(self) -> List[str]:
+    def processar(self, midia: Optional['MidiaDigital'] = None) -> List[str]:
+        return self.processar_etapa(midia, ContextoProcessamento(midia))
+    def processar_etapa(self, midia: Optional['MidiaDigital'],
+                        contexto: ContextoProcessamento) -> List[str]:
+        if contexto.imagem is not None:
+            # Arquivo local: processamento real (decodifica, redimensiona e grava o JPEG)
+            variantes: List[processamento_imagem.EstatisticasVariante] = []
+            stats = processamento_imagem.processar_fonte(contexto.imagem, self.resolucao, self.compressao,
+                                                         variantes, contexto.assinatura(self))
+            midia.placeholder = stats.placeholder
+            # A imagem principal também entra no srcset, como a maior versão
+            contexto.variantes = sorted([(v.tamanho[0], v.caminho_saida) for v in variantes]
+                                        + [(stats.tamanho_saida[0], stats.caminho_saida)])
+            contexto.arquivos.extend(caminho for _, caminho in contexto.variantes)
+            return [
+                f"🖼️  Processando imagem com compressão {self.compressao}",
+                f"📏 Resolução: {stats.tamanho_origem[0]}x{stats.tamanho_origem[1]} -> "
+                f"{stats.tamanho_saida[0]}x{stats.tamanho_saida[1]} (limite {self.resolucao})",
+                f"🗜️  {stats.bytes_entrada} bytes -> {stats.bytes_saida} bytes",
+                f"⏱️  {stats.segundos * 1000:.1f} ms",
+                f"💾 Gravado em: {stats.caminho_saida}",
+                *logs_variantes(variantes),
+                "✅ Processamento de imagem concluído!"
+            ]
         return [
             f"🖼️  Processando imagem com compressão {self.compressao}",
             f"📏 Ajustando resolução para: {self.resolucao}",
@@ -57,25 +181,62 @@ class ProcessamentoImagem(ProcessamentoStrategy):
         return f"Imagem Padrão ({self.compressao}, {self.resolucao})"
 
 class ProcessamentoWebOptimizado(ProcessamentoStrategy):
-    def __init__(self, formato_web: str = "WebP"):
+    def __init__(self, formato_web: str = "WebP", tamanho_alvo: Optional[int] = None):
         self.formato_web = formato_web
-    def processar(self) -> List[str]:
+        self.tamanho_alvo = tamanho_alvo # Orçamento em bytes da versão web (None = qualidade fixa)
+    def processar(self, midia: Optional['MidiaDigital'] = None) -> List[str]:
+        return self.processar_etapa(midia, ContextoProcessamento(midia))
+    def processar_etapa(self, midia: Optional['MidiaDigital'],
+                        contexto: ContextoProcessamento) -> List[str]:
+        if contexto.imagem is not None:
+            # Arquivo local: gera de verdade as resoluções responsivas no formato web
+            formato = self.formato_web.upper()
+            gerado = processamento_imagem.gerar_variantes_fonte(
+                contexto.imagem, formato, processamento_imagem.QUALIDADE_PADRAO, self.tamanho_alvo,
+                contexto.assinatura(self))
+            midia.placeholder = gerado.placeholder
+            contexto.variantes = [(v.tamanho[0], v.caminho_saida) for v in gerado.variantes]
+            logs_orcamento = []
+            if gerado.no_orcamento is not None:
+                stats, resultado = gerado.no_orcamento
+                contexto.variantes.append((stats.tamanho[0], stats.caminho_saida)) # A maior versão
+                logs_orcamento = [
+                    f"🎯 Orçamento: {self.tamanho_alvo} bytes -> {stats.bytes_saida} bytes "
+                    f"(qualidade {resultado.qualidade}, {resultado.iteracoes} codificações)",
+                    f"💾 {stats.tamanho[0]}x{stats.tamanho[1]} gravado em: {stats.caminho_saida}",
+                ]
+                if not resultado.atingiu:
+                    logs_orcamento.append("⚠️  Nem a qualidade mínima coube no orçamento")
+            contexto.arquivos.extend(caminho for _, caminho in contexto.variantes)
+            return [
+                f"🌐 Otimizando para web em formato {self.formato_web}...",
+                f"📥 Original: {gerado.bytes_entrada} bytes",
+                *logs_orcamento,
+                *logs_variantes(gerado.variantes),
+                f"🔄 Placeholder para lazy loading: {len(gerado.placeholder)} bytes",
+                "✅ Otimização web concluída!"
+            ]
         return [
             f"🌐 Otimizando para web em formato {self.formato_web}...",
-            "⚡ Reduzindo tamanho do arquivo...",
+            f"⚡ Reduzindo tamanho do arquivo (alvo: {self.tamanho_alvo} bytes)..." if self.tamanho_alvo
+            else "⚡ Reduzindo tamanho do arquivo...",
             "🔄 Aplicando lazy loading...",
             "📊 Gerando diferentes resoluções...",
             "✅ Otimização web concluída!"
         ]
     def obter_formato(self) -> str:
+        if self.tamanho_alvo:
+            return f"{self.formato_web} Otimizado para Web (≤ {self.tamanho_alvo // 1000} KB)"
         return f"{self.formato_web} Otimizado para Web"
     def validar(self) -> bool:
-        return self.formato_web is not None
+        return self.formato_web is not None and (self.tamanho_alvo is None or self.tamanho_alvo > 0)
     def __str__(self) -> str:
+        if self.tamanho_alvo:
+            return f"Otimização Web ({self.formato_web}, até {self.tamanho_alvo // 1000} KB)"
         return f"Otimização Web ({self.formato_web})"
 
 class ProcessamentoMobileOptimizado(ProcessamentoStrategy):
-    def processar(self) -> List[str]:
+    def processar(self, midia: Optional['MidiaDigital'] = None) -> List[str]:
         return [
             "📱 Otimizando para dispositivos móveis...",
             "🔋 Reduzindo consumo de bateria...",
@@ -89,8 +250,155 @@ class ProcessamentoMobileOptimizado(ProcessamentoStrategy):
     def __str__(self) -> str:
         return "Otimização Mobile"
 
+class ProcessamentoPipeline(ProcessamentoStrategy):
+    """Compõe várias estratégias num único processamento.
+
+    Todas as etapas são validadas antes de qualquer uma rodar, e o resultado
+    intermediário (ex.: a imagem já decodificada e redimensionada) passa de
+    uma etapa para a próxima em memória: a cadeia decodifica o arquivo uma vez.
+    """
+    def __init__(self, etapas: Tuple[ProcessamentoStrategy, ...]):
+        self.etapas = tuple(etapas)
+    def processar(self, midia: Optional['MidiaDigital'] = None) -> List[str]:
+        return self.processar_etapa(midia, ContextoProcessamento(midia))
+    def processar_etapa(self, midia: Optional['MidiaDigital'],
+                        contexto: ContextoProcessamento) -> List[str]:
+        invalidas = [str(etapa) for etapa in self.etapas if not etapa.validar()]
+        if invalidas:
+            raise ValueError(f"etapas inválidas no pipeline: {', '.join(invalidas)}")
+        logs = [f"🔗 Pipeline com {len(self.etapas)} etapas: {self}"]
+        for numero, etapa in enumerate(self.etapas, 1):
+            logs.append(f"▶️  Etapa {numero}/{len(self.etapas)}: {etapa}")
+            logs.extend(etapa.processar_etapa(midia, contexto))
+            contexto.etapas_anteriores += (etapa,)
+        logs.append("✅ Pipeline concluído!")
+        return logs
+    def obter_formato(self) -> str:
+        return self.etapas[-1].obter_formato() # O que sai é o formato da última etapa
+    def validar(self) -> bool:
+        return bool(self.etapas) and all(etapa.validar() for etapa in self.etapas)
+    def parametros(self) -> tuple:
+        return (type(self).__name__,) + tuple(etapa.parametros() for etapa in self.etapas)
+    def __str__(self) -> str:
+        return " → ".join(str(etapa) for etapa in self.etapas)
+
+# ===== FLYWEIGHT DE ESTRATÉGIAS =====
+_strategies_compartilhadas: Dict[tuple, ProcessamentoStrategy] = {}
+_strategies_lock = threading.Lock()
+
+def obter_strategy(classe: type, *parametros) -> ProcessamentoStrategy:
+    """Retorna a instância compartilhada (e imutável) de `classe` para esses parâmetros.
+
+    Estratégias não guardam estado de execução, então todas as mídias que usam
+    os mesmos parâmetros podem apontar para o mesmo objeto.
+    """
+    # Caminho rápido: os parâmetros exatamente como chegaram (sem inspect a cada chamada)
+    chave = (classe, parametros)
+    strategy = _strategies_compartilhadas.get(chave)
+    if strategy is None:
+        with _strategies_lock:
+            strategy = _strategies_compartilhadas.get(chave)
+            if strategy is None:
+                # Parâmetros omitidos entram com o valor padrão: ("WebP",) e ("WebP", None)
+                # são a mesma estratégia, guardada também sob a forma como foi pedida
+                assinatura = inspect.signature(classe).bind(*parametros)
+                assinatura.apply_defaults()
+                chave_completa = (classe, assinatura.args)
+                strategy = _strategies_compartilhadas.get(chave_completa)
+                if strategy is None:
+                    strategy = classe(*parametros)
+                    object.__setattr__(strategy, '_compartilhada', True)
+                    _strategies_compartilhadas[chave_completa] = strategy
+                _strategies_compartilhadas[chave] = strategy
+    return strategy
+
+
+# ===== CACHE DE RESULTADOS DE PROCESSAMENTO =====
+class ResultadoProcessamento(NamedTuple):
+    logs: Tuple[str, ...] # Saída de processar()
+    formato: str # Saída de obter_formato()
+    placeholder: Optional[str] = None # Miniatura gerada no processamento (só imagens locais)
+    variantes: Tuple[Tuple[int, str], ...] = () # (largura, caminho) das versões responsivas gravadas
+    arquivos: Tuple[str, ...] = () # Todos os arquivos gravados pelo processamento
+
+    def arquivos_existem(self) -> bool:
+        """False se algum arquivo gerado foi apagado do disco (o resultado precisa ser refeito)."""
+        return all(os.path.isfile(caminho) for caminho in self.arquivos)
+
+class CacheLRU:
+    """Cache LRU limitado, com contadores de hits/misses (seguro entre threads)."""
+    def __init__(self, capacidade: int):
+        self.capacidade = capacidade
+        self._itens: 'OrderedDict[Hashable, Any]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def obter(self, chave: Hashable, valido: Optional[Callable[[Any], bool]] = None) -> Optional[Any]:
+        """Item guardado na chave; com `valido`, um item que não passa é descartado (conta como miss)."""
+        with self._lock:
+            resultado = self._itens.get(chave)
+            if resultado is not None and valido is not None and not valido(resultado):
+                del self._itens[chave]
+                resultado = None
+            if resultado is None:
+                self.misses += 1
+                return None
+            self._itens.move_to_end(chave)
+            self.hits += 1
+            return resultado
+
+    def guardar(self, chave: Hashable, resultado: Any) -> None:
+        with self._lock:
+            self._itens[chave] = resultado
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.capacidade:
+                self._itens.popitem(last=False)
+
+    def limpar(self) -> None:
+        with self._lock:
+            self._itens.clear()
+            self.hits = self.misses = 0
+
+    def estatisticas(self) -> dict:
+        with self._lock:
+            return {'itens': len(self._itens), 'capacidade': self.capacidade,
+                    'hits': self.hits, 'misses': self.misses}
+
+# Resultados endereçados pela origem da mídia + parâmetros da estratégia
+CAPACIDADE_CACHE_PROCESSAMENTO = 10000
+cache_processamento = CacheLRU(CAPACIDADE_CACHE_PROCESSAMENTO)
+
+
 # ===== CONTEXT CLASS (MidiaDigital) =====
+# Versões globais e crescentes: (id, versao) nunca se repete, nem após o reset do demo.
+# Com o ArmazenamentoSQLite a fonte passa a ser o contador 'versao' do banco (ver
+# MidiaDigital.usar_versoes): cada mídia tira versões de um único contador.
+_versoes_midia = count(1)
+
+def apagar_arquivos(caminhos: Iterable[str]) -> None:
+    """Apaga do disco arquivos gerados que nenhuma mídia do armazenamento usa mais."""
+    for caminho in caminhos:
+        try:
+            os.remove(caminho)
+        except FileNotFoundError:
+            pass # Já apagado (ex.: por outro processo)
+
 class MidiaDigital(ABC):
+    # __weakref__: o mapa de identidade do ArmazenamentoSQLite guarda referências fracas
+    __slots__ = ("id", "formato_original", "formato_atual", "legenda", "data_criacao", "_strategy",
+                 "versao", "_proxima_versao", "logs_processamento", "placeholder", "variantes",
+                 "arquivos_gerados", "_geracao_logs", "_ouvintes_processamento", "__weakref__")
+
+    # Geração atual dos logs de processamento. Logs carimbados com uma geração
+    # anterior são considerados vencidos: não são exibidos e são descartados
+    # quando a mídia é lida de novo (em vez de limpar todas as mídias a cada GET).
+    geracao_logs_atual = 0
+
+    @classmethod
+    def invalidar_logs(cls) -> None:
+        cls.geracao_logs_atual += 1
+
     def __init__(self, id_midia: int, formato_original: str, legenda: str):
         self.id = id_midia
         self.formato_original = formato_original # Guardar o original
@@ -98,33 +406,112 @@ class MidiaDigital(ABC):
         self.legenda = legenda
         self.data_criacao = datetime.now()
         self._strategy: Optional[ProcessamentoStrategy] = None
+        self._proxima_versao: Callable[[], int] = _versoes_midia.__next__
+        self.versao = self._proxima_versao() # Muda a cada set_strategy/processamento (cache do card)
         self.logs_processamento: List[str] = []
+        self.placeholder: Optional[str] = None # data URI da miniatura, preenchido pelo processamento
+        # (largura, caminho) das versões responsivas gravadas pelo último processamento
+        self.variantes: Tuple[Tuple[int, str], ...] = ()
+        self.arquivos_gerados: Tuple[str, ...] = () # Tudo que o último processamento gravou
+        self._geracao_logs = MidiaDigital.geracao_logs_atual
+        # Callbacks chamados após cada processamento com o formato e os arquivos
+        # gerados anteriores (usados pelo armazenamento da Memoria para atualizar
+        # índices, persistir e apagar os arquivos que nenhuma mídia usa mais)
+        self._ouvintes_processamento: List['OuvinteProcessamento'] = []
+
+    def adicionar_ouvinte_processamento(self, ouvinte: 'OuvinteProcessamento') -> None:
+        self._ouvintes_processamento.append(ouvinte)
+
+    def usar_versoes(self, proxima_versao: Callable[[], int]) -> None:
+        """Troca a fonte das versões (o armazenamento que guarda a mídia passa a numerá-las)."""
+        self._proxima_versao = proxima_versao
 
     def set_strategy(self, strategy: ProcessamentoStrategy) -> None:
         self._strategy = strategy
+        self.versao = self._proxima_versao()
+
+    def identidade_origem(self) -> tuple:
+        """Identifica o conteúdo de origem: mesmo arquivo e formato -> mesmo resultado."""
+        url_arquivo = getattr(self, 'url_arquivo', None)
+        caminho = self.arquivo_local
+        if caminho:
+            # Arquivo local: se ele for alterado, o resultado guardado não vale mais.
+            # OSError se o arquivo sumiu depois de arquivo_local (tratado em executar_processamento)
+            info = os.stat(caminho)
+            # A duração entra na chave: o índice de segmentos de um vídeo depende dela
+            return (caminho, self.formato_original, info.st_size, info.st_mtime_ns,
+                    getattr(self, 'duracao', None))
+        return (url_arquivo, self.formato_original)
 
-    def executar_processamento(self) -> None:
+    def executar_processamento(self) -> bool:
+        """Processa com a estratégia atual. Retorna True se o processamento ocorreu."""
         self.logs_processamento = [] # Limpa logs anteriores desta mídia
+        self._geracao_logs = MidiaDigital.geracao_logs_atual
         if self._strategy and self._strategy.validar():
             self.logs_processamento.append(f"🚀 Iniciando processamento da mídia ID: {self.id} ('{self.legenda}')")
             self.logs_processamento.append(f"🎞️ Formato antes: {self.formato_atual}")
             self.logs_processamento.append(f"🛠️ Usando estratégia: {self._strategy}")
             self.logs_processamento.append("-" * 30)
             
-            msgs_strategy = self._strategy.processar()
-            self.logs_processamento.extend(msgs_strategy)
-            self.formato_atual = self._strategy.obter_formato()
+            try:
+                chave = self.identidade_origem() + self._strategy.parametros()
+                # Um resultado cujos arquivos gerados foram apagados do disco é refeito
+                resultado = cache_processamento.obter(chave, ResultadoProcessamento.arquivos_existem)
+                if resultado is None:
+                    # O contexto volta com os arquivos gravados sob a assinatura de cada etapa
+                    contexto = ContextoProcessamento(self)
+                    logs = self._strategy.processar_etapa(self, contexto)
+                    resultado = ResultadoProcessamento(tuple(logs), self._strategy.obter_formato(),
+                                                       self.placeholder, tuple(contexto.variantes),
+                                                       tuple(contexto.arquivos))
+                    cache_processamento.guardar(chave, resultado)
+                    reaproveitado = False
+                else:
+                    reaproveitado = True
+            except (OSError, ValueError) as e: # Arquivo apagado ou ilegível, resolução inválida...
+                self.logs_processamento.append(f"❌ Erro no processamento da mídia ID {self.id}: {e}")
+                return False
+            if reaproveitado:
+                self.logs_processamento.append("♻️ Resultado reaproveitado do cache")
+                if resultado.placeholder is not None:
+                    self.placeholder = resultado.placeholder
+            # Os arquivos anteriores só são apagados pelo armazenamento, que sabe se
+            # outra mídia (com a mesma origem e estratégia) ainda os usa
+            arquivos_anteriores = self.arquivos_gerados
+            self.variantes, self.arquivos_gerados = resultado.variantes, resultado.arquivos
+            self.logs_processamento.extend(resultado.logs)
+            formato_anterior = self.formato_atual
+            self.formato_atual = resultado.formato
+            self.versao = self._proxima_versao()
+            for ouvinte in self._ouvintes_processamento:
+                ouvinte(self, formato_anterior, arquivos_anteriores)
             
             self.logs_processamento.append("-" * 30)
             self.logs_processamento.append("✅ Processamento concluído!")
             self.logs_processamento.append(f"📄 Novo formato: {self.formato_atual}")
+            return True
         else:
             msg = f"❌ Estratégia inválida ou não definida para mídia ID: {self.id}"
             self.logs_processamento.append(msg)
+            return False
+
+    @property
+    def logs_visiveis(self) -> List[str]:
+        """Logs do último processamento, se ainda forem da geração atual."""
+        if self._geracao_logs != MidiaDigital.geracao_logs_atual:
+            if self.logs_processamento:
+                self.logs_processamento = [] # Recupera a memória de logs vencidos
+            return []
+        return self.logs_processamento
 
     @property
     def strategy(self) -> Optional[ProcessamentoStrategy]:
         return self._strategy
+
+    @property
+    def arquivo_local(self) -> Optional[str]:
+        """Caminho real da mídia se `url_arquivo` for um arquivo dentro de MIDIAS_RAIZ."""
+        return processamento_imagem.arquivo_local(getattr(self, 'url_arquivo', None))
     
     def __str__(self) -> str:
         return f"ID:{self.id} ({self.legenda}) - Formato: {self.formato_atual}"
@@ -135,45 +522,992 @@ class MidiaDigital(ABC):
 
 # ===== CONCRETE CONTEXTS (Midia) =====
 class Video(MidiaDigital):
+    __slots__ = ("url_arquivo", "duracao")
+
     def __init__(self, id_midia: int, formato: str, legenda: str, url_arquivo: str, duracao: int):
         super().__init__(id_midia, formato, legenda)
         self.url_arquivo = url_arquivo
         self.duracao = duracao
-        self.set_strategy(ProcessamentoVideo("H.264", 1080)) # Estratégia padrão
+        self.set_strategy(obter_strategy(ProcessamentoVideo, "H.264", 1080)) # Estratégia padrão
+
+    def reproduzir(self) -> Optional[str]:
+        """URL de reprodução (com suporte a Range) se o vídeo for um arquivo local."""
+        if self.arquivo_local is None:
+            return None
+        return url_for('media_file_route', media_id=self.id)
     
     def tipo(self) -> str: return "Vídeo"
 
 class Imagem(MidiaDigital):
+    __slots__ = ("url_arquivo", "resolucao_original")
+
     def __init__(self, id_midia: int, formato: str, legenda: str, url_arquivo: str, resolucao: str):
         super().__init__(id_midia, formato, legenda)
         self.url_arquivo = url_arquivo
         self.resolucao_original = resolucao # Guardar original
-        self.set_strategy(ProcessamentoImagem("Alta", "1920x1080")) # Estratégia padrão
+        self.set_strategy(obter_strategy(ProcessamentoImagem, "Alta", "1920x1080")) # Estratégia padrão
+
+    def variantes_web(self) -> List[Tuple[int, str]]:
+        """(largura, URL) das versões gravadas pelo último processamento, da menor para a maior."""
+        return [(largura, url_for('media_variant_route', media_id=self.id, nome=os.path.basename(arquivo)))
+                for largura, arquivo in self.variantes]
 
     def tipo(self) -> str: return "Imagem"
 
+# Valores de MidiaDigital.tipo() (nomes aceitos em ?tipo= e no lote passam por resolver_tipo)
+TIPOS_MIDIA = ("Vídeo", "Imagem")
 
-# ===== MEMORIA CLASS (Simplificada para o backend) =====
-class Memoria:
+# (mídia, formato anterior, arquivos gerados anteriores)
+OuvinteProcessamento = Callable[[MidiaDigital, str, Tuple[str, ...]], None]
+
+# ===== ARMAZENAMENTO DA MEMORIA (Backends plugáveis) =====
+# Faixa do INTEGER do SQLite: ids e cursores fora dela não existem em nenhum backend
+INTEIRO_MINIMO = -2**63
+INTEIRO_MAXIMO = 2**63 - 1
+
+class ArmazenamentoMidias(ABC):
+    """Interface dos backends de armazenamento usados pela Memoria.
+
+    O cursor de iter_midias() é opaco para quem chama: cada backend define
+    sua posição, mas sem filtros ela segue a ordem de cadastro.
+    """
+    @abstractmethod
+    def adicionar(self, midia: MidiaDigital) -> None:
+        pass
+    @abstractmethod
+    def obter(self, midia_id: int) -> Optional[MidiaDigital]:
+        pass
+    @abstractmethod
+    def posicao(self, midia_id: int) -> Optional[int]:
+        pass
+    @abstractmethod
+    def contar(self) -> int:
+        pass
+    @abstractmethod
+    def iter_midias(self, cursor: int = 0, tipo: Optional[str] = None,
+                    formato: Optional[str] = None) -> Iterator[Tuple[int, MidiaDigital]]:
+        pass
+    @abstractmethod
+    def versao(self) -> int:
+        """Número que muda a cada escrita na coleção (usado nos ETags)."""
+        pass
+    @abstractmethod
+    def geracao(self) -> int:
+        """Número que muda a cada limpar() (as posições de cadastro recomeçam do zero)."""
+        pass
+    @abstractmethod
+    def reservar_ids(self, quantidade: int) -> int:
+        """Reserva `quantidade` ids consecutivos de forma atômica e retorna o primeiro."""
+        pass
+    @abstractmethod
+    def limpar(self) -> None:
+        pass
+
+class ArmazenamentoMemoria(ArmazenamentoMidias):
+    """Backend padrão: listas e dicts no processo (não sobrevive a restart).
+
+    Conta quantas mídias guardadas usam cada arquivo gerado (mídias com a
+    mesma origem e estratégia compartilham os arquivos do cache): o arquivo
+    só é apagado do disco quando a última deixa de usá-lo.
+    """
+    TAMANHO_LOTE_FORMATO = 100 # Mídias copiadas do índice por formato a cada lock
     def __init__(self):
         self._midias: List[MidiaDigital] = []
+        # Índices: id -> mídia, e índices secundários por tipo() e formato_atual.
+        # tipo() nunca muda, então o índice por tipo é uma lista só de inserção
+        # (permite paginar por posição). O índice por formato guarda, ordenadas,
+        # as posições de cadastro das mídias de cada formato: o cursor é a posição
+        # de cadastro (como no SQLite), e não muda quando outra mídia é reprocessada.
+        self._por_id: Dict[int, MidiaDigital] = {}
+        self._posicao: Dict[int, int] = {}
+        self._por_tipo: Dict[str, List[MidiaDigital]] = {}
+        self._por_formato: Dict[str, List[int]] = {}
+        self._usos_arquivos: 'Counter[str]' = Counter()
+        # Protege os índices quando mídias são processadas pelos workers de jobs
+        self._lock = threading.Lock()
+        self._ultimo_id_reservado = 0
+        self._versao = 0
+        self._geracao = 0
+
+    def adicionar(self, midia: MidiaDigital) -> None:
+        with self._lock:
+            self._versao += 1
+            self._posicao[midia.id] = len(self._midias)
+            self._midias.append(midia)
+            self._por_id[midia.id] = midia
+            self._por_tipo.setdefault(midia.tipo(), []).append(midia)
+            # A posição nova é a maior de todas: a lista do formato continua ordenada
+            self._por_formato.setdefault(midia.formato_atual, []).append(self._posicao[midia.id])
+            self._usos_arquivos.update(midia.arquivos_gerados)
+        midia.adicionar_ouvinte_processamento(self._ao_processar)
+
+    def _ao_processar(self, midia: MidiaDigital, formato_anterior: str,
+                      arquivos_anteriores: Tuple[str, ...]) -> None:
+        """Atualiza a versão, os usos dos arquivos e o índice de formatos após um (re)processamento."""
+        if self._por_id.get(midia.id) is not midia:
+            return # Mídia de uma memória antiga (ex.: após reset do demo)
+        with self._lock:
+            self._versao += 1
+            self._usos_arquivos.update(midia.arquivos_gerados)
+            self._usos_arquivos.subtract(arquivos_anteriores)
+            vencidos = [caminho for caminho in arquivos_anteriores if self._usos_arquivos[caminho] <= 0]
+            for caminho in vencidos:
+                del self._usos_arquivos[caminho]
+            if midia.formato_atual != formato_anterior:
+                posicao = self._posicao[midia.id]
+                posicoes = self._por_formato.get(formato_anterior)
+                if posicoes is not None:
+                    indice = bisect_left(posicoes, posicao)
+                    if indice < len(posicoes) and posicoes[indice] == posicao:
+                        del posicoes[indice]
+                    if not posicoes:
+                        del self._por_formato[formato_anterior]
+                insort(self._por_formato.setdefault(midia.formato_atual, []), posicao)
+        apagar_arquivos(vencidos)
+
+    def obter(self, midia_id: int) -> Optional[MidiaDigital]:
+        return self._por_id.get(midia_id)
+
+    def posicao(self, midia_id: int) -> Optional[int]:
+        return self._posicao.get(midia_id)
+
+    def contar(self) -> int:
+        return len(self._midias)
+
+    def iter_midias(self, cursor: int = 0, tipo: Optional[str] = None,
+                    formato: Optional[str] = None) -> Iterator[Tuple[int, MidiaDigital]]:
+        # Com `tipo` a posição é relativa ao índice daquele tipo; só com
+        # `formato` é a posição de cadastro (busca binária no índice do formato).
+        if tipo is not None:
+            base = self._por_tipo.get(tipo, [])
+        elif formato is not None:
+            while True:
+                # Cópia de um lote sob o lock: os workers alteram o índice ao reprocessar
+                with self._lock:
+                    posicoes = self._por_formato.get(formato, [])
+                    inicio = bisect_left(posicoes, cursor)
+                    lote = [(posicao, self._midias[posicao])
+                            for posicao in posicoes[inicio:inicio + self.TAMANHO_LOTE_FORMATO]]
+                yield from lote
+                if len(lote) < self.TAMANHO_LOTE_FORMATO:
+                    return
+                cursor = lote[-1][0] + 1
+        else:
+            base = self._midias
+        for pos in range(cursor, len(base)):
+            midia = base[pos]
+            if formato is None or midia.formato_atual == formato:
+                yield pos, midia
+
+    def versao(self) -> int:
+        return self._versao
+
+    def geracao(self) -> int:
+        return self._geracao
+
+    def reservar_ids(self, quantidade: int) -> int:
+        with self._lock:
+            primeiro = self._ultimo_id_reservado + 1
+            self._ultimo_id_reservado += quantidade
+            return primeiro
+
+    def limpar(self) -> None:
+        with self._lock:
+            self._ultimo_id_reservado = 0 # Só este processo usa esses ids
+            self._versao += 1
+            self._geracao += 1
+            self._midias = []
+            self._por_id = {}
+            self._posicao = {}
+            self._por_tipo = {}
+            self._por_formato = {}
+            vencidos, self._usos_arquivos = list(self._usos_arquivos), Counter()
+        apagar_arquivos(vencidos) # Nenhuma mídia guardada usa mais os arquivos gerados
+
+class ArmazenamentoSQLite(ArmazenamentoMidias):
+    """Backend persistente em SQLite, compartilhável entre processos da mesma máquina.
+
+    - WAL: leitores não bloqueiam o escritor (e vice-versa) entre processos;
+    - uma conexão por thread (threading.local), criada sob demanda;
+    - o SQL fica em constantes, então o cache de statements do módulo sqlite3
+      reaproveita os statements já preparados em cada conexão.
+
+    Objetos carregados ficam num mapa de identidade fraco: enquanto alguém
+    segura a mídia (ex.: a requisição que acabou de processá-la), o mesmo
+    objeto é devolvido, com seus logs de processamento. A cada leitura ele é
+    atualizado com a linha do banco (formato, estratégia, placeholder,
+    arquivos gerados e versão), então o processamento feito por outro processo aparece aqui e
+    não é sobrescrito com dados antigos. A versão da mídia fica na linha e
+    vem do contador 'versao', a única fonte de versões das mídias deste
+    backend (inclusive set_strategy): é a mesma em todos os processos, nunca
+    se repete para conteúdos diferentes, e o cache de fragmentos do card
+    continua valendo para objetos recarregados.
+
+    Os arquivos gerados têm a contagem de usos na tabela arquivos_gerados,
+    alterada na mesma transação que grava a coluna `arquivos` de uma linha:
+    vale para todos os processos que usam o banco, e um arquivo só é apagado
+    do disco quando nenhuma linha o usa mais. Carregar uma linha não mexe
+    nessa contagem.
+    """
+    TAMANHO_LOTE_LEITURA = 100
+
+    SQL_CRIAR = (
+        """CREATE TABLE IF NOT EXISTS midias (
+            id INTEGER PRIMARY KEY,
+            posicao INTEGER NOT NULL UNIQUE,
+            tipo TEXT NOT NULL,
+            formato_original TEXT,
+            formato_atual TEXT,
+            legenda TEXT,
+            data_criacao TEXT,
+            url_arquivo TEXT,
+            duracao INTEGER,
+            resolucao TEXT,
+            strategy_classe TEXT,
+            strategy_parametros TEXT,
+            placeholder TEXT,
+            versao INTEGER,
+            variantes TEXT,
+            arquivos TEXT
+        )""",
+        "CREATE INDEX IF NOT EXISTS idx_midias_tipo ON midias (tipo, posicao)",
+        "CREATE INDEX IF NOT EXISTS idx_midias_formato ON midias (formato_atual, posicao)",
+        "CREATE TABLE IF NOT EXISTS contadores (nome TEXT PRIMARY KEY, valor INTEGER NOT NULL)",
+        # Bancos criados antes do contador continuam a partir do maior id salvo
+        "INSERT OR IGNORE INTO contadores (nome, valor) SELECT 'midias', COALESCE(MAX(id), 0) FROM midias",
+        "INSERT OR IGNORE INTO contadores (nome, valor) VALUES ('versao', 0)",
+        "INSERT OR IGNORE INTO contadores (nome, valor) VALUES ('limpezas', 0)",
+        # Quantidade de mídias, mantida a cada cadastro/limpeza (contar() não varre a tabela)
+        "INSERT OR IGNORE INTO contadores (nome, valor) SELECT 'total_midias', COUNT(*) FROM midias",
+    )
+    # Colunas acrescentadas depois da primeira versão da tabela (migradas com ALTER TABLE)
+    COLUNAS_NOVAS = {"placeholder": "TEXT", "versao": "INTEGER", "variantes": "TEXT", "arquivos": "TEXT"}
+    # Usos de cada arquivo gerado (criada e preenchida com os arquivos das linhas existentes)
+    SQL_TABELA_EXISTE = "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?"
+    SQL_CRIAR_USOS = "CREATE TABLE arquivos_gerados (caminho TEXT PRIMARY KEY, usos INTEGER NOT NULL)"
+    SQL_SEMEAR_USOS = (
+        "INSERT INTO arquivos_gerados (caminho, usos) SELECT caminho, COUNT(DISTINCT id) FROM ("
+        "SELECT midias.id AS id, arquivo.value AS caminho FROM midias, json_each(midias.arquivos) AS arquivo "
+        # Linhas gravadas antes da coluna `arquivos` só tinham as versões
+        "UNION ALL SELECT midias.id, json_extract(versao.value, '$[1]') "
+        "FROM midias, json_each(midias.variantes) AS versao WHERE midias.arquivos IS NULL"
+        ") GROUP BY caminho")
+    COLUNAS = ("id, posicao, tipo, formato_original, formato_atual, legenda, data_criacao, "
+               "url_arquivo, duracao, resolucao, strategy_classe, strategy_parametros, placeholder, versao, "
+               "variantes, arquivos")
+    SQL_INSERIR = ("INSERT INTO midias (id, posicao, tipo, formato_original, formato_atual, legenda, "
+                   "data_criacao, url_arquivo, duracao, resolucao, strategy_classe, strategy_parametros, "
+                   "placeholder, versao, variantes, arquivos) "
+                   "VALUES (?, (SELECT COALESCE(MAX(posicao), -1) + 1 FROM midias), ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)")
+    SQL_ATUALIZAR = ("UPDATE midias SET formato_atual = ?, strategy_classe = ?, strategy_parametros = ?, "
+                     "placeholder = ?, versao = ?, variantes = ?, arquivos = ? WHERE id = ?")
+    SQL_COLUNAS_EXISTENTES = "PRAGMA table_info(midias)"
+    SQL_OBTER = f"SELECT {COLUNAS} FROM midias WHERE id = ?"
+    SQL_ARQUIVOS = "SELECT variantes, arquivos FROM midias WHERE id = ?"
+    SQL_USAR_ARQUIVO = ("INSERT INTO arquivos_gerados (caminho, usos) VALUES (?, 1) "
+                        "ON CONFLICT (caminho) DO UPDATE SET usos = usos + 1")
+    SQL_LIBERAR_ARQUIVO = "UPDATE arquivos_gerados SET usos = usos - 1 WHERE caminho = ?"
+    SQL_DESCARTAR_ARQUIVO = "DELETE FROM arquivos_gerados WHERE caminho = ? AND usos <= 0"
+    SQL_ARQUIVOS_USADOS = "SELECT caminho FROM arquivos_gerados"
+    SQL_LIMPAR_USOS = "DELETE FROM arquivos_gerados"
+    SQL_POSICAO = "SELECT posicao FROM midias WHERE id = ?"
+    SQL_CONTAR = "SELECT valor FROM contadores WHERE nome = 'total_midias'"
+    SQL_INCREMENTAR_TOTAL = "UPDATE contadores SET valor = valor + 1 WHERE nome = 'total_midias'"
+    SQL_ZERAR_TOTAL = "UPDATE contadores SET valor = 0 WHERE nome = 'total_midias'"
+    SQL_RESERVAR_IDS = "UPDATE contadores SET valor = valor + ? WHERE nome = 'midias'"
+    SQL_ULTIMO_ID = "SELECT valor FROM contadores WHERE nome = 'midias'"
+    SQL_INCREMENTAR_VERSAO = "UPDATE contadores SET valor = valor + 1 WHERE nome = 'versao'"
+    SQL_VERSAO = "SELECT valor FROM contadores WHERE nome = 'versao'"
+    SQL_INCREMENTAR_LIMPEZAS = "UPDATE contadores SET valor = valor + 1 WHERE nome = 'limpezas'"
+    SQL_LIMPEZAS = "SELECT valor FROM contadores WHERE nome = 'limpezas'"
+    SQL_LIMPAR = "DELETE FROM midias"
+    SQL_LISTAR = f"SELECT {COLUNAS} FROM midias WHERE posicao >= ? ORDER BY posicao LIMIT ?"
+    SQL_LISTAR_TIPO = f"SELECT {COLUNAS} FROM midias WHERE tipo = ? AND posicao >= ? ORDER BY posicao LIMIT ?"
+    SQL_LISTAR_FORMATO = (f"SELECT {COLUNAS} FROM midias WHERE formato_atual = ? AND posicao >= ? "
+                          "ORDER BY posicao LIMIT ?")
+    SQL_LISTAR_TIPO_FORMATO = (f"SELECT {COLUNAS} FROM midias WHERE tipo = ? AND formato_atual = ? "
+                               "AND posicao >= ? ORDER BY posicao LIMIT ?")
+
+    def __init__(self, caminho: str):
+        self.caminho = caminho
+        self._local = threading.local()
+        self._conexoes: List[sqlite3.Connection] = []
+        self._conexoes_lock = threading.Lock()
+        self._vivas: 'weakref.WeakValueDictionary[int, MidiaDigital]' = weakref.WeakValueDictionary()
+        with self._conexao() as con:
+            for sql in self.SQL_CRIAR:
+                con.execute(sql)
+            existentes = {coluna[1] for coluna in con.execute(self.SQL_COLUNAS_EXISTENTES)}
+            for nome, tipo in self.COLUNAS_NOVAS.items():
+                if nome not in existentes:
+                    con.execute(f"ALTER TABLE midias ADD COLUMN {nome} {tipo}")
+        # Sob o lock de escrita: só um processo cria e preenche a contagem de usos
+        with self._transacao_imediata() as con:
+            if not con.execute(self.SQL_TABELA_EXISTE, ("arquivos_gerados",)).fetchone():
+                con.execute(self.SQL_CRIAR_USOS)
+                con.execute(self.SQL_SEMEAR_USOS)
+
+    def _conexao(self) -> sqlite3.Connection:
+        con = getattr(self._local, 'conexao', None)
+        if con is None:
+            con = sqlite3.connect(self.caminho, timeout=30, cached_statements=256)
+            con.execute("PRAGMA journal_mode=WAL")
+            con.execute("PRAGMA synchronous=NORMAL")
+            self._local.conexao = con
+            with self._conexoes_lock:
+                self._conexoes.append(con)
+        return con
+
+    @contextmanager
+    def _transacao_imediata(self) -> Iterator[sqlite3.Connection]:
+        """Transação que já começa com o lock de escrita do banco (BEGIN IMMEDIATE):
+        o que é lido e escrito dentro dela forma um passo atômico mesmo entre processos."""
+        con = self._conexao()
+        con.execute("BEGIN IMMEDIATE")
+        try:
+            yield con
+            con.commit()
+        except BaseException:
+            con.rollback()
+            raise
+
+    def fechar(self) -> None:
+        with self._conexoes_lock:
+            for con in self._conexoes:
+                try:
+                    con.close()
+                except sqlite3.ProgrammingError:
+                    pass # Conexão de outra thread; o processo está encerrando
+            self._conexoes = []
+        self._local = threading.local()
+
+    @staticmethod
+    def _dados_strategy(midia: MidiaDigital) -> Tuple[Optional[str], Optional[str]]:
+        strategy = midia.strategy
+        if strategy is None:
+            return None, None
+        return type(strategy).__name__, json.dumps(parametros_strategy(strategy), ensure_ascii=False)
+
+    def _nova_versao(self, con: sqlite3.Connection) -> int:
+        """Incrementa o contador 'versao' (dentro da transação de `con`) e retorna o valor novo."""
+        con.execute(self.SQL_INCREMENTAR_VERSAO)
+        return con.execute(self.SQL_VERSAO).fetchone()[0]
+
+    @staticmethod
+    def _arquivos_da_linha(variantes: Optional[str], arquivos: Optional[str]) -> Tuple[str, ...]:
+        if arquivos:
+            return tuple(json.loads(arquivos))
+        # Linhas gravadas antes da coluna `arquivos` só tinham as versões
+        return tuple(caminho for _, caminho in json.loads(variantes or "[]"))
+
+    def _trocar_usos(self, con: sqlite3.Connection, antigos: Iterable[str], novos: Iterable[str]) -> List[str]:
+        """Troca os usos de uma linha (dentro da transação de `con`); retorna os arquivos sem uso."""
+        novos, antigos = dict.fromkeys(novos), dict.fromkeys(antigos)
+        con.executemany(self.SQL_USAR_ARQUIVO, ((caminho,) for caminho in novos if caminho not in antigos))
+        vencidos = []
+        for caminho in antigos:
+            if caminho in novos:
+                continue
+            con.execute(self.SQL_LIBERAR_ARQUIVO, (caminho,))
+            if con.execute(self.SQL_DESCARTAR_ARQUIVO, (caminho,)).rowcount:
+                vencidos.append(caminho)
+        return vencidos
+
+    def _proxima_versao(self) -> int:
+        """Versão nova numa transação própria (fonte das versões das mídias deste backend)."""
+        with self._conexao() as con:
+            return self._nova_versao(con)
+
+    def adicionar(self, midia: MidiaDigital) -> None:
+        classe, parametros = self._dados_strategy(midia)
+        with self._conexao() as con:
+            versao = self._nova_versao(con)
+            con.execute(self.SQL_INSERIR, (
+                midia.id, midia.tipo(), midia.formato_original, midia.formato_atual, midia.legenda,
+                midia.data_criacao.isoformat(), getattr(midia, 'url_arquivo', None),
+                getattr(midia, 'duracao', None), getattr(midia, 'resolucao_original', None),
+                classe, parametros, midia.placeholder, versao, json.dumps(midia.variantes),
+                json.dumps(midia.arquivos_gerados)))
+            self._trocar_usos(con, (), midia.arquivos_gerados)
+            con.execute(self.SQL_INCREMENTAR_TOTAL)
+        midia.versao = versao
+        midia.usar_versoes(self._proxima_versao)
+        self._vivas[midia.id] = midia
+        midia.adicionar_ouvinte_processamento(self._salvar_processamento)
+
+    def _salvar_processamento(self, midia: MidiaDigital, formato_anterior: str,
+                              arquivos_anteriores: Tuple[str, ...]) -> None:
+        # Os arquivos que deixam de ser usados são os que a linha tinha (outro
+        # processo pode tê-la regravado), não os que o objeto lembra
+        classe, parametros = self._dados_strategy(midia)
+        with self._transacao_imediata() as con:
+            linha = con.execute(self.SQL_ARQUIVOS, (midia.id,)).fetchone()
+            if linha is None:
+                return # Removida por limpar() (talvez em outro processo)
+            versao = self._nova_versao(con)
+            con.execute(self.SQL_ATUALIZAR, (midia.formato_atual, classe, parametros, midia.placeholder,
+                                             versao, json.dumps(midia.variantes),
+                                             json.dumps(midia.arquivos_gerados), midia.id))
+            vencidos = self._trocar_usos(con, self._arquivos_da_linha(*linha), midia.arquivos_gerados)
+        midia.versao = versao
+        apagar_arquivos(vencidos)
+
+    def _atualizar_da_linha(self, midia: MidiaDigital, formato_atual: str, strategy_classe: Optional[str],
+                            strategy_parametros: Optional[str], placeholder: Optional[str],
+                            versao: int, variantes: Tuple[Tuple[int, str], ...],
+                            arquivos: Tuple[str, ...]) -> None:
+        """Traz o objeto vivo para o estado da linha, se outro processo a alterou."""
+        if midia.versao == versao:
+            return
+        trava = lock_midia(midia.id)
+        if not trava.acquire(blocking=False):
+            return # Sendo processada neste processo: o objeto é o mais novo e será salvo
+        try:
+            strategy = None
+            if strategy_classe:
+                strategy = recriar_strategy(strategy_classe, json.loads(strategy_parametros or "{}"))
+            midia._strategy = strategy if strategy is not None else midia.strategy
+            midia.formato_atual = formato_atual
+            midia.placeholder = placeholder
+            midia.variantes, midia.arquivos_gerados = variantes, arquivos
+            midia.versao = versao
+            midia.logs_processamento = [] # Eram de um estado que não é mais o atual
+        finally:
+            trava.release()
+
+    def _montar(self, linha: tuple) -> MidiaDigital:
+        (id_midia, _posicao, tipo, formato_original, formato_atual, legenda, data_criacao,
+         url_arquivo, duracao, resolucao, strategy_classe, strategy_parametros, placeholder, versao,
+         variantes, arquivos) = linha
+        versao = versao or 0 # Linhas gravadas antes da coluna existir
+        arquivos = self._arquivos_da_linha(variantes, arquivos)
+        variantes = tuple((largura, caminho) for largura, caminho in json.loads(variantes or "[]"))
+        viva = self._vivas.get(id_midia)
+        if viva is not None:
+            self._atualizar_da_linha(viva, formato_atual, strategy_classe, strategy_parametros,
+                                     placeholder, versao, variantes, arquivos)
+            return viva
+        if tipo == "Vídeo":
+            midia: MidiaDigital = Video(id_midia, formato_original, legenda, url_arquivo, duracao)
+        else:
+            midia = Imagem(id_midia, formato_original, legenda, url_arquivo, resolucao)
+        midia.formato_atual = formato_atual
+        midia.data_criacao = datetime.fromisoformat(data_criacao)
+        midia.placeholder = placeholder
+        midia.variantes, midia.arquivos_gerados = variantes, arquivos
+        if strategy_classe:
+            strategy = recriar_strategy(strategy_classe, json.loads(strategy_parametros or "{}"))
+            if strategy is not None:
+                midia.set_strategy(strategy)
+        midia.versao = versao
+        midia.usar_versoes(self._proxima_versao)
+        midia.adicionar_ouvinte_processamento(self._salvar_processamento)
+        self._vivas[id_midia] = midia
+        return midia
+
+    def obter(self, midia_id: int) -> Optional[MidiaDigital]:
+        if not INTEIRO_MINIMO <= midia_id <= INTEIRO_MAXIMO:
+            return None # O sqlite3 recusaria o parâmetro (OverflowError)
+        linha = self._conexao().execute(self.SQL_OBTER, (midia_id,)).fetchone()
+        return self._montar(linha) if linha else None
+
+    def posicao(self, midia_id: int) -> Optional[int]:
+        if not INTEIRO_MINIMO <= midia_id <= INTEIRO_MAXIMO:
+            return None
+        linha = self._conexao().execute(self.SQL_POSICAO, (midia_id,)).fetchone()
+        return linha[0] if linha else None
+
+    def contar(self) -> int:
+        return self._conexao().execute(self.SQL_CONTAR).fetchone()[0]
+
+    def iter_midias(self, cursor: int = 0, tipo: Optional[str] = None,
+                    formato: Optional[str] = None) -> Iterator[Tuple[int, MidiaDigital]]:
+        # Paginação por keyset (posicao >= cursor), lida em lotes de tamanho fixo
+        while True:
+            if tipo is not None and formato is not None:
+                sql, args = self.SQL_LISTAR_TIPO_FORMATO, (tipo, formato)
+            elif tipo is not None:
+                sql, args = self.SQL_LISTAR_TIPO, (tipo,)
+            elif formato is not None:
+                sql, args = self.SQL_LISTAR_FORMATO, (formato,)
+            else:
+                sql, args = self.SQL_LISTAR, ()
+            linhas = self._conexao().execute(sql, args + (cursor, self.TAMANHO_LOTE_LEITURA)).fetchall()
+            for linha in linhas:
+                yield linha[1], self._montar(linha)
+            if len(linhas) < self.TAMANHO_LOTE_LEITURA:
+                return
+            cursor = linhas[-1][1] + 1
+
+    def versao(self) -> int:
+        # Lida do banco: escritas de outros processos também mudam a versão
+        return self._conexao().execute(self.SQL_VERSAO).fetchone()[0]
+
+    def geracao(self) -> int:
+        return self._conexao().execute(self.SQL_LIMPEZAS).fetchone()[0]
+
+    def reservar_ids(self, quantidade: int) -> int:
+        # BEGIN IMMEDIATE pega o lock de escrita do banco: UPDATE + SELECT
+        # formam uma reserva atômica mesmo entre processos
+        with self._transacao_imediata() as con:
+            con.execute(self.SQL_RESERVAR_IDS, (quantidade,))
+            ultimo = con.execute(self.SQL_ULTIMO_ID).fetchone()[0]
+        return ultimo - quantidade + 1
+
+    def limpar(self) -> None:
+        # O contador de ids não volta a zero: outros processos podem ainda
+        # estar usando blocos já reservados. Sem linhas, nenhum arquivo gerado é usado
+        with self._transacao_imediata() as con:
+            vencidos = [caminho for caminho, in con.execute(self.SQL_ARQUIVOS_USADOS)]
+            con.execute(self.SQL_LIMPAR_USOS)
+            con.execute(self.SQL_LIMPAR)
+            con.execute(self.SQL_ZERAR_TOTAL)
+            con.execute(self.SQL_INCREMENTAR_VERSAO)
+            con.execute(self.SQL_INCREMENTAR_LIMPEZAS)
+        self._vivas = weakref.WeakValueDictionary()
+        apagar_arquivos(vencidos)
+
+def classes_strategy() -> Dict[str, type]:
+    """Classes concretas de ProcessamentoStrategy por nome (para recriar estratégias salvas)."""
+    classes: Dict[str, type] = {}
+    pendentes = [ProcessamentoStrategy]
+    while pendentes:
+        classe = pendentes.pop()
+        for subclasse in classe.__subclasses__():
+            classes[subclasse.__name__] = subclasse
+            pendentes.append(subclasse)
+    return classes
+
+def _valor_para_json(valor: Any) -> Any:
+    if isinstance(valor, ProcessamentoStrategy): # Etapas de um pipeline
+        return {"classe": type(valor).__name__, "parametros": parametros_strategy(valor)}
+    if isinstance(valor, (tuple, list)):
+        return [_valor_para_json(item) for item in valor]
+    return valor
+
+def _valor_de_json(valor: Any) -> Any:
+    if isinstance(valor, dict) and "classe" in valor:
+        return recriar_strategy(valor["classe"], valor.get("parametros", {}))
+    if isinstance(valor, list):
+        return tuple(_valor_de_json(item) for item in valor)
+    return valor
+
+def parametros_strategy(strategy: ProcessamentoStrategy) -> Dict[str, Any]:
+    """Parâmetros públicos da estratégia em forma serializável em JSON."""
+    return {nome: _valor_para_json(valor) for nome, valor in vars(strategy).items() if not nome.startswith('_')}
+
+def recriar_strategy(nome_classe: str, parametros: Dict[str, Any]) -> Optional[ProcessamentoStrategy]:
+    """Inverso de parametros_strategy: devolve a instância compartilhada (flyweight)."""
+    classe = classes_strategy().get(nome_classe)
+    if classe is None:
+        return None
+    # Dados gravados antes de um parâmetro novo existir usam o valor padrão dele
+    return obter_strategy(classe, *(
+        _valor_de_json(parametros[nome]) if nome in parametros else parametro.default
+        for nome, parametro in inspect.signature(classe).parameters.items()))
+
+def criar_armazenamento() -> ArmazenamentoMidias:
+    """SQLite se MIDIAS_DB apontar para um arquivo; senão, memória do processo."""
+    caminho = os.environ.get('MIDIAS_DB')
+    if not caminho:
+        return ArmazenamentoMemoria()
+    armazenamento = ArmazenamentoSQLite(caminho)
+    atexit.register(armazenamento.fechar) # Fecha as conexões (e faz o checkpoint do WAL) ao sair
+    return armazenamento
+
+
+# ===== ALOCADOR DE IDS =====
+class AlocadorIds:
+    """Distribui ids a partir de blocos reservados num contador compartilhado.
+
+    Só a troca de bloco passa pelo lock (e pelo contador do armazenamento);
+    dentro de um bloco, next() no itertools.count já é atômico no CPython.
+    """
+    def __init__(self, reservar: Callable[[int], int], tamanho_bloco: int):
+        self._reservar = reservar
+        self.tamanho_bloco = tamanho_bloco
+        self._lock = threading.Lock()
+        self._bloco: Optional[Tuple[Iterator[int], int]] = None # (contador, fim exclusivo)
+
+    def proximo(self) -> int:
+        while True:
+            bloco = self._bloco
+            if bloco is not None:
+                novo_id = next(bloco[0])
+                if novo_id < bloco[1]:
+                    return novo_id
+            with self._lock:
+                if self._bloco is bloco: # Outra thread pode já ter trocado o bloco
+                    inicio = self._reservar(self.tamanho_bloco)
+                    self._bloco = (count(inicio), inicio + self.tamanho_bloco)
+
+    def descartar_bloco(self) -> None:
+        """Abandona o bloco atual (ex.: após limpar o armazenamento)."""
+        with self._lock:
+            self._bloco = None
+
+
+# ===== MEMORIA CLASS (Simplificada para o backend) =====
+class Memoria:
+    def __init__(self, armazenamento: Optional[ArmazenamentoMidias] = None):
+        self._armazenamento = armazenamento if armazenamento is not None else ArmazenamentoMemoria()
+        # Busca textual: o índice guarda a versão/geração do armazenamento que
+        # já refletiu e a próxima posição de cadastro ainda não indexada
+        self._indice_texto = IndiceInvertido()
+        self._indice_versao: Optional[int] = None
+        self._indice_geracao: Optional[int] = None
+        self._indice_proxima_posicao = 0
+        self._indice_lock = threading.Lock()
     
     def adicionar_midia(self, midia: MidiaDigital) -> None:
-        self._midias.append(midia)
+        self._armazenamento.adicionar(midia)
+
+    def _indexar_texto(self, midia: MidiaDigital) -> None:
+        self._indice_texto.adicionar(midia.id, legenda=midia.legenda,
+                                     texto_alternativo=getattr(midia, 'texto_alternativo', None))
+
+    def buscar_texto(self, consulta: str, k: int = 10) -> List[Tuple[MidiaDigital, float]]:
+        """As k mídias mais relevantes para a consulta (índice invertido), com a pontuação."""
+        with self._indice_lock:
+            self._sincronizar_indice()
+            resultados = self._indice_texto.buscar(consulta, k)
+        encontrados = [(self.get_midia_by_id(midia_id), pontuacao) for midia_id, pontuacao in resultados]
+        return [(midia, pontuacao) for midia, pontuacao in encontrados if midia is not None]
     
+    def _sincronizar_indice(self) -> None:
+        """Traz o índice textual até a versão atual do armazenamento (chamar sob _indice_lock).
+
+        Legenda e texto alternativo não mudam depois do cadastro e mídias só
+        saem da coleção com limpar(): versão igual = nada a fazer; geração
+        igual = basta indexar o que foi cadastrado depois da última posição
+        vista (inclusive por outros processos no mesmo SQLite); geração
+        diferente = as posições recomeçaram e o índice é remontado.
+        """
+        versao = self._armazenamento.versao()
+        if versao == self._indice_versao:
+            return
+        geracao = self._armazenamento.geracao()
+        if geracao != self._indice_geracao:
+            self._indice_texto.limpar()
+            self._indice_proxima_posicao = 0
+            self._indice_geracao = geracao
+        for posicao, midia in self._armazenamento.iter_midias(self._indice_proxima_posicao):
+            self._indexar_texto(midia)
+            self._indice_proxima_posicao = posicao + 1
+        # Escritas depois da leitura da versão mudam a versão de novo: a próxima busca as pega
+        self._indice_versao = versao
+
     def get_midia_by_id(self, midia_id: int) -> Optional[MidiaDigital]:
-        for midia in self._midias:
-            if midia.id == midia_id:
-                return midia
-        return None
+        return self._armazenamento.obter(midia_id)
+
+    def midias_por_tipo(self, tipo: str) -> List[MidiaDigital]:
+        return [midia for _, midia in self._armazenamento.iter_midias(tipo=tipo)]
+
+    def midias_por_formato(self, formato: str) -> List[MidiaDigital]:
+        return [midia for _, midia in self._armazenamento.iter_midias(formato=formato)]
+
+    def posicao(self, midia_id: int) -> Optional[int]:
+        """Posição da mídia na ordem de cadastro (usada como cursor de paginação)."""
+        return self._armazenamento.posicao(midia_id)
+
+    def __len__(self) -> int:
+        return self._armazenamento.contar()
+
+    def reservar_ids(self, quantidade: int) -> int:
+        return self._armazenamento.reservar_ids(quantidade)
+
+    def versao(self) -> int:
+        return self._armazenamento.versao()
+
+    def limpar(self) -> None:
+        self._armazenamento.limpar()
+        with self._indice_lock:
+            self._indice_texto.limpar()
+            self._indice_versao = self._indice_geracao = None
+            self._indice_proxima_posicao = 0
+
+    def iter_midias(self, cursor: int = 0, tipo: Optional[str] = None,
+                    formato: Optional[str] = None) -> Iterator[Tuple[int, MidiaDigital]]:
+        """Itera (posição, mídia) a partir do cursor, sem copiar a coleção."""
+        return self._armazenamento.iter_midias(cursor, tipo, formato)
+
+    def pagina(self, cursor: int = 0, tamanho: int = 20, tipo: Optional[str] = None,
+               formato: Optional[str] = None) -> Tuple[List[MidiaDigital], Optional[int]]:
+        """Retorna até `tamanho` mídias a partir do cursor e o cursor da próxima página."""
+        itens: List[MidiaDigital] = []
+        proximo_cursor: Optional[int] = None
+        for pos, midia in self.iter_midias(cursor, tipo, formato):
+            if len(itens) == tamanho:
+                proximo_cursor = pos
+                break
+            itens.append(midia)
+        return itens, proximo_cursor
 
     @property
     def midias(self) -> List[MidiaDigital]:
-        return self._midias.copy()
+        return [midia for _, midia in self.iter_midias()]
+
+
+
+# ===== LOGS DA APLICAÇÃO (Ring buffer) =====
+class EventoLog(NamedTuple):
+    seq: int
+    timestamp: datetime
+    mensagem: str
+    midia_id: Optional[int] = None
+    estrategia: Optional[str] = None
+    resultado: Optional[str] = None # 'sucesso', 'falha', 'info'...
 
-    def clear_all_media_logs(self):
-        for midia in self._midias:
-            midia.logs_processamento = []
+    def __str__(self) -> str: # Formato exibido na UI
+        return f"[{self.timestamp.strftime('%H:%M:%S')}] {self.mensagem}"
+
+    def to_dict(self) -> dict:
+        dados = self._asdict()
+        dados['timestamp'] = self.timestamp.isoformat()
+        return dados
+
+class RegistroLogs:
+    """Buffer circular de capacidade fixa para os eventos da aplicação.
+
+    Cada evento recebe um número de sequência crescente e ocupa o slot
+    seq % capacidade, sobrescrevendo o mais antigo. A escrita pega um lock
+    curto (numera, grava o slot e publica o último seq juntos), então o
+    último seq só avança e todo seq publicado já está no buffer. A leitura
+    não usa lock: lê o último seq uma vez e confere o seq de cada slot para
+    descartar eventos que já foram sobrescritos.
+    """
+    def __init__(self, capacidade: int):
+        if capacidade <= 0:
+            raise ValueError("capacidade deve ser positiva")
+        self.capacidade = capacidade
+        self._buffer: List[Optional[EventoLog]] = [None] * capacidade
+        self._contador = count()
+        self._ultimo_seq = -1
+        self._inicio = 0 # Eventos com seq menor foram descartados por limpar()
+        self._lock = threading.Lock()
+
+    def adicionar(self, mensagem: str, midia_id: Optional[int] = None,
+                  estrategia: Optional[str] = None, resultado: Optional[str] = None) -> EventoLog:
+        with self._lock:
+            seq = next(self._contador)
+            evento = EventoLog(seq, datetime.now(), mensagem, midia_id, estrategia, resultado)
+            self._buffer[seq % self.capacidade] = evento
+            self._ultimo_seq = seq
+        return evento
+
+    def limpar(self) -> None:
+        """Descarta os eventos atuais mantendo a sequência (clientes de /logs continuam válidos)."""
+        with self._lock:
+            self._inicio = self._ultimo_seq + 1
+
+    @property
+    def proximo_seq(self) -> int:
+        return self._ultimo_seq + 1
+
+    def _evento(self, seq: int) -> Optional[EventoLog]:
+        evento = self._buffer[seq % self.capacidade]
+        return evento if evento is not None and evento.seq == seq else None
+
+    def intervalo(self, desde: int = 0, limite: Optional[int] = None) -> List[EventoLog]:
+        """Eventos com seq >= desde, do mais antigo para o mais novo."""
+        ultimo = self._ultimo_seq
+        inicio = max(desde, self._inicio, ultimo + 1 - self.capacidade)
+        fim = ultimo + 1 if limite is None else min(ultimo + 1, inicio + limite)
+        eventos = []
+        for seq in range(inicio, fim):
+            evento = self._evento(seq)
+            if evento is not None:
+                eventos.append(evento)
+        return eventos
+
+    def ultimos(self, n: int) -> List[EventoLog]:
+        """Os n eventos mais recentes, do mais novo para o mais antigo."""
+        ultimo = self._ultimo_seq
+        limite_inferior = max(self._inicio, ultimo + 1 - self.capacidade, ultimo + 1 - n)
+        eventos = []
+        for seq in range(ultimo, limite_inferior - 1, -1):
+            evento = self._evento(seq)
+            if evento is not None:
+                eventos.append(evento)
+        return eventos
+
+    def __len__(self) -> int:
+        return max(0, self._ultimo_seq + 1 - max(self._inicio, self._ultimo_seq + 1 - self.capacidade))
+
+
+# ===== JOBS ASSÍNCRONOS DE PROCESSAMENTO =====
+# Lock striping: número fixo de locks, escolhido pelo id da mídia. A memória não
+# cresce com a coleção; duas mídias no mesmo lock só esperam uma pela outra.
+NUM_LOCKS_MIDIA = 256
+_locks_midia: Tuple[threading.Lock, ...] = tuple(threading.Lock() for _ in range(NUM_LOCKS_MIDIA))
+
+def lock_midia(midia_id: int) -> threading.Lock:
+    return _locks_midia[hash(midia_id) % NUM_LOCKS_MIDIA]
+
+def processar_com_lock(midia: MidiaDigital, strategy: Optional[ProcessamentoStrategy]) -> bool:
+    """set_strategy + executar_processamento de forma atômica por mídia (rota, jobs e lotes)."""
+    with lock_midia(midia.id):
+        if strategy is not None:
+            midia.set_strategy(strategy)
+        return midia.executar_processamento()
+
+class Job:
+    PENDENTE = 'pendente'
+    EXECUTANDO = 'executando'
+    CONCLUIDO = 'concluido'
+    FALHOU = 'falhou'
+
+    def __init__(self, id_job: int, midia: MidiaDigital, strategy: Optional[ProcessamentoStrategy]):
+        self.id = id_job
+        self.midia = midia
+        self.strategy = strategy # None = usa a estratégia atual da mídia
+        self.status = Job.PENDENTE
+        self.criado_em = datetime.now()
+        self.iniciado_em: Optional[datetime] = None
+        self.concluido_em: Optional[datetime] = None
+        self.logs: List[str] = []
+        self.formato_resultado: Optional[str] = None
+        self.erro: Optional[str] = None
+
+    @property
+    def finalizado(self) -> bool:
+        return self.status in (Job.CONCLUIDO, Job.FALHOU)
+
+    def status_dict(self) -> dict:
+        return {
+            'id': self.id,
+            'midia_id': self.midia.id,
+            'estrategia': str(self.strategy) if self.strategy else None,
+            'status': self.status,
+            'criado_em': self.criado_em.isoformat(),
+            'iniciado_em': self.iniciado_em.isoformat() if self.iniciado_em else None,
+            'concluido_em': self.concluido_em.isoformat() if self.concluido_em else None,
+        }
+
+    def resultado_dict(self) -> dict:
+        dados = self.status_dict()
+        dados.update({'formato_resultado': self.formato_resultado, 'logs': self.logs, 'erro': self.erro})
+        return dados
+
+class FilaCheiaError(Exception):
+    """A fila de jobs atingiu o limite; o cliente deve tentar novamente depois."""
+
+class GerenciadorJobs:
+    """Fila limitada + pool de threads que executam o processamento das mídias.
+
+    submeter() nunca bloqueia: com a fila cheia levanta FilaCheiaError
+    (backpressure, convertido em 503 pela rota). Só os últimos
+    `max_jobs_guardados` jobs finalizados ficam disponíveis para consulta.
+    """
+    def __init__(self, num_workers: int, tamanho_fila: int, max_jobs_guardados: int = 10000):
+        self.num_workers = num_workers
+        self._fila: 'queue.Queue[Job]' = queue.Queue(maxsize=tamanho_fila)
+        self._jobs: Dict[int, Job] = {}
+        self._finalizados: Deque[int] = deque() # Ids na ordem em que terminaram (os primeiros saem antes)
+        self._max_jobs_guardados = max_jobs_guardados
+        self._contador = count(1)
+        self._lock = threading.Lock()
+        self._workers: List[threading.Thread] = []
+
+    def iniciar(self) -> None:
+        with self._lock:
+            if self._workers:
+                return
+            for i in range(self.num_workers):
+                worker = threading.Thread(target=self._loop_worker, name=f"job-worker-{i}", daemon=True)
+                worker.start()
+                self._workers.append(worker)
+
+    def submeter(self, midia: MidiaDigital, strategy: Optional[ProcessamentoStrategy]) -> Job:
+        self.iniciar()
+        job = Job(next(self._contador), midia, strategy)
+        # Registrado antes de entrar na fila: um worker pode terminá-lo (e o cliente
+        # consultá-lo) antes de submeter() retornar
+        with self._lock:
+            self._jobs[job.id] = job
+            self._descartar_antigos()
+        try:
+            self._fila.put_nowait(job)
+        except queue.Full:
+            with self._lock:
+                del self._jobs[job.id]
+            raise FilaCheiaError(f"Fila de jobs cheia ({self._fila.maxsize} pendentes)")
+        return job
+
+    def obter(self, id_job: int) -> Optional[Job]:
+        return self._jobs.get(id_job)
+
+    @property
+    def pendentes(self) -> int:
+        return self._fila.qsize()
+
+    def _descartar_antigos(self) -> None:
+        """Descarta os jobs finalizados mais antigos até voltar ao limite (chamar sob _lock)."""
+        while len(self._jobs) > self._max_jobs_guardados and self._finalizados:
+            del self._jobs[self._finalizados.popleft()]
+
+    def _loop_worker(self) -> None:
+        while True:
+            job = self._fila.get()
+            try:
+                self._executar(job)
+            finally:
+                self._fila.task_done()
+
+    def _executar(self, job: Job) -> None:
+        # O status muda por último: quem consulta (outra thread) e vê um status
+        # já encontra preenchidos os campos que ele promete
+        job.iniciado_em = datetime.now()
+        job.status = Job.EXECUTANDO
+        midia = job.midia
+        try:
+            sucesso = processar_com_lock(midia, job.strategy)
+            job.logs = list(midia.logs_processamento)
+            job.formato_resultado = midia.formato_atual
+            if not sucesso:
+                job.erro = job.logs[-1] if job.logs else None
+            status = Job.CONCLUIDO if sucesso else Job.FALHOU
+        except Exception as e: # Um erro numa estratégia não pode derrubar o worker
+            job.erro = f"{type(e).__name__}: {e}"
+            status = Job.FALHOU
+        job.concluido_em = datetime.now()
+        job.status = status
+        with self._lock:
+            self._finalizados.append(job.id)
+            self._descartar_antigos()
+        add_app_log(f"📦 Job {job.id} ({job.status}) para mídia ID {midia.id}.",
+                    midia_id=midia.id, estrategia=str(midia.strategy),
+                    resultado='sucesso' if job.status == Job.CONCLUIDO else 'falha')
+
+
+# ===== PROCESSAMENTO EM LOTE =====
+def processar_lote(midias: List[MidiaDigital], fabrica_strategy: Callable[[], ProcessamentoStrategy],
+                   max_workers: int) -> Tuple[List[dict], float]:
+    """Aplica a mesma estratégia a várias mídias num pool de threads.
+
+    Retorna o resumo por item (na ordem recebida) e o tempo total em segundos.
+    """
+    def processar_item(midia: MidiaDigital) -> dict:
+        inicio = time.perf_counter()
+        try:
+            sucesso = processar_com_lock(midia, fabrica_strategy())
+            erro = None if sucesso else (midia.logs_processamento[-1] if midia.logs_processamento else None)
+        except Exception as e:
+            sucesso, erro = False, f"{type(e).__name__}: {e}"
+        return {
+            'midia_id': midia.id,
+            'sucesso': sucesso,
+            'formato_atual': midia.formato_atual,
+            'erro': erro,
+            'tempo_ms': round((time.perf_counter() - inicio) * 1000, 3),
+        }
+
+    inicio_lote = time.perf_counter()
+    if not midias:
+        return [], 0.0
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(midias))) as executor:
+        resumo = list(executor.map(processar_item, midias))
+    return resumo, time.perf_counter() - inicio_lote
 
 
 # ===== FLASK APP SETUP =====
@@ -181,43 +1515,119 @@ app = Flask(__name__)
 app.secret_key = 'uma_chave_secreta_simples'
 
 # --- Estado Global para o Demo ---
-memoria_global = Memoria()
-next_media_id_global = 1
+# Armazenamento: memória do processo por padrão, ou SQLite com MIDIAS_DB=arquivo.db
+memoria_global = Memoria(criar_armazenamento())
+# Ids em blocos reservados no armazenamento: com SQLite, vários processos
+# compartilham o mesmo contador sem repetir ids
+TAMANHO_BLOCO_IDS = 1000
+alocador_ids = AlocadorIds(memoria_global.reservar_ids, TAMANHO_BLOCO_IDS)
 # Logs gerais da aplicação (não por mídia)
-app_execution_logs: List[str] = []
+CAPACIDADE_LOGS = 5000 # Eventos mantidos em memória pelo ring buffer
+LOGS_EXIBIDOS_NA_PAGINA = 20
+INTERVALO_STREAM_LOGS = 0.5 # Segundos entre consultas do /logs/stream
+app_execution_logs = RegistroLogs(CAPACIDADE_LOGS)
+
+# Jobs assíncronos: workers do pool e limite da fila (backpressure)
+NUM_WORKERS_JOBS = 4
+TAMANHO_FILA_JOBS = 100
+gerenciador_jobs = GerenciadorJobs(NUM_WORKERS_JOBS, TAMANHO_FILA_JOBS)
+
+# Processamento em lote: threads do pool (padrão: uma por núcleo)
+NUM_WORKERS_LOTE = os.cpu_count() or 4
+
+# Paginação da listagem (?tamanho= na query string é limitado ao máximo)
+TAMANHO_PAGINA_PADRAO = 20
+TAMANHO_PAGINA_MAXIMO = 100
 
 
 # --- Estratégias disponíveis para a UI ---
-# Usamos lambdas para que os parâmetros sejam passados no momento da criação
-# Se a estratégia não tem parâmetros, a lambda simplesmente chama o construtor
+# Cada lambda devolve a instância compartilhada do flyweight (obter_strategy),
+# então nenhuma requisição cria um objeto de estratégia novo
 available_processing_strategies: Dict[str, Callable[[], ProcessamentoStrategy]] = {
-    "video_padrao": lambda: ProcessamentoVideo("H.264", 1080),
-    "video_4k": lambda: ProcessamentoVideo("H.265", 2160),
-    "imagem_padrao": lambda: ProcessamentoImagem("Padrão", "1024x768"),
-    "imagem_altares": lambda: ProcessamentoImagem("Alta", "3840x2160"),
-    "web_otimizado": lambda: ProcessamentoWebOptimizado("WebP"),
-    "mobile_otimizado": lambda: ProcessamentoMobileOptimizado(),
+    "video_padrao": lambda: obter_strategy(ProcessamentoVideo, "H.264", 1080),
+    "video_4k": lambda: obter_strategy(ProcessamentoVideo, "H.265", 2160),
+    "imagem_padrao": lambda: obter_strategy(ProcessamentoImagem, "Padrão", "1024x768"),
+    "imagem_altares": lambda: obter_strategy(ProcessamentoImagem, "Alta", "3840x2160"),
+    "web_otimizado": lambda: obter_strategy(ProcessamentoWebOptimizado, "WebP"),
+    "web_orcamento_100k": lambda: obter_strategy(ProcessamentoWebOptimizado, "WebP", 100_000),
+    "mobile_otimizado": lambda: obter_strategy(ProcessamentoMobileOptimizado),
+    "imagem_web_mobile": lambda: obter_strategy(ProcessamentoPipeline, (
+        obter_strategy(ProcessamentoImagem, "Alta", "1920x1080"),
+        obter_strategy(ProcessamentoWebOptimizado, "WebP"),
+        obter_strategy(ProcessamentoMobileOptimizado))),
 }
 
 def get_next_id() -> int:
-    global next_media_id_global
-    current_id = next_media_id_global
-    next_media_id_global += 1
-    return current_id
-
-def add_app_log(message: str):
-    """Adiciona log à lista de logs da aplicação."""
-    timestamp = datetime.now().strftime("%H:%M:%S")
-    app_execution_logs.insert(0, f"[{timestamp}] {message}")
-    if len(app_execution_logs) > 20: # Limita o tamanho dos logs
-        app_execution_logs.pop()
+    return alocador_ids.proximo()
+
+def add_app_log(message: str, midia_id: Optional[int] = None,
+                estrategia: Optional[str] = None, resultado: Optional[str] = None):
+    """Adiciona log ao ring buffer de logs da aplicação."""
+    app_execution_logs.adicionar(message, midia_id, estrategia, resultado)
+
+# --- Cache de fragmentos do template ---
+# Cada card de mídia é renderizado uma vez por versão da mídia; o <select> de
+# estratégias, uma vez por mudança no registro de estratégias.
+CAPACIDADE_CACHE_FRAGMENTOS = 5000
+cache_fragmentos = CacheLRU(CAPACIDADE_CACHE_FRAGMENTOS)
+_opcoes_strategies: Tuple[tuple, int, Markup] = ((), 0, Markup('')) # (registro, versão, html)
+
+def opcoes_strategies_html() -> Tuple[int, Markup]:
+    """Versão e HTML das <option> de estratégias, re-renderizado só se o registro mudar."""
+    global _opcoes_strategies
+    chave_registro = tuple(available_processing_strategies.items())
+    chave, versao, html = _opcoes_strategies
+    if chave != chave_registro:
+        html = Markup(render_template('_opcoes_strategies.html',
+                                      processing_strategies=available_processing_strategies))
+        versao += 1
+        _opcoes_strategies = (chave_registro, versao, html)
+    return versao, html
+
+def card_midia_html(midia: MidiaDigital) -> Markup:
+    versao_opcoes, opcoes = opcoes_strategies_html()
+    versao = (midia.versao, versao_opcoes)
+    guardado = cache_fragmentos.obter(midia.id)
+    if guardado is not None and guardado[0] == versao:
+        return guardado[1]
+    html = Markup(render_template('_midia_card.html', midia=midia, opcoes_strategies=opcoes))
+    cache_fragmentos.guardar(midia.id, (versao, html))
+    return html
+
+# Identifica este processo nos ETags: a versão do armazenamento em memória e a
+# sequência dos logs recomeçam a cada restart
+TOKEN_INSTANCIA = uuid.uuid4().hex[:8]
+
+def etag_pagina() -> str:
+    """ETag da listagem: versão da coleção + último log + parâmetros da query string."""
+    chave = f"{TOKEN_INSTANCIA}:{memoria_global.versao()}:{app_execution_logs.proximo_seq}:{request.query_string.decode()}"
+    return hashlib.sha1(chave.encode()).hexdigest()
+
+def ler_int_arg(nome: str, padrao: int, minimo: int, maximo: int = INTEIRO_MAXIMO) -> int:
+    """Lê um inteiro da query string, limitado a [minimo, maximo] (no máximo o INTEGER do SQLite)."""
+    try:
+        valor = int(request.args.get(nome, padrao))
+    except (TypeError, ValueError):
+        valor = padrao
+    return min(max(valor, minimo), maximo)
+
+def pagina_da_requisicao() -> Tuple[List[MidiaDigital], Optional[int]]:
+    """Monta a página de mídias a partir de ?cursor=, ?tamanho=, ?tipo= e ?formato=."""
+    tamanho = ler_int_arg('tamanho', TAMANHO_PAGINA_PADRAO, 1, TAMANHO_PAGINA_MAXIMO)
+    cursor = ler_int_arg('cursor', 0, 0)
+    tipo = request.args.get('tipo') or None
+    if tipo:
+        tipo = resolver_tipo(tipo, TIPOS_MIDIA) or tipo # Desconhecido: página vazia, como antes
+    return memoria_global.pagina(cursor, tamanho,
+                                 tipo=tipo,
+                                 formato=request.args.get('formato') or None)
 
 def setup_initial_data():
     """Configura algumas mídias iniciais para o demo."""
-    global memoria_global, next_media_id_global, app_execution_logs
-    memoria_global = Memoria() # Reseta a memória
-    app_execution_logs = []    # Limpa logs da app
-    next_media_id_global = 1   # Reseta contador de ID
+    memoria_global.limpar() # Reseta a memória (e o banco, se for SQLite)
+    app_execution_logs.limpar() # Limpa logs da app
+    cache_processamento.limpar() # Resultados de processamento da demo anterior
+    alocador_ids.descartar_bloco() # Reseta contador de ID (em memória volta a 1)
 
     add_app_log(" Dados iniciais carregados.")
     video1 = Video(id_midia=get_next_id(), formato="AVI", legenda="Filme Curto", url_arquivo="curta.avi", duracao=180)
@@ -232,29 +1642,64 @@ def setup_initial_data():
 # ===== FLASK ROUTES =====
 @app.route('/', methods=['GET'])
 def index():
-    # Limpa os logs de processamento de cada mídia ao recarregar a página principal
+    # Vence os logs de processamento de todas as mídias ao recarregar a página principal
     # para evitar mostrar logs de ações anteriores de forma persistente na listagem de mídias.
+    # É O(1): só as mídias exibidas descartam seus logs vencidos (logs_visiveis).
     # Os logs da aplicação (gerais) são mantidos.
-    memoria_global.clear_all_media_logs()
+    MidiaDigital.invalidar_logs()
+
+    # GET condicional: se nada mudou desde a última visita, 304 sem renderizar.
+    # Mensagens flash pendentes só aparecem uma vez, então sempre renderizam.
+    etag = etag_pagina()
+    if not session.get('_flashes') and request.if_none_match.contains_weak(etag):
+        resposta = make_response('', 304)
+        resposta.set_etag(etag, weak=True)
+        return resposta
+
+    midias, proximo_cursor = pagina_da_requisicao()
     
-    return render_template('index.html',
-                           midias=memoria_global.midias,
-                           processing_strategies=available_processing_strategies,
-                           app_logs=app_execution_logs)
+    resposta = make_response(render_template('index.html',
+                           midias=midias,
+                           proximo_cursor=proximo_cursor,
+                           total_midias=len(memoria_global),
+                           render_card=card_midia_html,
+                           app_logs=app_execution_logs.ultimos(LOGS_EXIBIDOS_NA_PAGINA)))
+    resposta.set_etag(etag, weak=True)
+    resposta.headers['Cache-Control'] = 'no-cache' # Sempre revalidar com o ETag
+    return resposta
 
 @app.route('/add_media', methods=['POST'])
 def add_media_route():
     tipo_midia = request.form.get('tipo_midia')
     legenda = request.form.get('legenda', 'Nova Mídia')
     formato_original = request.form.get('formato_original', 'N/A')
+    # Caminho local (ex.: fotos/formatura.jpg, relativo a MIDIAS_RAIZ) permite o processamento real
+    url_arquivo = request.form.get('url_arquivo', '').strip()
+    if url_arquivo and '://' not in url_arquivo and processamento_imagem.caminho_na_raiz(url_arquivo) is None:
+        add_app_log(f"⚠️ Caminho fora da pasta de mídias recusado: {url_arquivo}")
+        flash('O arquivo precisa estar dentro da pasta de mídias do servidor.', 'error')
+        return redirect(url_for('index'))
+    duracao = 0
+    if tipo_midia == 'video':
+        # Duração informada ("225", "03:45", "2min"...) ou, vazia, lida do cabeçalho do MP4 local
+        texto_duracao = request.form.get('duracao', '').strip()
+        caminho = processamento_imagem.arquivo_local(url_arquivo) if url_arquivo else None
+        if texto_duracao:
+            duracao = interpretar_duracao(texto_duracao)
+        elif caminho:
+            duracao = round(indexacao_video.duracao_mp4(caminho) or 0)
+        if (texto_duracao or caminho) and duracao <= 0:
+            add_app_log(f"⚠️ Duração inválida ou ilegível para o vídeo: {texto_duracao or url_arquivo}")
+            flash('Informe a duração do vídeo (ex.: 03:45); não foi possível lê-la do arquivo.', 'error')
+            return redirect(url_for('index'))
     
     midia_id = get_next_id()
     nova_midia: Optional[MidiaDigital] = None
 
     if tipo_midia == 'video':
-        nova_midia = Video(midia_id, formato_original, legenda, "video.url", 60)
+        nova_midia = Video(midia_id, formato_original, legenda, url_arquivo or "video.url", duracao)
     elif tipo_midia == 'imagem':
-        nova_midia = Imagem(midia_id, formato_original, legenda, "imagem.url", "100x100")
+        nova_midia = Imagem(midia_id, formato_original, legenda, url_arquivo or "imagem.url", "100x100")
     
     if nova_midia:
         memoria_global.adicionar_midia(nova_midia)
@@ -271,36 +1716,46 @@ def process_media_route(media_id):
     midia = memoria_global.get_midia_by_id(media_id)
     if midia:
         strategy_key = request.form.get('strategy_key') # Pega a estratégia do form
+        nova_strategia = None
         if strategy_key and strategy_key in available_processing_strategies:
             nova_strategia = available_processing_strategies[strategy_key]()
-            midia.set_strategy(nova_strategia)
-            add_app_log(f"🛠️ Estratégia '{nova_strategia}' definida para mídia ID {media_id}.")
+            add_app_log(f"🛠️ Estratégia '{nova_strategia}' definida para mídia ID {media_id}.",
+                        midia_id=media_id, estrategia=str(nova_strategia), resultado='info')
             flash(f"Estratégia '{nova_strategia}' definida para '{midia.legenda}'. Processando...", 'info')
         elif not midia.strategy:
              add_app_log(f"⚠️ Mídia ID {media_id} não tem estratégia definida. Usando padrão se houver ou falhando.")
              flash(f"Mídia '{midia.legenda}' não tinha estratégia explícita. Verifique se uma padrão foi aplicada.", 'warning')
 
 
-        midia.executar_processamento() # Executa com a estratégia nova ou a já existente
+        # Estratégia nova (ou a já existente) + processamento sob o mesmo lock dos jobs e lotes
+        sucesso = processar_com_lock(midia, nova_strategia)
         # Os logs do processamento da mídia estarão em midia.logs_processamento
         # e serão mostrados no template da próxima vez que a mídia for renderizada.
         # Adicionamos um log geral para a aplicação também.
-        if midia.logs_processamento and "✅" in midia.logs_processamento[-1]: # Verifica se o último log indica sucesso
-             add_app_log(f"⚙️ Mídia ID {media_id} ('{midia.legenda}') processada. Novo formato: {midia.formato_atual}")
+        if sucesso:
+             add_app_log(f"⚙️ Mídia ID {media_id} ('{midia.legenda}') processada. Novo formato: {midia.formato_atual}",
+                         midia_id=media_id, estrategia=str(midia.strategy), resultado='sucesso')
              flash(f"Mídia '{midia.legenda}' processada! Novo formato: {midia.formato_atual}", 'success')
         else:
-            add_app_log(f"⚠️ Falha ou não processamento da mídia ID {media_id} ('{midia.legenda}').")
+            add_app_log(f"⚠️ Falha ou não processamento da mídia ID {media_id} ('{midia.legenda}').",
+                        midia_id=media_id, estrategia=str(midia.strategy), resultado='falha')
             flash(f"Processamento de '{midia.legenda}' resultou em: {midia.logs_processamento[-1] if midia.logs_processamento else 'Nenhum log'}", 'warning')
 
     else:
-        add_app_log(f"❌ Mídia ID {media_id} não encontrada para processamento.")
+        add_app_log(f"❌ Mídia ID {media_id} não encontrada para processamento.",
+                    midia_id=media_id, resultado='nao_encontrada')
         flash(f'Mídia ID {media_id} não encontrada.', 'error')
     
-    # Renderiza a página novamente, mostrando os logs de processamento da mídia específica
+    # Renderiza a página da listagem que contém a mídia processada, com seus logs
+    tamanho = ler_int_arg('tamanho', TAMANHO_PAGINA_PADRAO, 1, TAMANHO_PAGINA_MAXIMO)
+    posicao = memoria_global.posicao(media_id) or 0
+    midias, proximo_cursor = memoria_global.pagina((posicao // tamanho) * tamanho, tamanho)
     return render_template('index.html',
-                           midias=memoria_global.midias,
-                           processing_strategies=available_processing_strategies,
-                           app_logs=app_execution_logs,
+                           midias=midias,
+                           proximo_cursor=proximo_cursor,
+                           total_midias=len(memoria_global),
+                           render_card=card_midia_html,
+                           app_logs=app_execution_logs.ultimos(LOGS_EXIBIDOS_NA_PAGINA),
                            processed_media_id=media_id) # Para focar na mídia processada, se necessário
 
 @app.route('/reset_demo', methods=['POST'])
@@ -310,7 +1765,216 @@ def reset_demo_route():
     flash('Demonstração reiniciada com dados de exemplo.', 'info')
     return redirect(url_for('index'))
 
+@app.route('/process_batch', methods=['POST'])
+def process_batch_route():
+    """Aplica uma estratégia a várias mídias de uma vez.
+
+    JSON: {"strategy_key": "video_4k", "ids": [1, 2, 3]} ou {"strategy_key": "...", "tipo": "video"}
+    (o tipo aceita os mesmos nomes da busca por tipo: "Vídeo", "videos", "fotos"...).
+    """
+    dados = request.get_json(silent=True) or {}
+    strategy_key = dados.get('strategy_key')
+    if strategy_key not in available_processing_strategies:
+        return jsonify({'message': f"Estratégia '{strategy_key}' desconhecida."}), 400
+
+    ids = dados.get('ids')
+    tipo = dados.get('tipo')
+    if tipo is not None and not isinstance(tipo, str):
+        return jsonify({'message': 'tipo deve ser um texto.'}), 400
+    nao_encontrados: List[int] = []
+    if ids is not None:
+        if not isinstance(ids, list) or not all(type(midia_id) is int # bool fora
+                                                and INTEIRO_MINIMO <= midia_id <= INTEIRO_MAXIMO
+                                                for midia_id in ids):
+            return jsonify({'message': 'ids deve ser uma lista de inteiros de 64 bits.'}), 400
+        midias = []
+        for midia_id in dict.fromkeys(ids): # Remove repetidos mantendo a ordem
+            midia = memoria_global.get_midia_by_id(midia_id)
+            if midia:
+                midias.append(midia)
+            else:
+                nao_encontrados.append(midia_id)
+    elif tipo:
+        tipo_midia = resolver_tipo(tipo, TIPOS_MIDIA) # "video", "VÍDEOS", "fotos"...
+        if tipo_midia is None:
+            return jsonify({'message': f"Tipo '{tipo}' desconhecido (use {' ou '.join(TIPOS_MIDIA)})."}), 400
+        midias = memoria_global.midias_por_tipo(tipo_midia)
+    else:
+        return jsonify({'message': 'Informe "ids" ou "tipo".'}), 400
+
+    resumo, tempo_total = processar_lote(midias, available_processing_strategies[strategy_key],
+                                         NUM_WORKERS_LOTE)
+    sucessos = sum(1 for item in resumo if item['sucesso'])
+    add_app_log(f"🗂️ Lote '{strategy_key}': {sucessos}/{len(resumo)} mídias processadas em {tempo_total:.3f}s.",
+                estrategia=strategy_key, resultado='sucesso' if sucessos == len(resumo) else 'falha')
+    return jsonify({
+        'strategy_key': strategy_key,
+        'total': len(resumo),
+        'sucessos': sucessos,
+        'falhas': len(resumo) - sucessos,
+        'nao_encontrados': nao_encontrados,
+        'tempo_total_s': round(tempo_total, 6),
+        'workers': NUM_WORKERS_LOTE,
+        'itens': resumo,
+    })
+
+@app.route('/jobs', methods=['POST'])
+def submit_job_route():
+    """Enfileira o processamento de uma mídia e responde na hora com o id do job.
+
+    Aceita JSON ({"media_id": 1, "strategy_key": "video_4k"}) ou o form da página.
+    """
+    dados = request.get_json(silent=True) if request.is_json else request.form
+    dados = dados or {}
+    media_id = dados.get('media_id')
+    if not isinstance(media_id, (int, str)) or isinstance(media_id, bool): # JSON true não é o id 1
+        return responder_job({'message': 'media_id inválido.'}, 400)
+    try:
+        media_id = int(media_id)
+    except ValueError:
+        return responder_job({'message': 'media_id inválido.'}, 400)
+
+    midia = memoria_global.get_midia_by_id(media_id)
+    if not midia:
+        return responder_job({'message': f'Mídia ID {media_id} não encontrada.'}, 404)
+
+    strategy_key = dados.get('strategy_key')
+    strategy = None
+    if strategy_key:
+        if strategy_key not in available_processing_strategies:
+            return responder_job({'message': f"Estratégia '{strategy_key}' desconhecida."}, 400)
+        strategy = available_processing_strategies[strategy_key]()
+
+    try:
+        job = gerenciador_jobs.submeter(midia, strategy)
+    except FilaCheiaError as e:
+        add_app_log(f"⏳ Job recusado para mídia ID {media_id}: {e}", midia_id=media_id, resultado='recusado')
+        resposta = responder_job({'message': str(e)}, 503)
+        resposta.headers['Retry-After'] = '1'
+        return resposta
+
+    add_app_log(f"📥 Job {job.id} enfileirado para mídia ID {media_id}.",
+                midia_id=media_id, estrategia=str(strategy) if strategy else None, resultado='enfileirado')
+    dados_job = job.status_dict()
+    dados_job['status_url'] = url_for('job_status_route', job_id=job.id)
+    dados_job['resultado_url'] = url_for('job_result_route', job_id=job.id)
+    return responder_job(dados_job, 202, f"Job {job.id} enfileirado para '{midia.legenda}'.")
+
+def responder_job(dados: dict, status: int, mensagem_flash: Optional[str] = None):
+    """JSON para clientes da API; flash + redirect para o form da página."""
+    if request.is_json:
+        return jsonify(dados), status
+    flash(mensagem_flash or dados.get('message', ''), 'info' if status < 400 else 'error')
+    return redirect(url_for('index'))
+
+@app.route('/jobs/<int:job_id>', methods=['GET'])
+def job_status_route(job_id):
+    job = gerenciador_jobs.obter(job_id)
+    if not job:
+        return jsonify({'message': f'Job {job_id} não encontrado.'}), 404
+    dados = job.status_dict()
+    dados['fila_pendentes'] = gerenciador_jobs.pendentes
+    return jsonify(dados)
+
+@app.route('/jobs/<int:job_id>/resultado', methods=['GET'])
+def job_result_route(job_id):
+    job = gerenciador_jobs.obter(job_id)
+    if not job:
+        return jsonify({'message': f'Job {job_id} não encontrado.'}), 404
+    if not job.finalizado:
+        return jsonify(job.status_dict()), 202 # Ainda em andamento
+    return jsonify(job.resultado_dict())
+
+@app.route('/media/<int:media_id>/arquivo', methods=['GET'])
+def media_file_route(media_id):
+    """Arquivo original da mídia (ex.: vídeo, com Range, para o player).
+
+    Só serve arquivos dentro de MIDIAS_RAIZ; qualquer outro caminho responde 404."""
+    midia = memoria_global.get_midia_by_id(media_id)
+    caminho = midia.arquivo_local if midia else None
+    if caminho is None:
+        return jsonify({'message': f'Mídia {media_id} não tem arquivo local.'}), 404
+    try:
+        return streaming_arquivos.resposta_arquivo(request.environ, caminho, processamento_imagem.RAIZ_MIDIAS)
+    except NotFound:
+        return jsonify({'message': f'Mídia {media_id} não tem arquivo local.'}), 404
+
+@app.route('/media/<int:media_id>/variante/<nome>', methods=['GET'])
+def media_variant_route(media_id, nome):
+    """Versão redimensionada gravada pelo processamento (a listagem usa estas, não o original)."""
+    midia = memoria_global.get_midia_by_id(media_id)
+    variantes = midia.variantes if midia else ()
+    arquivo = next((arquivo for _, arquivo in variantes if os.path.basename(arquivo) == nome), None)
+    if arquivo is None:
+        return jsonify({'message': f'Mídia {media_id} não tem a versão {nome}.'}), 404
+    try:
+        return streaming_arquivos.resposta_arquivo(request.environ, arquivo, processamento_imagem.RAIZ_MIDIAS)
+    except NotFound:
+        return jsonify({'message': f'Mídia {media_id} não tem a versão {nome}.'}), 404
+
+@app.route('/media/<int:media_id>/segmentos', methods=['GET'])
+def media_segments_route(media_id):
+    """Índice de segmentos do vídeo (gerado pelo ProcessamentoVideo): faixas para GET com Range."""
+    midia = memoria_global.get_midia_by_id(media_id)
+    caminho = arquivo_video_local(midia)
+    if caminho is None:
+        return jsonify({'message': f'Mídia {media_id} não é um vídeo local.'}), 404
+    indice = indexacao_video.indice_gravado(caminho)
+    if indice is None:
+        return jsonify({'message': f'Vídeo {media_id} ainda não foi processado.'}), 404
+    return jsonify({'url': url_for('media_file_route', media_id=media_id),
+                    'container': indice.container,
+                    'duracao': indice.duracao,
+                    'inicializacao': indice.inicializacao,
+                    'segmentos': [segmento._asdict() for segmento in indice.segmentos]})
+
+@app.route('/search', methods=['GET'])
+def search_route():
+    """Busca textual nas legendas: ?q=<texto>&k=<quantos> (mais relevantes primeiro)."""
+    consulta = request.args.get('q', '').strip()
+    if not consulta:
+        return jsonify({'message': 'Informe o texto da busca em ?q='}), 400
+    k = ler_int_arg('k', 10, 1, TAMANHO_PAGINA_MAXIMO)
+    return jsonify({'consulta': consulta,
+                    'resultados': [{'id': midia.id, 'tipo': midia.tipo(), 'legenda': midia.legenda,
+                                    'pontuacao': round(pontuacao, 4)}
+                                   for midia, pontuacao in memoria_global.buscar_texto(consulta, k)]})
+
+@app.route('/cache', methods=['GET'])
+def cache_stats_route():
+    return jsonify(cache_processamento.estatisticas())
+
+@app.route('/logs', methods=['GET'])
+def logs_route():
+    """Eventos do ring buffer a partir de ?desde=<seq> (no máximo ?limite=)."""
+    desde = ler_int_arg('desde', 0, 0)
+    limite = ler_int_arg('limite', 100, 1, 1000)
+    eventos = app_execution_logs.intervalo(desde, limite)
+    proximo = eventos[-1].seq + 1 if eventos else max(desde, app_execution_logs.proximo_seq)
+    return jsonify({'eventos': [evento.to_dict() for evento in eventos],
+                    'proximo': proximo,
+                    'capacidade': app_execution_logs.capacidade})
+
+@app.route('/logs/stream', methods=['GET'])
+def logs_stream_route():
+    """Server-Sent Events com os novos eventos a partir de ?desde= (padrão: só os novos)."""
+    desde = ler_int_arg('desde', app_execution_logs.proximo_seq, 0)
+
+    def gerar(proximo: int):
+        while True:
+            eventos = app_execution_logs.intervalo(proximo, 100)
+            for evento in eventos:
+                yield f"id: {evento.seq}\ndata: {json.dumps(evento.to_dict(), ensure_ascii=False)}\n\n"
+            if eventos:
+                proximo = eventos[-1].seq + 1
+            else:
+                yield ": keep-alive\n\n"
+                time.sleep(INTERVALO_STREAM_LOGS)
+
+    return Response(gerar(desde), mimetype='text/event-stream')
+
 
 if __name__ == '__main__':
-    setup_initial_data() # Carrega dados iniciais ao iniciar
+    if len(memoria_global) == 0: # Com SQLite, mantém o que já estava salvo
+        setup_initial_data() # Carrega dados iniciais ao iniciar
     app.run(debug=True, port=5002) # Porta diferente para não conflitar com o anterior
\ No newline at end of file
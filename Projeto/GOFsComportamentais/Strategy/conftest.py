@@ -0,0 +1,7 @@
+"""Deixa `comum` (em Projeto/) importável para os testes, sem PYTHONPATH."""
+import os
+import sys
+
+_PROJETO = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if _PROJETO not in sys.path:
+    sys.path.append(_PROJETO)
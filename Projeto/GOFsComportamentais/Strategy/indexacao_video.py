@@ -0,0 +1,216 @@
+"""Índice de segmentos para streaming de vídeos locais (usado por ProcessamentoVideo em app.py).
+
+Divide o vídeo em segmentos de duração fixa e mapeia cada um para uma faixa
+de bytes do arquivo, de modo que o player busque um segmento com um único
+GET com Range (ver streaming_arquivos.py). O índice é gravado ao lado do
+vídeo (`<arquivo>.segmentos.json`) e reaproveitado enquanto o arquivo não mudar.
+
+Sem demultiplexar o container, os limites são estimados supondo taxa de bits
+constante sobre a área de dados do arquivo:
+
+- MP4: só os cabeçalhos das caixas de topo são lidos (com seek); a área de
+  dados é o conteúdo do `mdat` e o que vem antes dele (ftyp/moov) vira o
+  segmento de inicialização;
+- MPEG-TS: os limites são alinhados aos pacotes de 188 bytes;
+- outros formatos: o arquivo inteiro é a área de dados.
+
+A duração de um MP4 pode ser lida do cabeçalho `mvhd` (duracao_mp4), sem
+ler as amostras.
+
+A varredura que calcula o CRC32 de cada segmento lê o arquivo em blocos num
+buffer fixo (readinto), então a memória por vídeo indexado é constante.
+"""
+import json
+import math
+import os
+import struct
+import threading
+import time
+import zlib
+from typing import List, NamedTuple, Optional, Tuple
+
+SEGUNDOS_POR_SEGMENTO = 6
+TAMANHO_BLOCO_LEITURA = 256 * 1024
+TAMANHO_PACOTE_TS = 188
+BYTE_SINCRONIA_TS = 0x47
+SUFIXO_INDICE = ".segmentos.json"
+
+
+class Segmento(NamedTuple):
+    indice: int
+    inicio_segundos: float
+    fim_segundos: float
+    byte_inicio: int
+    byte_fim: int # Inclusivo, como no cabeçalho Range
+    crc32: int
+
+
+class IndiceSegmentos(NamedTuple):
+    caminho_indice: str
+    container: str
+    tamanho_arquivo: int
+    mtime_ns: int
+    duracao: float
+    segundos_por_segmento: int
+    inicializacao: Optional[Tuple[int, int]] # Faixa (inclusiva) de ftyp/moov no MP4
+    segmentos: List[Segmento]
+    segundos: float # Tempo gasto para montar (0 se reaproveitado do disco)
+    reaproveitado: bool
+
+
+def caminho_indice(caminho_video: str) -> str:
+    return caminho_video + SUFIXO_INDICE
+
+
+def _caixas_mp4(arquivo, tamanho: int, inicio: int = 0) -> List[Tuple[bytes, int, int]]:
+    """(tipo, início do conteúdo, fim exclusivo) das caixas entre `inicio` e `tamanho`, lendo só os cabeçalhos."""
+    caixas = []
+    posicao = inicio
+    while posicao + 8 <= tamanho:
+        arquivo.seek(posicao)
+        tamanho_caixa, tipo = struct.unpack(">I4s", arquivo.read(8))
+        inicio_conteudo = posicao + 8
+        if tamanho_caixa == 1: # Tamanho de 64 bits logo após o tipo
+            tamanho_caixa = struct.unpack(">Q", arquivo.read(8))[0]
+            inicio_conteudo += 8
+        elif tamanho_caixa == 0: # Vai até o fim do arquivo
+            tamanho_caixa = tamanho - posicao
+        if tamanho_caixa < inicio_conteudo - posicao:
+            break # Cabeçalho inválido: não é MP4 (ou está corrompido)
+        caixas.append((tipo, inicio_conteudo, min(posicao + tamanho_caixa, tamanho)))
+        posicao += tamanho_caixa
+    return caixas
+
+
+def duracao_mp4(caminho_video: str) -> Optional[float]:
+    """Duração em segundos lida do `mvhd` (dentro do `moov`); None se não for MP4 ou não houver."""
+    tamanho = os.path.getsize(caminho_video)
+    with open(caminho_video, "rb", buffering=0) as arquivo:
+        if arquivo.read(8)[4:8] != b"ftyp":
+            return None
+        for tipo, inicio, fim in _caixas_mp4(arquivo, tamanho):
+            if tipo != b"moov":
+                continue
+            for subtipo, sub_inicio, sub_fim in _caixas_mp4(arquivo, fim, inicio):
+                if subtipo != b"mvhd":
+                    continue
+                arquivo.seek(sub_inicio)
+                conteudo = arquivo.read(min(sub_fim - sub_inicio, 32))
+                if conteudo[:1] == b"\x01": # Versão 1: datas e duração de 64 bits
+                    if len(conteudo) < 32:
+                        return None
+                    escala, unidades = struct.unpack(">IQ", conteudo[20:32])
+                    desconhecida = unidades == 2 ** 64 - 1
+                else:
+                    if len(conteudo) < 20:
+                        return None
+                    escala, unidades = struct.unpack(">II", conteudo[12:20])
+                    desconhecida = unidades == 2 ** 32 - 1
+                if not escala or not unidades or desconhecida:
+                    return None
+                return unidades / escala
+    return None
+
+
+def _area_de_dados(arquivo, caminho: str, tamanho: int) -> Tuple[str, int, int, int, Optional[Tuple[int, int]]]:
+    """(container, início, fim exclusivo, alinhamento, faixa de inicialização) da área de dados."""
+    arquivo.seek(0)
+    cabecalho = arquivo.read(TAMANHO_PACOTE_TS + 1)
+    if len(cabecalho) >= 12 and cabecalho[4:8] == b"ftyp":
+        caixas = _caixas_mp4(arquivo, tamanho)
+        for tipo, inicio, fim in caixas:
+            if tipo == b"mdat":
+                # Com moov antes do mdat (faststart) o player precisa dele antes do 1º segmento
+                inicializacao = (0, inicio - 1)
+                return "MP4", inicio, fim, 1, inicializacao
+        return "MP4", 0, tamanho, 1, None
+    if (caminho.lower().endswith((".ts", ".m2ts")) or
+            (len(cabecalho) > TAMANHO_PACOTE_TS and cabecalho[0] == BYTE_SINCRONIA_TS
+             and cabecalho[TAMANHO_PACOTE_TS] == BYTE_SINCRONIA_TS)):
+        return "MPEG-TS", 0, tamanho, TAMANHO_PACOTE_TS, None
+    return "Desconhecido", 0, tamanho, 1, None
+
+
+def _crc_das_faixas(arquivo, limites: List[int]) -> List[int]:
+    """CRC32 de cada faixa [limites[i], limites[i+1]) numa única passada sequencial."""
+    buffer = bytearray(TAMANHO_BLOCO_LEITURA)
+    visao = memoryview(buffer)
+    crcs = []
+    arquivo.seek(limites[0])
+    for inicio, fim in zip(limites, limites[1:]):
+        crc = 0
+        restante = fim - inicio
+        while restante > 0:
+            lidos = arquivo.readinto(visao[:min(restante, TAMANHO_BLOCO_LEITURA)])
+            if not lidos:
+                break # Arquivo encolheu durante a leitura
+            crc = zlib.crc32(visao[:lidos], crc)
+            restante -= lidos
+        crcs.append(crc)
+    return crcs
+
+
+def _carregar(caminho_json: str, info: os.stat_result) -> Optional[IndiceSegmentos]:
+    try:
+        with open(caminho_json, encoding="utf-8") as arquivo:
+            dados = json.load(arquivo)
+    except (OSError, ValueError):
+        return None
+    if dados.get("tamanho_arquivo") != info.st_size or dados.get("mtime_ns") != info.st_mtime_ns:
+        return None # Vídeo mudou depois do índice
+    inicializacao = dados.get("inicializacao")
+    return IndiceSegmentos(caminho_json, dados["container"], dados["tamanho_arquivo"], dados["mtime_ns"],
+                           dados["duracao"], dados["segundos_por_segmento"],
+                           tuple(inicializacao) if inicializacao else None,
+                           [Segmento(**segmento) for segmento in dados["segmentos"]], 0.0, True)
+
+
+def _gravar(indice: IndiceSegmentos) -> None:
+    dados = indice._asdict()
+    del dados["caminho_indice"], dados["segundos"], dados["reaproveitado"]
+    dados["segmentos"] = [segmento._asdict() for segmento in indice.segmentos]
+    # Nome temporário único: duas mídias podem apontar para o mesmo vídeo
+    temporario = f"{indice.caminho_indice}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(temporario, "w", encoding="utf-8") as arquivo:
+        json.dump(dados, arquivo, ensure_ascii=False)
+    os.replace(temporario, indice.caminho_indice) # Leitores nunca veem um índice pela metade
+
+
+def indice_gravado(caminho_video: str) -> Optional[IndiceSegmentos]:
+    """Índice salvo ao lado do vídeo, se ainda corresponder ao arquivo atual."""
+    return _carregar(caminho_indice(caminho_video), os.stat(caminho_video))
+
+
+def indexar(caminho_video: str, duracao: float,
+            segundos_por_segmento: int = SEGUNDOS_POR_SEGMENTO) -> IndiceSegmentos:
+    """Monta (ou reaproveita do disco) o índice de segmentos do vídeo local."""
+    if not duracao or duracao <= 0:
+        raise ValueError(f"{caminho_video}: duração inválida para indexar ({duracao})")
+    info = os.stat(caminho_video)
+    caminho_json = caminho_indice(caminho_video)
+    existente = _carregar(caminho_json, info)
+    if existente is not None and existente.duracao == duracao and \
+            existente.segundos_por_segmento == segundos_por_segmento:
+        return existente
+
+    inicio_relogio = time.perf_counter()
+    with open(caminho_video, "rb", buffering=0) as arquivo:
+        container, inicio_dados, fim_dados, alinhamento, inicializacao = _area_de_dados(
+            arquivo, caminho_video, info.st_size)
+        quantidade = max(1, math.ceil(duracao / segundos_por_segmento))
+        bytes_dados = fim_dados - inicio_dados
+        limites = [inicio_dados]
+        for i in range(1, quantidade):
+            deslocamento = bytes_dados * i * segundos_por_segmento // duracao # Taxa de bits constante
+            limites.append(inicio_dados + int(deslocamento) // alinhamento * alinhamento)
+        limites.append(fim_dados)
+        crcs = _crc_das_faixas(arquivo, limites)
+
+    segmentos = [Segmento(i, i * segundos_por_segmento, min(duracao, (i + 1) * segundos_por_segmento),
+                          limites[i], limites[i + 1] - 1, crcs[i])
+                 for i in range(quantidade) if limites[i + 1] > limites[i]]
+    indice = IndiceSegmentos(caminho_json, container, info.st_size, info.st_mtime_ns, duracao,
+                             segundos_por_segmento, inicializacao, segmentos,
+                             time.perf_counter() - inicio_relogio, False)
+    _gravar(indice)
+    return indice
@@ -0,0 +1,452 @@
+"""Motor de processamento de imagens usado pelas estratégias de imagem (app.py).
+
+Decodifica o arquivo local da mídia, redimensiona para caber na resolução
+configurada e grava uma versão JPEG comprimida ao lado do original, além de um placeholder minúsculo
+(miniatura de 16px em data URI) para o carregamento preguiçoso da listagem. As
+versões responsivas (uma por largura) são geradas em paralelo num pool de
+processos, a partir de uma única decodificação compartilhada via memória
+compartilhada. Depende do Pillow; sem ele, `disponivel()` retorna False e
+as estratégias voltam a só descrever o processamento nos logs.
+
+O pool usa o método 'spawn': cada worker, ao subir, reimporta o script
+principal de quem chamou (como `__mp_main__`). Esse script precisa poder ser
+importado sem efeitos: o que roda o programa (app.run, input(), chamadas a
+este módulo...) fica sob `if __name__ == "__main__"`, como no app.py. O resto
+do nível do módulo roda uma vez por worker; no app.py, isso é montar o app
+Flask e abrir o armazenamento (com MIDIAS_DB, o esquema do SQLite), na
+primeira vez que o pool é usado. Se os workers não sobem (ex.: script sem
+a guarda), as versões são geradas no próprio processo e um aviso vai para
+o logger "processamento_imagem".
+"""
+import base64
+import io
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+from typing import List, NamedTuple, Optional, Tuple
+
+try:
+    from PIL import Image
+except ImportError: # Pillow é opcional: pip install pillow
+    Image = None
+
+TAMANHO_BLOCO_IO = 1024 * 1024 # Leitura/escrita em blocos de 1 MiB
+
+# Só arquivos dentro desta pasta contam como arquivo local de uma mídia: nada fora
+# dela é lido, servido ou recebe arquivos gerados ao lado. Configurável com MIDIAS_RAIZ.
+RAIZ_MIDIAS = os.path.realpath(os.environ.get(
+    "MIDIAS_RAIZ", os.path.join(os.path.dirname(os.path.abspath(__file__)), "midias")))
+
+# Compressão mais alta = qualidade JPEG mais baixa
+QUALIDADE_POR_COMPRESSAO = {
+    "Baixa": 92,
+    "Padrão": 82,
+    "Alta": 70,
+}
+QUALIDADE_PADRAO = 80
+
+# Faixa de qualidade explorada pela busca por tamanho alvo
+QUALIDADE_MINIMA_ORCAMENTO = 10
+QUALIDADE_MAXIMA_ORCAMENTO = 95
+
+# Placeholder para lazy loading: miniatura de no máximo 16px, JPEG bem comprimido
+LADO_PLACEHOLDER = 16
+QUALIDADE_PLACEHOLDER = 50
+
+# Larguras das versões responsivas (só as menores que a imagem de origem são geradas)
+LARGURAS_RESPONSIVAS = (320, 640, 1280, 1920)
+
+
+class EstatisticasImagem(NamedTuple):
+    caminho_saida: str
+    tamanho_origem: Tuple[int, int]
+    tamanho_saida: Tuple[int, int]
+    bytes_entrada: int
+    bytes_saida: int
+    segundos: float
+    placeholder: str # data URI da miniatura (ver gerar_placeholder)
+
+
+class EstatisticasVariante(NamedTuple):
+    caminho_saida: str
+    tamanho: Tuple[int, int]
+    bytes_saida: int
+    segundos: float
+
+
+class ResultadoOrcamento(NamedTuple):
+    dados: bytes
+    qualidade: int
+    iteracoes: int # Quantas codificações foram feitas de fato
+    atingiu: bool # False se nem a qualidade mínima coube no orçamento
+
+
+class ResultadoVariantes(NamedTuple):
+    bytes_entrada: int
+    variantes: List[EstatisticasVariante]
+    no_orcamento: Optional[Tuple[EstatisticasVariante, ResultadoOrcamento]] # Só com orçamento
+    placeholder: str
+
+
+def disponivel() -> bool:
+    return Image is not None
+
+
+def caminho_na_raiz(caminho: Optional[str]) -> Optional[str]:
+    """Caminho real (links resolvidos) se ficar dentro de RAIZ_MIDIAS; relativos partem da raiz."""
+    if not caminho:
+        return None
+    real = os.path.realpath(os.path.join(RAIZ_MIDIAS, caminho))
+    if os.path.commonpath((real, RAIZ_MIDIAS)) != RAIZ_MIDIAS:
+        return None
+    return real
+
+
+def arquivo_local(caminho: Optional[str]) -> Optional[str]:
+    """Caminho real do arquivo se ele existir dentro de RAIZ_MIDIAS; senão None."""
+    real = caminho_na_raiz(caminho)
+    return real if real and os.path.isfile(real) else None
+
+
+def ler_resolucao(resolucao: str) -> Tuple[int, int]:
+    """'1920x1080' -> (1920, 1080)."""
+    largura, altura = resolucao.lower().split("x")
+    return int(largura), int(altura)
+
+
+def ler_em_blocos(caminho: str) -> bytes:
+    buffer = io.BytesIO()
+    with open(caminho, "rb") as arquivo:
+        while True:
+            bloco = arquivo.read(TAMANHO_BLOCO_IO)
+            if not bloco:
+                break
+            buffer.write(bloco)
+    return buffer.getvalue()
+
+
+def gravar_em_blocos(caminho: str, dados: bytes) -> None:
+    visao = memoryview(dados) # Fatias sem copiar os bytes
+    with open(caminho, "wb") as arquivo:
+        for inicio in range(0, len(visao), TAMANHO_BLOCO_IO):
+            arquivo.write(visao[inicio:inicio + TAMANHO_BLOCO_IO])
+
+
+def decodificar(dados: bytes, caixa: Optional[Tuple[int, int]] = None) -> "Image.Image":
+    """Decodifica para RGB. Com `caixa`, JPEGs já são decodificados em escala reduzida (draft)."""
+    imagem = Image.open(io.BytesIO(dados))
+    if caixa is not None:
+        imagem.draft("RGB", caixa) # Só tem efeito em JPEG; DCT reduzida, bem mais barata
+    if imagem.mode in ("RGBA", "LA", "P"):
+        imagem = imagem.convert("RGBA")
+        fundo = Image.new("RGB", imagem.size, (255, 255, 255))
+        fundo.paste(imagem, mask=imagem.getchannel("A"))
+        return fundo
+    return imagem.convert("RGB")
+
+
+def tamanho_que_cabe(origem: Tuple[int, int], caixa: Tuple[int, int]) -> Tuple[int, int]:
+    """Maior tamanho com a proporção da origem que cabe na caixa (nunca amplia)."""
+    escala = min(caixa[0] / origem[0], caixa[1] / origem[1], 1.0)
+    return max(1, round(origem[0] * escala)), max(1, round(origem[1] * escala))
+
+
+def codificar_jpeg(imagem: "Image.Image", qualidade: int) -> bytes:
+    return codificar(imagem, "JPEG", qualidade)
+
+
+def codificar(imagem: "Image.Image", formato: str, qualidade: int) -> bytes:
+    saida = io.BytesIO()
+    if formato == "JPEG":
+        imagem.save(saida, format="JPEG", quality=qualidade, optimize=True, progressive=True)
+    elif formato == "WEBP":
+        imagem.save(saida, format="WEBP", quality=qualidade, method=4)
+    else:
+        imagem.save(saida, format=formato)
+    return saida.getvalue()
+
+
+def codificar_com_orcamento(imagem: "Image.Image", formato: str, orcamento_bytes: int,
+                            qualidade_min: int = QUALIDADE_MINIMA_ORCAMENTO,
+                            qualidade_max: int = QUALIDADE_MAXIMA_ORCAMENTO) -> ResultadoOrcamento:
+    """Maior qualidade cuja codificação cabe em `orcamento_bytes` (busca binária).
+
+    O tamanho cresce com a qualidade, então basta ~log2(faixa) codificações.
+    Cada codificação fica guardada por qualidade: nenhuma é refeita, e a
+    escolhida é devolvida sem codificar de novo.
+    """
+    codificadas = {}
+
+    def codificada(qualidade: int) -> bytes:
+        if qualidade not in codificadas:
+            codificadas[qualidade] = codificar(imagem, formato, qualidade)
+        return codificadas[qualidade]
+
+    # Atalho comum: a qualidade máxima já cabe
+    if len(codificada(qualidade_max)) <= orcamento_bytes:
+        return ResultadoOrcamento(codificadas[qualidade_max], qualidade_max, len(codificadas), True)
+    melhor = None
+    baixo, alto = qualidade_min, qualidade_max - 1
+    while baixo <= alto:
+        meio = (baixo + alto) // 2
+        if len(codificada(meio)) <= orcamento_bytes:
+            melhor, baixo = meio, meio + 1
+        else:
+            alto = meio - 1
+    if melhor is None:
+        # Nem a qualidade mínima coube: entrega a menor codificação possível
+        return ResultadoOrcamento(codificada(qualidade_min), qualidade_min, len(codificadas), False)
+    return ResultadoOrcamento(codificadas[melhor], melhor, len(codificadas), True)
+
+
+def gerar_placeholder(imagem: "Image.Image") -> str:
+    """Miniatura de até 16px como data URI (algumas centenas de bytes), para embutir no HTML.
+
+    A redução é uma única passada de média por blocos (BOX) no C do Pillow,
+    sobre a imagem já decodificada: nada é lido ou decodificado de novo.
+    """
+    # reduce() por fator inteiro primeiro (barato), depois o ajuste fino até 16px
+    miniatura = imagem.reduce(max(1, min(imagem.size) // (LADO_PLACEHOLDER * 4)))
+    miniatura.thumbnail((LADO_PLACEHOLDER, LADO_PLACEHOLDER), Image.BOX)
+    dados = codificar(miniatura, "JPEG", QUALIDADE_PLACEHOLDER)
+    return "data:image/jpeg;base64," + base64.b64encode(dados).decode("ascii")
+
+
+EXTENSOES = {"JPEG": "jpg", "WEBP": "webp", "PNG": "png"}
+
+
+def caminho_saida(caminho_origem: str, tamanho: Tuple[int, int], extensao: str = "jpg",
+                  assinatura: str = "") -> str:
+    """`<arquivo>_<L>x<A>[_<assinatura>].<ext>`; a assinatura separa os arquivos de cada configuração."""
+    base, _ = os.path.splitext(caminho_origem)
+    sufixo = f"_{assinatura}" if assinatura else ""
+    return f"{base}_{tamanho[0]}x{tamanho[1]}{sufixo}.{extensao}"
+
+
+# ===== VERSÕES RESPONSIVAS EM PARALELO =====
+_log = logging.getLogger(__name__)
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def _pool_processos() -> ProcessPoolExecutor:
+    """Pool criado uma vez e reaproveitado. 'spawn' evita fork de um servidor com threads
+    (ver a docstring do módulo sobre o script principal)."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=os.cpu_count() or 2,
+                                        mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+
+def _descartar_pool(pool: ProcessPoolExecutor) -> None:
+    """Esquece um pool quebrado (worker morto): o próximo uso cria outro."""
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _redimensionar_e_gravar(imagem: "Image.Image", largura: int, formato: str, qualidade: int,
+                            caminho_origem: str, assinatura: str = "") -> EstatisticasVariante:
+    inicio = time.perf_counter()
+    tamanho = (largura, max(1, round(imagem.height * largura / imagem.width)))
+    variante = imagem.resize(tamanho, Image.LANCZOS, reducing_gap=3.0)
+    if variante.mode == "RGBX" and formato not in ("JPEG", "WEBP"):
+        variante = variante.convert("RGB") # PNG não grava RGBX
+    codificado = codificar(variante, formato, qualidade)
+    saida = caminho_saida(caminho_origem, tamanho, EXTENSOES.get(formato, formato.lower()), assinatura)
+    gravar_em_blocos(saida, codificado)
+    return EstatisticasVariante(saida, tamanho, len(codificado), time.perf_counter() - inicio)
+
+
+def _imagem_no_buffer(buffer: memoryview, tamanho: Tuple[int, int]) -> "Image.Image":
+    """Imagem RGBX montada sobre o buffer, sem copiar: RGBX é o layout interno do Pillow
+    para RGB (4 bytes por pixel), então frombuffer mapeia o bloco em vez de copiá-lo."""
+    return Image.frombuffer("RGBX", tamanho, buffer, "raw", "RGBX", 0, 1)
+
+
+def _variante_do_shm(nome_shm: str, tamanho_imagem: Tuple[int, int], largura: int, formato: str,
+                     qualidade: int, caminho_origem: str, assinatura: str = "") -> EstatisticasVariante:
+    """Executado no worker: lê os pixels direto da memória compartilhada, sem pickle nem cópia."""
+    shm = shared_memory.SharedMemory(name=nome_shm)
+    try:
+        imagem = _imagem_no_buffer(shm.buf, tamanho_imagem)
+        estatisticas = _redimensionar_e_gravar(imagem, largura, formato, qualidade, caminho_origem, assinatura)
+        del imagem # Solta a referência ao buffer antes de fechar
+        return estatisticas
+    finally:
+        shm.close()
+
+
+def gerar_variantes(imagem: "Image.Image", caminho_origem: str, formato: str = "JPEG",
+                    qualidade: int = QUALIDADE_PADRAO,
+                    larguras: Tuple[int, ...] = LARGURAS_RESPONSIVAS,
+                    assinatura: str = "") -> List[EstatisticasVariante]:
+    """Gera uma versão por largura (menor que a original) a partir da imagem já decodificada.
+
+    Os pixels vão uma vez para um bloco de memória compartilhada, já no layout
+    RGBX, e cada worker do pool redimensiona/codifica uma largura lendo desse
+    bloco (mapeado como imagem, sem outra cópia).
+    Se um worker morrer (ex.: falta de memória) ou não conseguir subir, o pool
+    é recriado na próxima chamada e esta termina no próprio processo, com um
+    aviso no log.
+    """
+    larguras = tuple(largura for largura in larguras if largura < imagem.width)
+    if not larguras:
+        return []
+    if len(larguras) == 1:
+        return [_redimensionar_e_gravar(imagem, largura, formato, qualidade, caminho_origem, assinatura)
+                for largura in larguras]
+    if imagem.mode != "RGB":
+        imagem = imagem.convert("RGB")
+    tamanho_bloco = imagem.width * imagem.height * 4
+    shm = shared_memory.SharedMemory(create=True, size=tamanho_bloco)
+    try:
+        # O encoder "raw" já entrega RGB como RGBX (o que _imagem_no_buffer mapeia);
+        # o bloco pode ser maior que o pedido (arredondado para páginas)
+        shm.buf[:tamanho_bloco] = imagem.tobytes("raw", "RGBX")
+        pool = _pool_processos()
+        try:
+            futuros = [pool.submit(_variante_do_shm, shm.name, imagem.size, largura,
+                                   formato, qualidade, caminho_origem, assinatura)
+                       for largura in larguras]
+            return [futuro.result() for futuro in futuros]
+        except BrokenProcessPool:
+            _log.warning("Pool de processos indisponível; versões de %s geradas no próprio processo",
+                         caminho_origem, exc_info=True)
+            _descartar_pool(pool)
+            return [_redimensionar_e_gravar(imagem, largura, formato, qualidade, caminho_origem, assinatura)
+                    for largura in larguras]
+    finally:
+        shm.close()
+        shm.unlink()
+
+
+def otimizar_para_orcamento(imagem: "Image.Image", caminho_origem: str, formato: str,
+                            orcamento_bytes: int, largura_maxima: int = max(LARGURAS_RESPONSIVAS),
+                            assinatura: str = "") -> Tuple[EstatisticasVariante, ResultadoOrcamento]:
+    """Grava `<arquivo>_web[_<assinatura>].<ext>` (até `largura_maxima` de largura) dentro do orçamento."""
+    inicio = time.perf_counter()
+    if imagem.width > largura_maxima:
+        tamanho = (largura_maxima, max(1, round(imagem.height * largura_maxima / imagem.width)))
+        imagem = imagem.resize(tamanho, Image.LANCZOS, reducing_gap=3.0)
+    resultado = codificar_com_orcamento(imagem, formato, orcamento_bytes)
+    base, _ = os.path.splitext(caminho_origem)
+    sufixo = f"_{assinatura}" if assinatura else ""
+    saida = f"{base}_web{sufixo}.{EXTENSOES.get(formato, formato.lower())}"
+    gravar_em_blocos(saida, resultado.dados)
+    estatisticas = EstatisticasVariante(saida, imagem.size, len(resultado.dados),
+                                        time.perf_counter() - inicio)
+    return estatisticas, resultado
+
+
+class FonteImagem:
+    """Imagem de um arquivo local, lida e decodificada uma única vez.
+
+    Num pipeline de estratégias (ProcessamentoPipeline em app.py) a mesma
+    fonte passa de etapa em etapa: cada etapa trabalha sobre a imagem em
+    memória deixada pela anterior (`atualizar`), sem reler o arquivo.
+    """
+    def __init__(self, caminho: str):
+        if not disponivel():
+            raise RuntimeError("Pillow não está instalado (pip install pillow)")
+        self.caminho = caminho
+        self.bytes_entrada = 0
+        self._dados: Optional[bytes] = None
+        self._imagem: Optional["Image.Image"] = None
+
+    def _ler(self) -> bytes:
+        if self._dados is None:
+            self._dados = ler_em_blocos(self.caminho)
+            self.bytes_entrada = len(self._dados)
+        return self._dados
+
+    @property
+    def tamanho(self) -> Tuple[int, int]:
+        """Tamanho atual: o da imagem em memória ou, antes de decodificar, o do cabeçalho."""
+        if self._imagem is not None:
+            return self._imagem.size
+        try:
+            with Image.open(io.BytesIO(self._ler())) as cabecalho:
+                return cabecalho.size # Só lê o cabeçalho
+        except Image.DecompressionBombError as erro:
+            raise ValueError(f"{self.caminho}: imagem grande demais ({erro})")
+        except OSError:
+            raise ValueError(f"{self.caminho}: formato de imagem não reconhecido")
+
+    def imagem(self, caixa: Optional[Tuple[int, int]] = None) -> "Image.Image":
+        """Imagem em memória; na primeira chamada decodifica (com draft para `caixa`)."""
+        if self._imagem is None:
+            try:
+                self._imagem = decodificar(self._ler(), caixa)
+            except Image.DecompressionBombError as erro:
+                raise ValueError(f"{self.caminho}: imagem grande demais ({erro})")
+            except OSError:
+                raise ValueError(f"{self.caminho}: formato de imagem não reconhecido")
+            self._dados = None # Os bytes comprimidos não são mais necessários
+        return self._imagem
+
+    def atualizar(self, imagem: "Image.Image") -> None:
+        """Entrega o resultado desta etapa como entrada da próxima."""
+        self._imagem = imagem
+
+
+def gerar_variantes_fonte(fonte: FonteImagem, formato: str = "JPEG", qualidade: int = QUALIDADE_PADRAO,
+                          orcamento_bytes: Optional[int] = None, assinatura: str = "") -> ResultadoVariantes:
+    """Gera as versões responsivas e o placeholder a partir da imagem em memória da fonte.
+
+    Com `orcamento_bytes`, a mesma imagem também gera a versão web dentro do orçamento;
+    ela faz o papel da maior versão, e as responsivas ficam só nas larguras abaixo dela.
+    """
+    imagem = fonte.imagem()
+    larguras = LARGURAS_RESPONSIVAS
+    if orcamento_bytes:
+        largura_orcamento = min(imagem.width, max(LARGURAS_RESPONSIVAS)) # Ver otimizar_para_orcamento
+        larguras = tuple(largura for largura in larguras if largura < largura_orcamento)
+    variantes = gerar_variantes(imagem, fonte.caminho, formato, qualidade, larguras, assinatura)
+    no_orcamento = None
+    if orcamento_bytes:
+        no_orcamento = otimizar_para_orcamento(imagem, fonte.caminho, formato, orcamento_bytes,
+                                               assinatura=assinatura)
+    return ResultadoVariantes(fonte.bytes_entrada, variantes, no_orcamento, gerar_placeholder(imagem))
+
+
+def processar_fonte(fonte: FonteImagem, resolucao: str, compressao: str,
+                    variantes: Optional[List[EstatisticasVariante]] = None,
+                    assinatura: str = "") -> EstatisticasImagem:
+    """Redimensiona a imagem para caber em `resolucao` e grava o JPEG comprimido.
+
+    Se `variantes` for uma lista, as versões responsivas geradas a partir da
+    mesma decodificação são acrescentadas nela; só entram as larguras que
+    cabem em `resolucao` (nenhuma versão sai maior que a imagem principal).
+    A imagem redimensionada fica na fonte, para a próxima etapa. `assinatura`
+    vai no nome dos arquivos gravados.
+    """
+    inicio = time.perf_counter()
+    caixa = ler_resolucao(resolucao)
+    tamanho_origem = fonte.tamanho
+    destino = tamanho_que_cabe(tamanho_origem, caixa)
+    imagem = fonte.imagem(caixa)
+    placeholder = gerar_placeholder(imagem)
+    qualidade = QUALIDADE_POR_COMPRESSAO.get(compressao, QUALIDADE_PADRAO)
+    if variantes is not None:
+        # A largura do próprio destino já é a imagem principal gravada abaixo
+        larguras = tuple(largura for largura in LARGURAS_RESPONSIVAS if largura < destino[0])
+        variantes.extend(gerar_variantes(imagem, fonte.caminho, "JPEG", qualidade, larguras, assinatura))
+    if imagem.size != destino:
+        # LANCZOS com reducing_gap: reduz primeiro por blocos inteiros (rápido), depois filtra
+        imagem = imagem.resize(destino, Image.LANCZOS, reducing_gap=3.0)
+    codificado = codificar_jpeg(imagem, qualidade)
+    saida = caminho_saida(fonte.caminho, destino, assinatura=assinatura)
+    gravar_em_blocos(saida, codificado)
+    fonte.atualizar(imagem)
+    return EstatisticasImagem(saida, tamanho_origem, destino, fonte.bytes_entrada, len(codificado),
+                              time.perf_counter() - inicio, placeholder)
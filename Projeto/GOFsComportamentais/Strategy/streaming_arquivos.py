@@ -0,0 +1,118 @@
+"""Entrega de arquivos locais (vídeos e imagens das mídias) com suporte a HTTP Range.
+
+Nenhum caminho lê o arquivo inteiro para a memória do Python:
+
+- se o servidor WSGI oferece `wsgi.file_wrapper` (gunicorn, uWSGI...) e o
+  trecho pedido vai até o fim do arquivo (o caso do player de vídeo, que
+  pede "bytes=N-"), o arquivo posicionado em N é entregue ao servidor, que
+  usa `os.sendfile` (cópia zero: do page cache direto para o socket);
+- nos demais casos (servidor de desenvolvimento, trechos no meio do arquivo)
+  o arquivo é mapeado com mmap e enviado em fatias de 1 MiB; o sistema
+  operacional só carrega as páginas do trecho pedido, e cada conexão
+  segura no máximo uma fatia por vez.
+
+Só são entregues arquivos dentro da pasta `raiz` informada (links simbólicos
+resolvidos): qualquer outro caminho vira 404.
+"""
+import mimetypes
+import mmap
+import os
+from typing import Iterator, Optional, Tuple
+
+from flask import Response
+from werkzeug.exceptions import NotFound
+from werkzeug.http import http_date, parse_range_header, quote_etag, unquote_etag
+
+TAMANHO_FATIA = 1024 * 1024 # 1 MiB por escrita no socket
+MAX_AGE_SEGUNDOS = 3600
+
+
+def etag_arquivo(info: os.stat_result) -> str:
+    return f"{info.st_size:x}-{info.st_mtime_ns:x}"
+
+
+def _fatias_mmap(caminho: str, inicio: int, fim: int) -> Iterator[bytes]:
+    """Gera fatias de [inicio, fim] (inclusivo) de um mapeamento somente leitura do arquivo."""
+    with open(caminho, "rb") as arquivo, \
+            mmap.mmap(arquivo.fileno(), 0, access=mmap.ACCESS_READ) as mapa:
+        if hasattr(mapa, "madvise") and hasattr(mmap, "MADV_SEQUENTIAL"):
+            mapa.madvise(mmap.MADV_SEQUENTIAL) # Leitura antecipada agressiva
+        for posicao in range(inicio, fim + 1, TAMANHO_FATIA):
+            # Servidores WSGI exigem bytes: uma cópia de no máximo TAMANHO_FATIA por vez
+            yield mapa[posicao:min(posicao + TAMANHO_FATIA, fim + 1)]
+
+
+def _intervalo_pedido(cabecalho_range: Optional[str], cabecalho_if_range: Optional[str],
+                      etag: str, tamanho: int) -> Tuple[Optional[Tuple[int, int]], bool]:
+    """(intervalo inclusivo ou None para o arquivo todo, pedido_insatisfazivel)."""
+    if not cabecalho_range:
+        return None, False
+    if cabecalho_if_range and unquote_etag(cabecalho_if_range)[0] != etag:
+        return None, False # Arquivo mudou desde a primeira parte: manda inteiro
+    pedido = parse_range_header(cabecalho_range)
+    if pedido is None or len(pedido.ranges) != 1:
+        return None, False # Range malformado ou com várias partes: ignora
+    intervalo = pedido.range_for_length(tamanho)
+    if intervalo is None:
+        return None, True
+    inicio, parada = intervalo
+    return (inicio, parada - 1), False
+
+
+def caminho_permitido(caminho: str, raiz: str) -> Optional[str]:
+    """Caminho real do arquivo se ele existir dentro de `raiz`; senão None."""
+    raiz = os.path.realpath(raiz)
+    real = os.path.realpath(caminho)
+    if os.path.commonpath((real, raiz)) != raiz or not os.path.isfile(real):
+        return None
+    return real
+
+
+def resposta_arquivo(environ: dict, caminho: str, raiz: str, mimetype: Optional[str] = None) -> Response:
+    """Response para GET de `caminho`, com ETag/304, Range/206/416 e Accept-Ranges.
+
+    Levanta NotFound (404) se o arquivo não existir ou estiver fora de `raiz`.
+    """
+    caminho = caminho_permitido(caminho, raiz)
+    if caminho is None:
+        raise NotFound()
+    info = os.stat(caminho)
+    tamanho = info.st_size
+    etag = etag_arquivo(info)
+    mimetype = mimetype or mimetypes.guess_type(caminho)[0] or "application/octet-stream"
+    cabecalhos = {
+        "Accept-Ranges": "bytes",
+        "ETag": quote_etag(etag),
+        "Last-Modified": http_date(info.st_mtime),
+        "Cache-Control": f"public, max-age={MAX_AGE_SEGUNDOS}",
+    }
+
+    if_none_match = environ.get("HTTP_IF_NONE_MATCH")
+    if if_none_match and etag in (unquote_etag(valor.strip())[0] for valor in if_none_match.split(",")):
+        return Response(status=304, headers=cabecalhos)
+
+    intervalo, insatisfazivel = _intervalo_pedido(environ.get("HTTP_RANGE"), environ.get("HTTP_IF_RANGE"),
+                                                  etag, tamanho)
+    if insatisfazivel:
+        cabecalhos["Content-Range"] = f"bytes */{tamanho}"
+        return Response(status=416, headers=cabecalhos)
+    status = 200
+    inicio, fim = 0, tamanho - 1
+    if intervalo is not None:
+        inicio, fim = intervalo
+        status = 206
+        cabecalhos["Content-Range"] = f"bytes {inicio}-{fim}/{tamanho}"
+    cabecalhos["Content-Length"] = str(fim - inicio + 1)
+    if tamanho == 0:
+        return Response(b"", status=status, headers=cabecalhos, mimetype=mimetype)
+
+    file_wrapper = environ.get("wsgi.file_wrapper")
+    if file_wrapper is not None and hasattr(os, "sendfile") and fim == tamanho - 1:
+        # O servidor envia a partir da posição atual até o Content-Length (sendfile)
+        arquivo = open(caminho, "rb")
+        arquivo.seek(inicio)
+        corpo = file_wrapper(arquivo, TAMANHO_FATIA)
+    else:
+        corpo = _fatias_mmap(caminho, inicio, fim)
+    return Response(corpo, status=status, headers=cabecalhos, mimetype=mimetype,
+                    direct_passthrough=True)
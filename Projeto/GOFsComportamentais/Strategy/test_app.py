@@ -0,0 +1,354 @@
+"""Testes do app da Strategy.
+
+Rode com o pytest, da pasta do Strategy ou de qualquer pasta acima dela
+(o conftest.py coloca Projeto/ no sys.path):
+
+    python -m pytest Projeto/GOFsComportamentais/Strategy
+"""
+import os
+import re
+import shutil
+import tempfile
+import unittest
+from typing import Tuple
+from unittest import mock
+
+# A pasta de mídias é lida na importação de processamento_imagem
+_RAIZ = tempfile.TemporaryDirectory()
+os.environ["MIDIAS_RAIZ"] = _RAIZ.name
+os.environ.pop("MIDIAS_DB", None)
+
+import app  # noqa: E402
+import processamento_imagem  # noqa: E402
+
+
+class TesteComMemoria(unittest.TestCase):
+    """Base dos testes: cada um roda com memória, ids, caches e logs próprios.
+
+    O estado global do app é trocado por instâncias novas no setUp e volta
+    ao original no fim do teste; as imagens de origem ficam numa subpasta de
+    _RAIZ que também é apagada.
+    """
+    def criar_armazenamento(self) -> app.ArmazenamentoMidias:
+        return app.ArmazenamentoMemoria()
+
+    def setUp(self):
+        self.armazenamento = self.criar_armazenamento()
+        if hasattr(self.armazenamento, "fechar"):
+            self.addCleanup(self.armazenamento.fechar)
+        self.memoria = app.Memoria(self.armazenamento)
+        for nome, valor in (("memoria_global", self.memoria),
+                            ("alocador_ids", app.AlocadorIds(self.memoria.reservar_ids, app.TAMANHO_BLOCO_IDS)),
+                            ("cache_processamento", app.CacheLRU(app.CAPACIDADE_CACHE_PROCESSAMENTO)),
+                            ("cache_fragmentos", app.CacheLRU(app.CAPACIDADE_CACHE_FRAGMENTOS)),
+                            ("app_execution_logs", app.RegistroLogs(app.CAPACIDADE_LOGS))):
+            patcher = mock.patch.object(app, nome, valor)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.pasta = tempfile.mkdtemp(dir=_RAIZ.name)
+        self.addCleanup(shutil.rmtree, self.pasta, ignore_errors=True)
+
+    def criar_imagem(self, nome: str = "foto.jpg", tamanho: Tuple[int, int] = (2000, 1500),
+                     cor: Tuple[int, int, int] = (200, 120, 40), cadastrar: bool = True) -> app.Imagem:
+        """Grava um JPEG na pasta do teste e devolve a Imagem que aponta para ele."""
+        from PIL import Image
+        Image.new("RGB", tamanho, cor).save(os.path.join(self.pasta, nome))
+        url = f"{os.path.basename(self.pasta)}/{nome}"
+        midia = app.Imagem(app.get_next_id(), "JPEG", nome, url, f"{tamanho[0]}x{tamanho[1]}")
+        if cadastrar:
+            app.memoria_global.adicionar_midia(midia)
+        return midia
+
+    def caminho(self, nome: str) -> str:
+        return os.path.join(self.pasta, nome)
+
+
+class ComSQLite:
+    """Mistura para rodar os testes da base com o ArmazenamentoSQLite num banco temporário."""
+    def criar_armazenamento(self):
+        pasta = tempfile.TemporaryDirectory()
+        self.addCleanup(pasta.cleanup)
+        self.caminho_banco = os.path.join(pasta.name, "midias.db")
+        return app.ArmazenamentoSQLite(self.caminho_banco)
+
+
+@unittest.skipUnless(processamento_imagem.disponivel(), "Pillow não está instalado")
+class TestVariantesDoPipeline(TesteComMemoria):
+    def test_card_tem_srcset_das_variantes_do_pipeline(self):
+        midia = self.criar_imagem()
+        pipeline = app.available_processing_strategies["imagem_web_mobile"]()
+        self.assertTrue(app.processar_com_lock(midia, pipeline))
+
+        with app.app.test_request_context():
+            variantes = midia.variantes_web()
+            html = str(app.card_midia_html(midia))
+
+        # A etapa web grava as versões WebP a partir da imagem já reduzida pela etapa de imagem
+        self.assertEqual([largura for largura, _ in variantes], [320, 640, 1280])
+        self.assertTrue(all(url.endswith(".webp") for _, url in variantes))
+        srcset = re.search(r'srcset="([^"]*)"', html)
+        self.assertIsNotNone(srcset)
+        self.assertEqual(srcset.group(1), ", ".join(f"{url} {largura}w" for largura, url in variantes))
+        self.assertIn('loading="lazy"', html)
+        self.assertIn(midia.placeholder, html)
+
+        # As URLs do srcset apontam para arquivos que a rota de variantes serve
+        with app.app.test_client() as cliente:
+            for _, url in variantes:
+                self.assertEqual(cliente.get(url).status_code, 200)
+
+    def test_pool_quebrado_gera_no_processo_e_avisa(self):
+        midia = self.criar_imagem()
+        pool = mock.Mock()
+        pool.submit.side_effect = processamento_imagem.BrokenProcessPool("worker não subiu")
+        with mock.patch.object(processamento_imagem, "_pool_processos", return_value=pool), \
+                self.assertLogs("processamento_imagem", "WARNING") as avisos:
+            self.assertTrue(app.processar_com_lock(midia, app.available_processing_strategies["web_otimizado"]()))
+        self.assertIn("no próprio processo", avisos.output[0])
+        self.assertEqual([largura for largura, _ in midia.variantes], [320, 640, 1280, 1920])
+        self.assertTrue(all(os.path.isfile(caminho) for _, caminho in midia.variantes))
+
+
+@unittest.skipUnless(processamento_imagem.disponivel(), "Pillow não está instalado")
+class TestCacheDeProcessamento(TesteComMemoria):
+    def setUp(self):
+        super().setUp()
+        self.midia = self.criar_imagem("cache.jpg", (800, 600), (10, 90, 160), cadastrar=False)
+        self.strategy = app.available_processing_strategies["imagem_padrao"]()
+
+    def test_arquivo_de_origem_apagado_vira_erro(self):
+        # Apagado entre arquivo_local (que ainda o viu) e a leitura dos metadados
+        os.remove(self.caminho("cache.jpg"))
+        self.midia.set_strategy(self.strategy)
+        with mock.patch.object(app.Imagem, "arquivo_local", new_callable=mock.PropertyMock,
+                               return_value=self.caminho("cache.jpg")):
+            self.assertFalse(self.midia.executar_processamento())
+        self.assertTrue(self.midia.logs_processamento[-1].startswith("❌ Erro no processamento"))
+
+    def test_acerto_com_arquivos_apagados_processa_de_novo(self):
+        self.assertTrue(app.processar_com_lock(self.midia, self.strategy))
+        for _, caminho in self.midia.variantes:
+            os.remove(caminho)
+
+        self.assertTrue(app.processar_com_lock(self.midia, None))
+        self.assertNotIn("♻️ Resultado reaproveitado do cache", self.midia.logs_processamento)
+        self.assertTrue(all(os.path.isfile(caminho) for _, caminho in self.midia.variantes))
+
+    def test_imagem_grande_demais_vira_erro(self):
+        from PIL import Image
+        self.midia.set_strategy(self.strategy)
+        # Acima do dobro do limite o Pillow recusa a imagem (DecompressionBombError)
+        with mock.patch.object(Image, "MAX_IMAGE_PIXELS", 1000):
+            self.assertFalse(self.midia.executar_processamento())
+        self.assertIn("grande demais", self.midia.logs_processamento[-1])
+
+
+@unittest.skipUnless(processamento_imagem.disponivel(), "Pillow não está instalado")
+class TestArquivosGerados(TesteComMemoria):
+    def test_trocar_estrategia_apaga_os_arquivos_antigos(self):
+        midia = self.criar_imagem("troca.jpg", (2400, 1600), (90, 160, 30))
+        self.assertTrue(app.processar_com_lock(midia, app.available_processing_strategies["imagem_web_mobile"]()))
+        antigos = midia.arquivos_gerados
+        self.assertTrue(antigos)
+
+        self.assertTrue(app.processar_com_lock(midia, app.available_processing_strategies["imagem_padrao"]()))
+        self.assertTrue(all(os.path.isfile(caminho) for caminho in midia.arquivos_gerados))
+        for caminho in set(antigos) - set(midia.arquivos_gerados):
+            self.assertFalse(os.path.exists(caminho))
+
+    def test_arquivos_usados_por_outra_midia_ficam(self):
+        estrategia = app.available_processing_strategies["imagem_altares"]()
+        primeira = self.criar_imagem("troca.jpg", (2400, 1600), (90, 160, 30))
+        segunda = app.Imagem(app.get_next_id(), "JPEG", "Troca", primeira.url_arquivo, "2400x1600")
+        app.memoria_global.adicionar_midia(segunda)
+        self.assertTrue(app.processar_com_lock(primeira, estrategia))
+        self.assertTrue(app.processar_com_lock(segunda, estrategia)) # Mesmo resultado (cache)
+
+        self.assertTrue(app.processar_com_lock(primeira, app.available_processing_strategies["imagem_padrao"]()))
+        self.assertTrue(all(os.path.isfile(caminho) for caminho in segunda.arquivos_gerados))
+
+    def test_orcamento_nao_duplica_a_maior_versao(self):
+        midia = self.criar_imagem("troca.jpg", (2400, 1600), (90, 160, 30))
+        self.assertTrue(app.processar_com_lock(midia, app.available_processing_strategies["web_orcamento_100k"]()))
+        larguras = [largura for largura, _ in midia.variantes]
+        self.assertEqual(larguras, [320, 640, 1280, 1920])
+        self.assertIn("_web_", os.path.basename(midia.variantes[-1][1]))
+
+    def test_limpar_a_memoria_apaga_os_arquivos_gerados(self):
+        midia = self.criar_imagem("troca.jpg", (2400, 1600), (90, 160, 30))
+        self.assertTrue(app.processar_com_lock(midia, app.available_processing_strategies["web_otimizado"]()))
+        arquivos = midia.arquivos_gerados
+        self.assertTrue(arquivos)
+
+        app.memoria_global.limpar()
+        self.assertFalse(any(os.path.exists(caminho) for caminho in arquivos))
+
+
+@unittest.skipUnless(processamento_imagem.disponivel(), "Pillow não está instalado")
+class TestArquivosGeradosSQLite(ComSQLite, TestArquivosGerados):
+    def test_recarregar_nao_segura_os_arquivos(self):
+        midia = self.criar_imagem("troca.jpg", (2400, 1600), (90, 160, 30))
+        self.assertTrue(app.processar_com_lock(midia, app.available_processing_strategies["web_otimizado"]()))
+        antigos, midia_id = midia.arquivos_gerados, midia.id
+        del midia
+        for _ in range(3): # Cada leitura monta outro objeto a partir da linha
+            recarregada = self.armazenamento.obter(midia_id)
+            del recarregada
+
+        recarregada = self.armazenamento.obter(midia_id)
+        self.assertTrue(app.processar_com_lock(recarregada, app.available_processing_strategies["imagem_padrao"]()))
+        self.assertFalse(any(os.path.exists(caminho) for caminho in antigos))
+
+    def test_arquivos_usados_em_outro_processo_ficam(self):
+        estrategia = app.available_processing_strategies["imagem_altares"]()
+        primeira = self.criar_imagem("troca.jpg", (2400, 1600), (90, 160, 30))
+        self.assertTrue(app.processar_com_lock(primeira, estrategia))
+        # Outro processo: outro armazenamento (com as suas conexões) no mesmo banco
+        outro = app.ArmazenamentoSQLite(self.caminho_banco)
+        self.addCleanup(outro.fechar)
+        segunda = app.Imagem(app.get_next_id(), "JPEG", "Troca", primeira.url_arquivo, "2400x1600")
+        outro.adicionar(segunda)
+        self.assertTrue(app.processar_com_lock(segunda, estrategia))
+        self.assertEqual(set(segunda.arquivos_gerados), set(primeira.arquivos_gerados))
+
+        self.assertTrue(app.processar_com_lock(primeira, app.available_processing_strategies["imagem_padrao"]()))
+        self.assertTrue(all(os.path.isfile(caminho) for caminho in segunda.arquivos_gerados))
+        outro.limpar()
+        self.assertFalse(any(os.path.exists(caminho) for caminho in segunda.arquivos_gerados))
+
+
+class TestVersoesSQLite(ComSQLite, TesteComMemoria):
+    def test_versoes_nao_se_repetem_depois_de_recarregar(self):
+        vistas = []
+        midia = app.Imagem(1, "BMP", "Logo", "logo.bmp", "800x600")
+        self.armazenamento.adicionar(midia)
+        vistas.append(midia.versao)
+        midia.set_strategy(app.available_processing_strategies["web_otimizado"]())
+        vistas.append(midia.versao)
+        self.assertTrue(app.processar_com_lock(midia, None))
+        vistas.append(midia.versao)
+
+        del midia # Sai do mapa de identidade: a próxima leitura monta outro objeto
+        recarregada = self.armazenamento.obter(1)
+        self.assertEqual(recarregada.versao, vistas[-1])
+        recarregada.set_strategy(app.available_processing_strategies["mobile_otimizado"]())
+        vistas.append(recarregada.versao)
+        self.assertTrue(app.processar_com_lock(recarregada, None))
+        vistas.append(recarregada.versao)
+
+        self.assertEqual(vistas, sorted(set(vistas)))
+        self.assertEqual(self.armazenamento.obter(1).versao, vistas[-1])
+
+
+class TestContagemSQLite(ComSQLite, TesteComMemoria):
+    def test_total_acompanha_cadastros_e_limpeza(self):
+        for numero in range(3):
+            app.memoria_global.adicionar_midia(app.Imagem(app.get_next_id(), "BMP", f"Logo {numero}",
+                                                          "logo.bmp", "800x600"))
+        self.assertEqual(len(app.memoria_global), 3)
+        self.assertIn("Mídias Cadastradas (3)", app.app.test_client().get("/").get_data(as_text=True))
+
+        app.memoria_global.limpar()
+        self.assertEqual(len(app.memoria_global), 0)
+
+    def test_banco_antigo_conta_as_linhas_existentes(self):
+        for numero in range(2):
+            self.armazenamento.adicionar(app.Imagem(numero + 1, "BMP", "Logo", "logo.bmp", "800x600"))
+        con = self.armazenamento._conexao()
+        with con:
+            con.execute("DELETE FROM contadores WHERE nome = 'total_midias'") # Banco de antes do contador
+        reaberto = app.ArmazenamentoSQLite(self.caminho_banco)
+        self.addCleanup(reaberto.fechar)
+        self.assertEqual(reaberto.contar(), 2)
+
+
+class TestInteirosGrandesSQLite(ComSQLite, TesteComMemoria):
+    GRANDE = 99999999999999999999 # Acima do INTEGER de 64 bits do SQLite
+
+    def setUp(self):
+        super().setUp()
+        app.setup_initial_data()
+        self.cliente = app.app.test_client()
+
+    def test_cursor_grande_vira_pagina_vazia(self):
+        resposta = self.cliente.get(f"/?cursor={self.GRANDE}")
+        self.assertEqual(resposta.status_code, 200)
+        self.assertIn("Nenhuma mídia cadastrada.", resposta.get_data(as_text=True))
+
+    def test_ids_grandes_sao_recusados_ou_nao_encontrados(self):
+        resposta = self.cliente.post("/process_batch", json={"strategy_key": "mobile_otimizado",
+                                                             "ids": [1, self.GRANDE]})
+        self.assertEqual(resposta.status_code, 400)
+        resposta = self.cliente.post(f"/process_media/{self.GRANDE}")
+        self.assertEqual(resposta.status_code, 200)
+        self.assertIn("não encontrada", resposta.get_data(as_text=True))
+        self.assertEqual(self.cliente.post("/jobs", json={"media_id": self.GRANDE}).status_code, 404)
+
+
+class TestJobs(TesteComMemoria):
+    def setUp(self):
+        super().setUp()
+        app.setup_initial_data()
+
+    def test_status_final_so_depois_do_resultado(self):
+        vistos = []
+
+        class JobVigiado(app.Job):
+            def __setattr__(self, nome, valor):
+                if nome == "status" and valor in (app.Job.CONCLUIDO, app.Job.FALHOU):
+                    vistos.append((self.concluido_em, self.logs, self.formato_resultado))
+                super().__setattr__(nome, valor)
+
+        job = JobVigiado(1, app.memoria_global.get_midia_by_id(1), None)
+        app.GerenciadorJobs(1, 1)._executar(job)
+        self.assertEqual(job.status, app.Job.CONCLUIDO)
+        concluido_em, logs, formato = vistos[0]
+        self.assertIsNotNone(concluido_em)
+        self.assertTrue(logs)
+        self.assertIsNotNone(formato)
+
+    def test_media_id_booleano_e_recusado(self):
+        cliente = app.app.test_client()
+        self.assertEqual(cliente.post("/jobs", json={"media_id": True}).status_code, 400)
+        self.assertEqual(cliente.post("/jobs", json={"media_id": 1.5}).status_code, 400)
+
+
+class TestDuracaoDoVideo(TesteComMemoria):
+    def adicionar_video(self, duracao):
+        return app.app.test_client().post("/add_media", data={
+            "tipo_midia": "video", "legenda": "Clipe", "formato_original": "MP4", "duracao": duracao})
+
+    def test_relogio_aceita_minutos_e_segundos_validos(self):
+        self.adicionar_video("90:00")
+        self.adicionar_video("1:05:30")
+        self.assertEqual([midia.duracao for midia in app.memoria_global.midias], [5400, 3930])
+
+    def test_campos_do_relogio_acima_de_59_sao_recusados(self):
+        for duracao in ("1:90", "01:60:00", "00:03:75"):
+            self.adicionar_video(duracao)
+        self.assertEqual(len(app.memoria_global), 0)
+
+
+class TestLotePorTipo(TesteComMemoria):
+    def setUp(self):
+        super().setUp()
+        app.setup_initial_data()
+        self.cliente = app.app.test_client()
+
+    def lote(self, tipo):
+        return self.cliente.post("/process_batch", json={"strategy_key": "mobile_otimizado", "tipo": tipo})
+
+    def test_tipo_aceita_minusculas_e_aliases(self):
+        for tipo in ("Vídeo", "video", "VIDEOS"):
+            resposta = self.lote(tipo)
+            self.assertEqual(resposta.status_code, 200, tipo)
+            self.assertEqual(resposta.get_json()["total"], 1, tipo)
+        self.assertEqual(self.lote("fotos").get_json()["total"], 1)
+
+    def test_tipo_desconhecido_e_recusado(self):
+        self.assertEqual(self.lote("áudio").status_code, 400)
+        self.assertEqual(self.lote(3).status_code, 400)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,6 +1,20 @@
 from abc import ABC, abstractmethod
-from typing import List, Optional
-from datetime import datetime
+from bisect import bisect_left, bisect_right
+from typing import Any, Callable, List, Optional, Dict, Tuple
+from datetime import datetime, timedelta
+import inspect
+import os
+import re
+import sys
+import tracemalloc
+
+# `comum` fica em Projeto/: entra no sys.path para o exemplo rodar direto da pasta dele
+_PROJETO = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if _PROJETO not in sys.path:
+    sys.path.append(_PROJETO)
+from comum.busca_textual import IndiceInvertido
+from comum.medidas_midia import ColunasMidias, Totais, interpretar_duracao, interpretar_resolucao, medidas
+from comum.tipos_midia import resolver_tipo
 
 # ===== STRATEGY INTERFACE =====
 
@@ -21,6 +35,12 @@ class ProcessamentoStrategy(ABC):
     def validar(self) -> bool:
         """Valida se a estratégia pode ser executada"""
         pass
+    
+    def __setattr__(self, nome, valor):
+        """Impede alterações em instâncias compartilhadas pelo flyweight"""
+        if getattr(self, '_compartilhada', False):
+            raise AttributeError(f"{type(self).__name__} compartilhada não pode ser alterada")
+        super().__setattr__(nome, valor)
 
 # ===== CONCRETE STRATEGIES =====
 
@@ -102,6 +122,27 @@ class ProcessamentoMobileOptimizado(ProcessamentoStrategy):
     def validar(self) -> bool:
         return True
 
+# ===== FLYWEIGHT DE ESTRATÉGIAS =====
+
+_strategies_compartilhadas: Dict[tuple, ProcessamentoStrategy] = {}
+
+def obter_strategy(classe: type, *parametros) -> ProcessamentoStrategy:
+    """Retorna a instância compartilhada e imutável de `classe` para esses parâmetros"""
+    chave = (classe, parametros)
+    strategy = _strategies_compartilhadas.get(chave)
+    if strategy is None:
+        # Parâmetros omitidos entram com o valor padrão: () e ("WebP",) são a mesma estratégia
+        assinatura = inspect.signature(classe).bind(*parametros)
+        assinatura.apply_defaults()
+        chave_completa = (classe, assinatura.args)
+        strategy = _strategies_compartilhadas.get(chave_completa)
+        if strategy is None:
+            strategy = classe(*parametros)
+            object.__setattr__(strategy, '_compartilhada', True)
+            _strategies_compartilhadas[chave_completa] = strategy
+        _strategies_compartilhadas[chave] = strategy
+    return strategy
+
 # ===== CONTEXT CLASS =====
 
 class MidiaDigital(ABC):
@@ -152,9 +193,10 @@ class Video(MidiaDigital):
         super().__init__(id_midia, formato, legenda)
         self.url_arquivo = url_arquivo
         self.duracao = duracao
+        self.segundos = interpretar_duracao(duracao)
         
-        # Estratégia padrão para vídeos
-        self.set_strategy(ProcessamentoVideo("H.264", 1080))
+        # Estratégia padrão para vídeos (instância compartilhada)
+        self.set_strategy(obter_strategy(ProcessamentoVideo, "H.264", 1080))
     
     def reproduzir(self) -> None:
         """Reproduz o vídeo"""
@@ -174,9 +216,10 @@ class Imagem(MidiaDigital):
         self.url_arquivo = url_arquivo
         self.texto_alternativo = texto_alternativo
         self.resolucao = resolucao
+        self.largura, self.altura = interpretar_resolucao(resolucao)
         
-        # Estratégia padrão para imagens
-        self.set_strategy(ProcessamentoImagem("Alta", "1920x1080"))
+        # Estratégia padrão para imagens (instância compartilhada)
+        self.set_strategy(obter_strategy(ProcessamentoImagem, "Alta", "1920x1080"))
     
     def exibir(self) -> None:
         """Exibe informações da imagem"""
@@ -190,6 +233,19 @@ class Imagem(MidiaDigital):
 
 # ===== ESTRATÉGIAS PARA MEMORIA (OPERAÇÕES DE COLEÇÃO) =====
 
+_EPOCA = datetime(1970, 1, 1)
+_UM_MICROSSEGUNDO = timedelta(microseconds=1)
+
+def _microssegundos(data: datetime) -> int:
+    """Microssegundos desde 1970 (inteiro: comparação exata, sem arredondamento de float)"""
+    return (data - _EPOCA) // _UM_MICROSSEGUNDO
+
+def _hora_local(data: Optional[datetime]) -> Optional[datetime]:
+    """Data com fuso (ex.: "...T00:00+00:00") convertida para a hora local sem fuso, como data_criacao"""
+    if data is None or data.tzinfo is None:
+        return data
+    return data.astimezone().replace(tzinfo=None)
+
 class MemoriaStrategy(ABC):
     """Strategy para operações de coleção na Memoria"""
     
@@ -201,54 +257,224 @@ class MemoriaStrategy(ABC):
     def buscar_midias(self, midias: List[MidiaDigital], criterio: str) -> List[MidiaDigital]:
         pass
 
-class OrganizacaoPorTipo(MemoriaStrategy):
-    """Organiza mídias por tipo"""
+class OrdemIncremental:
+    """Mídias ordenadas por uma chave, mantidas a cada inserção e remoção.
+
+    A chave de cada mídia é calculada uma única vez, na inserção, e guardada
+    numa lista paralela: a posição é achada por busca binária (bisect), sem
+    reordenar a coleção. A chave também fica guardada por mídia, então a
+    remoção acha a posição mesmo que o atributo usado na chave tenha mudado.
+    """
+    
+    def __init__(self, chave: Callable[[MidiaDigital], Any], midias: List[MidiaDigital] = ()):
+        self._calcular_chave = chave
+        pares = sorted(((chave(midia), indice) for indice, midia in enumerate(midias)),
+                       key=lambda par: par[0]) # Estável: chaves iguais na ordem de inserção
+        self.chaves: List[Any] = [chave_midia for chave_midia, _ in pares]
+        self.ordenadas: List[MidiaDigital] = [midias[indice] for _, indice in pares]
+        self._chave_por_midia: Dict[int, Any] = {id(midias[indice]): chave_midia for chave_midia, indice in pares}
+    
+    def adicionar(self, midia: MidiaDigital) -> None:
+        """Insere a mídia na posição certa: O(log n) comparações"""
+        chave = self._calcular_chave(midia)
+        self._chave_por_midia[id(midia)] = chave
+        # bisect_right: chaves iguais ficam na ordem de inserção (como o sorted estável)
+        posicao = bisect_right(self.chaves, chave)
+        self.chaves.insert(posicao, chave)
+        self.ordenadas.insert(posicao, midia)
+    
+    def remover(self, midia: MidiaDigital) -> None:
+        """Tira a mídia da ordem: busca binária até o bloco de chaves iguais"""
+        posicao = bisect_left(self.chaves, self._chave_por_midia.pop(id(midia)))
+        while self.ordenadas[posicao] is not midia:
+            posicao += 1
+        del self.chaves[posicao]
+        del self.ordenadas[posicao]
+
+class OrganizacaoIncremental(MemoriaStrategy):
+    """Estratégia cuja ordem pode ser mantida incrementalmente.
+    
+    A estratégia só define a chave; a ordem (OrdemIncremental) fica na
+    Memoria, uma por classe de estratégia. Assim a mesma instância de
+    estratégia pode ser usada por várias Memorias.
+    """
+    
+    @abstractmethod
+    def chave(self, midia: MidiaDigital) -> Any:
+        """Chave de ordenação (crescente) da mídia"""
+        pass
+    
+    def nova_ordem(self, midias: List[MidiaDigital]) -> OrdemIncremental:
+        return OrdemIncremental(self.chave, midias)
+    
+    def organizar_ordem(self, ordem: OrdemIncremental) -> List[MidiaDigital]:
+        """Ordem já mantida (pela Memoria): nada a ordenar"""
+        return ordem.ordenadas
     
     def organizar_midias(self, midias: List[MidiaDigital]) -> List[MidiaDigital]:
+        # Fora da Memoria: ordena uma vez, sem guardar estado na estratégia
+        return self.organizar_ordem(self.nova_ordem(midias))
+    
+    def buscar_na_ordem(self, ordem: OrdemIncremental, criterio: str) -> List[MidiaDigital]:
+        return self.buscar_midias(ordem.ordenadas, criterio)
+
+class OrganizacaoPorTipo(OrganizacaoIncremental):
+    """Organiza mídias por tipo"""
+    
+    def chave(self, midia: MidiaDigital) -> str:
+        return type(midia).__name__
+    
+    def organizar_ordem(self, ordem: OrdemIncremental) -> List[MidiaDigital]:
         print("📁 Organizando por tipo de mídia...")
-        return sorted(midias, key=lambda x: type(x).__name__)
+        return super().organizar_ordem(ordem)
     
     def buscar_midias(self, midias: List[MidiaDigital], criterio: str) -> List[MidiaDigital]:
         print(f"🔍 Buscando mídias do tipo: {criterio}")
-        return [midia for midia in midias if type(midia).__name__.lower() == criterio.lower()]
+        tipo = resolver_tipo(criterio, {type(midia).__name__ for midia in midias})
+        return [midia for midia in midias if type(midia).__name__ == tipo]
+    
+    def buscar_no_indice(self, por_tipo: Dict[str, List[MidiaDigital]], criterio: str) -> List[MidiaDigital]:
+        """Busca nos baldes por tipo mantidos pela Memoria: O(k) no número de resultados"""
+        print(f"🔍 Buscando mídias do tipo: {criterio}")
+        tipo = resolver_tipo(criterio, por_tipo)
+        return list(por_tipo.get(tipo, ()))
 
-class OrganizacaoPorData(MemoriaStrategy):
-    """Organiza mídias por data de criação"""
+class OrganizacaoPorData(OrganizacaoIncremental):
+    """Organiza mídias por data de criação (mais recentes primeiro)"""
     
-    def organizar_midias(self, midias: List[MidiaDigital]) -> List[MidiaDigital]:
+    def chave(self, midia: MidiaDigital) -> int:
+        # Sinal trocado: ordem crescente = mais recente primeiro
+        return -_microssegundos(midia.data_criacao)
+    
+    def organizar_ordem(self, ordem: OrdemIncremental) -> List[MidiaDigital]:
         print("📅 Organizando por data de criação...")
-        return sorted(midias, key=lambda x: x.data_criacao, reverse=True)
+        return super().organizar_ordem(ordem)
+    
+    # "last 7d", "últimos 12h", "ultimas 2sem"...
+    _RELATIVO = re.compile(r"^(?:last|[úu]ltim[oa]s?)\s*(\d+)\s*(h|d|w|sem)$", re.IGNORECASE)
+    _UNIDADES = {"h": timedelta(hours=1), "d": timedelta(days=1), "w": timedelta(weeks=1), "sem": timedelta(weeks=1)}
+    
+    @classmethod
+    def interpretar_criterio(cls, criterio: str, agora: Optional[datetime] = None
+                             ) -> Tuple[Optional[datetime], Optional[datetime]]:
+        """Converte o critério em (início, fim), ambos inclusivos; None = sem limite.
+        
+        Aceita "2025-01-01..2025-03-31" (dias inteiros; qualquer lado pode ficar
+        vazio), um dia só ("2025-01-01") e janelas relativas como "last 7d".
+        Limites com fuso horário são convertidos para a hora local.
+        """
+        criterio = criterio.strip()
+        relativo = cls._RELATIVO.match(criterio)
+        if relativo:
+            agora = _hora_local(agora) or datetime.now()
+            quantidade, unidade = int(relativo.group(1)), relativo.group(2).lower()
+            return agora - quantidade * cls._UNIDADES[unidade], agora
+        inicio_texto, separador, fim_texto = criterio.partition("..")
+        if not separador:
+            fim_texto = inicio_texto
+        try:
+            inicio = datetime.fromisoformat(inicio_texto.strip()) if inicio_texto.strip() else None
+            fim = datetime.fromisoformat(fim_texto.strip()) if fim_texto.strip() else None
+        except ValueError:
+            raise ValueError(f"Critério de data inválido: {criterio!r} "
+                             "(use 'AAAA-MM-DD..AAAA-MM-DD' ou 'last 7d')")
+        if fim is not None and len(fim_texto.strip()) == 10: # Só a data: inclui o dia inteiro
+            fim += timedelta(days=1) - _UM_MICROSSEGUNDO
+        return _hora_local(inicio), _hora_local(fim)
     
     def buscar_midias(self, midias: List[MidiaDigital], criterio: str) -> List[MidiaDigital]:
+        return self.buscar_na_ordem(self.nova_ordem(midias), criterio)
+    
+    def buscar_na_ordem(self, ordem: OrdemIncremental, criterio: str) -> List[MidiaDigital]:
+        """Mídias criadas na janela do critério, mais recentes primeiro: O(log n + k)"""
         print(f"🔍 Buscando mídias por critério de data: {criterio}")
-        # Implementação simplificada
-        return midias
+        inicio, fim = self.interpretar_criterio(criterio)
+        # As chaves são as datas com sinal trocado: [inicio, fim] vira [-fim, -inicio]
+        baixo = bisect_left(ordem.chaves, -_microssegundos(fim)) if fim is not None else 0
+        alto = bisect_right(ordem.chaves, -_microssegundos(inicio)) if inicio is not None else len(ordem.chaves)
+        return ordem.ordenadas[baixo:alto]
 
 class Memoria:
     """Classe para gerenciar coleção de mídias"""
     
     def __init__(self):
-        self._midias: List[MidiaDigital] = []
+        self._midias: List[MidiaDigital] = [] # Ordem de inserção
+        self._por_tipo: Dict[str, List[MidiaDigital]] = {} # Nome da classe -> mídias (ordem de inserção)
+        self._por_id: Dict[int, MidiaDigital] = {}
+        self._indice_texto = IndiceInvertido() # Busca textual em legenda/texto alternativo
+        self._colunas = ColunasMidias() # Largura/altura/segundos por id, para filtros de faixa
         self._organizacao_strategy: Optional[MemoriaStrategy] = None
+        # Ordens incrementais desta Memoria, uma por classe de estratégia já usada
+        self._ordens: Dict[type, OrdemIncremental] = {}
+        # Ordem devolvida por organizar_midias (None = ordem de inserção). Nas estratégias
+        # incrementais é a própria lista da OrdemIncremental, que continua ordenada a cada inserção.
+        self._ordem_estrategia: Optional[List[MidiaDigital]] = None
     
     def set_organizacao_strategy(self, strategy: MemoriaStrategy) -> None:
         """Define estratégia de organização"""
         self._organizacao_strategy = strategy
+        self._ordem_estrategia = None
+        if isinstance(strategy, OrganizacaoIncremental) and type(strategy) not in self._ordens:
+            self._ordens[type(strategy)] = strategy.nova_ordem(self._midias)
     
     def adicionar_midia(self, midia: MidiaDigital) -> None:
-        """Adiciona mídia à coleção"""
+        """Adiciona mídia à coleção (ValueError, sem alterar nada, se resolução/duração não couberem)"""
+        self._colunas.adicionar(midia.id, *medidas(midia)) # Primeiro: valida antes de mexer no resto
         self._midias.append(midia)
+        self._por_tipo.setdefault(type(midia).__name__, []).append(midia)
+        self._por_id[midia.id] = midia
+        self._indice_texto.adicionar(midia.id, legenda=midia.legenda,
+                                     texto_alternativo=getattr(midia, 'texto_alternativo', None))
+        for ordem in self._ordens.values():
+            ordem.adicionar(midia) # A ordem já fica pronta
         print(f"➕ Mídia adicionada: {midia}")
     
+    def remover_midia(self, midia: MidiaDigital) -> bool:
+        """Remove a mídia da coleção e de todos os índices"""
+        if self._por_id.get(midia.id) is not midia:
+            return False
+        del self._por_id[midia.id]
+        self._midias.remove(midia)
+        self._por_tipo[type(midia).__name__].remove(midia)
+        self._indice_texto.remover(midia.id)
+        self._colunas.remover(midia.id)
+        for ordem in self._ordens.values():
+            ordem.remover(midia)
+        print(f"➖ Mídia removida: {midia}")
+        return True
+    
+    def buscar_texto(self, consulta: str, k: int = 10) -> List[MidiaDigital]:
+        """As k mídias mais relevantes para a consulta (legenda e texto alternativo)"""
+        return [self._por_id[midia_id] for midia_id, _ in self._indice_texto.buscar(consulta, k)]
+    
+    def filtrar_midias(self, resolucao: Optional[str] = None, duracao: Optional[str] = None) -> List[MidiaDigital]:
+        """Mídias por faixa de resolução/duração, ex.: filtrar_midias(">= 1080p", "mais de 10 min")"""
+        return [self._por_id[midia_id] for midia_id in self._colunas.filtrar(resolucao, duracao)]
+    
+    def totais(self, resolucao: Optional[str] = None, duracao: Optional[str] = None) -> Totais:
+        """Quantidade, duração somada (s) e pixels somados das mídias filtradas"""
+        return self._colunas.totais(resolucao, duracao)
+    
     def organizar_midias(self) -> None:
         """Organiza mídias usando a estratégia atual"""
-        if self._organizacao_strategy:
-            self._midias = self._organizacao_strategy.organizar_midias(self._midias)
+        if isinstance(self._organizacao_strategy, OrganizacaoIncremental):
+            self._ordem_estrategia = self._organizacao_strategy.organizar_ordem(
+                self._ordens[type(self._organizacao_strategy)])
+        elif self._organizacao_strategy:
+            self._ordem_estrategia = self._organizacao_strategy.organizar_midias(self._midias)
         else:
             print("⚠️  Nenhuma estratégia de organização definida")
     
+    def _em_ordem(self) -> List[MidiaDigital]:
+        return self._midias if self._ordem_estrategia is None else self._ordem_estrategia
+    
     def buscar_midias(self, criterio: str) -> List[MidiaDigital]:
         """Busca mídias usando a estratégia atual"""
+        if isinstance(self._organizacao_strategy, OrganizacaoPorTipo):
+            return self._organizacao_strategy.buscar_no_indice(self._por_tipo, criterio)
+        if isinstance(self._organizacao_strategy, OrganizacaoIncremental):
+            return self._organizacao_strategy.buscar_na_ordem(
+                self._ordens[type(self._organizacao_strategy)], criterio)
         if self._organizacao_strategy:
             return self._organizacao_strategy.buscar_midias(self._midias, criterio)
         return []
@@ -256,18 +482,18 @@ class Memoria:
     def processar_todas_midias(self) -> None:
         """Processa todas as mídias (cada uma com sua estratégia)"""
         print("\n🔄 Processando todas as mídias...")
-        for midia in self._midias:
+        for midia in self._em_ordem():
             midia.executar_processamento()
     
     def listar_midias(self) -> None:
         """Lista todas as mídias"""
         print("\n📋 Lista de mídias:")
-        for i, midia in enumerate(self._midias, 1):
+        for i, midia in enumerate(self._em_ordem(), 1):
             print(f"{i}. {midia}")
     
     @property
     def midias(self) -> List[MidiaDigital]:
-        return self._midias.copy()
+        return self._em_ordem().copy()
 
 # ===== EXEMPLO DE USO =====
 
@@ -306,9 +532,9 @@ def exemplo_uso():
     print("=" * 60)
     
     # Mudando estratégias
-    video_4k.set_strategy(ProcessamentoVideo("H.265", 2160))  # 4K
-    imagem_logo.set_strategy(ProcessamentoWebOptimizado("WebP"))
-    imagem_banner.set_strategy(ProcessamentoMobileOptimizado())
+    video_4k.set_strategy(obter_strategy(ProcessamentoVideo, "H.265", 2160))  # 4K
+    imagem_logo.set_strategy(obter_strategy(ProcessamentoWebOptimizado, "WebP"))
+    imagem_banner.set_strategy(obter_strategy(ProcessamentoMobileOptimizado))
     
     # Processamento com novas estratégias
     video_4k.executar_processamento()
@@ -326,6 +552,17 @@ def exemplo_uso():
     # Buscando mídias específicas
     videos = memoria.buscar_midias("Video")
     print(f"\n🎬 Vídeos encontrados: {len(videos)}")
+    fotos = memoria.buscar_midias("fotos") # Alias de Imagem
+    print(f"🖼️  Imagens encontradas: {len(fotos)}")
+    
+    # Busca textual (índice invertido: sem acento, plural -> singular)
+    for midia in memoria.buscar_texto("apresentações do produto", k=3):
+        print(f"🔎 {midia}")
+    
+    # Filtros de faixa e totais (resolução/duração já interpretadas na criação)
+    print(f"📐 Imagens >= 1080p: {[str(midia) for midia in memoria.filtrar_midias(resolucao='>= 1080p')]}")
+    print(f"⏱️  Vídeos com mais de 3 min: {[str(midia) for midia in memoria.filtrar_midias(duracao='mais de 3 min')]}")
+    print(f"🧮 Duração total dos vídeos: {memoria.totais().segundos} segundos")
     
     print("\n" + "=" * 60)
     print("▶️ REPRODUZINDO CONTEÚDO")
@@ -344,6 +581,12 @@ def exemplo_uso():
     memoria.set_organizacao_strategy(OrganizacaoPorData())
     memoria.organizar_midias()
     memoria.listar_midias()
+    
+    # Buscando por janela de datas (busca binária no índice de datas)
+    recentes = memoria.buscar_midias("last 7d")
+    print(f"\n📅 Mídias dos últimos 7 dias: {len(recentes)}")
+    hoje = datetime.now().date().isoformat()
+    print(f"📅 Mídias de {hoje}: {len(memoria.buscar_midias(f'{hoje}..{hoje}'))}")
 
 def exemplo_extensibilidade():
     """Demonstra como estender o sistema com novas estratégias"""
@@ -370,9 +613,39 @@ def exemplo_extensibilidade():
     video_especial.set_strategy(ProcessamentoHDR())
     video_especial.executar_processamento()
 
+def _medir_bytes_por_midia(quantidade: int, estrategia_propria: bool) -> float:
+    """Bytes alocados por vídeo criado, com estratégia própria ou compartilhada"""
+    tracemalloc.start()
+    inicio = tracemalloc.get_traced_memory()[0]
+    videos = []
+    for i in range(quantidade):
+        video = Video(i, "MP4", "Vídeo", "video.mp4", 60)
+        if estrategia_propria:
+            # Comportamento antigo: cada mídia aloca seu próprio objeto de estratégia
+            video.set_strategy(ProcessamentoVideo("H.264", 1080))
+        videos.append(video)
+    total = tracemalloc.get_traced_memory()[0] - inicio
+    tracemalloc.stop()
+    return total / quantidade
+
+def exemplo_flyweight(quantidade: int = 100_000):
+    """Compara a memória por mídia com e sem o flyweight de estratégias"""
+    
+    print("\n" + "=" * 60)
+    print("🪶 BENCHMARK DE MEMÓRIA DO FLYWEIGHT DE ESTRATÉGIAS")
+    print("=" * 60)
+    
+    antes = _medir_bytes_por_midia(quantidade, estrategia_propria=True)
+    depois = _medir_bytes_por_midia(quantidade, estrategia_propria=False)
+    print(f"📦 {quantidade} vídeos")
+    print(f"   Estratégia por mídia:    {antes:.1f} bytes/mídia")
+    print(f"   Estratégia compartilhada: {depois:.1f} bytes/mídia")
+    print(f"   Economia:                {antes - depois:.1f} bytes/mídia ({(1 - depois / antes) * 100:.1f}%)")
+
 if __name__ == "__main__":
     exemplo_uso()
     exemplo_extensibilidade()
+    exemplo_flyweight()
     
     print("\n" + "=" * 60)
     print("✅ EXEMPLO CONCLUÍDO!")
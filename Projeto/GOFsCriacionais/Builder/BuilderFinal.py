@@ -1,19 +1,34 @@
 from datetime import date
-from typing import List
+from itertools import count
+from typing import Dict, List
+import os
+import sys
+
+# `comum` fica em Projeto/: entra no sys.path para o exemplo rodar direto da pasta dele
+_PROJETO = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if _PROJETO not in sys.path:
+    sys.path.append(_PROJETO)
+from comum.busca_textual import IndiceInvertido
 
 
 class Usuario:
+    __slots__ = ("nome",)
+
     def __init__(self, nome: str):
         self.nome = nome
 
 
 class Tag:
+    __slots__ = ("id", "nome")
+
     def __init__(self, id: int, nome: str):
         self.id = id
         self.nome = nome
 
 
 class MidiaDigital:
+    __slots__ = ("id", "formato", "legenda")
+
     def __init__(self, id: int, formato: str, legenda: str):
         self.id = id
         self.formato = formato
@@ -21,6 +36,8 @@ class MidiaDigital:
 
 
 class Imagem(MidiaDigital):
+    __slots__ = ("url_arquivo", "texto_alternativo", "resolucao")
+
     def __init__(self, id: int, formato: str, legenda: str, url_arquivo: str, texto_alternativo: str, resolucao: str):
         super().__init__(id, formato, legenda)
         self.url_arquivo = url_arquivo
@@ -29,6 +46,8 @@ class Imagem(MidiaDigital):
 
 
 class Video(MidiaDigital):
+    __slots__ = ("url_arquivo", "duracao")
+
     def __init__(self, id: int, formato: str, legenda: str, url_arquivo: str, duracao: int):
         super().__init__(id, formato, legenda)
         self.url_arquivo = url_arquivo
@@ -36,6 +55,8 @@ class Video(MidiaDigital):
 
 
 class Memoria:
+    __slots__ = ("titulo", "descricao", "status", "autor", "data_envio", "midias", "tags")
+
     def __init__(self, titulo: str, descricao: str, status: str, autor: Usuario, data_envio: date):
         self.titulo = titulo
         self.descricao = descricao
@@ -52,6 +73,43 @@ class Memoria:
         self.midias.append(midia)
 
 
+class AcervoMemorias:
+    """Memórias construídas, com busca textual por título, descrição, legendas e textos alternativos."""
+    def __init__(self):
+        self._memorias: Dict[int, Memoria] = {}
+        self._ids = count(1)
+        self._indice = IndiceInvertido()
+
+    def __len__(self):
+        return len(self._memorias)
+
+    def adicionar(self, memoria: Memoria) -> int:
+        memoria_id = next(self._ids)
+        self._memorias[memoria_id] = memoria
+        self.reindexar(memoria_id)
+        return memoria_id
+
+    def reindexar(self, memoria_id: int):
+        """Atualiza o índice depois de mudar a memória (ex.: adicionar_midia)."""
+        memoria = self._memorias[memoria_id]
+        self._indice.adicionar(memoria_id, titulo=memoria.titulo, descricao=memoria.descricao,
+                               legenda=[midia.legenda for midia in memoria.midias],
+                               texto_alternativo=[getattr(midia, "texto_alternativo", "") for midia in memoria.midias])
+
+    def remover(self, memoria_id: int) -> bool:
+        if self._memorias.pop(memoria_id, None) is None:
+            return False
+        self._indice.remover(memoria_id)
+        return True
+
+    def obter(self, memoria_id: int):
+        return self._memorias.get(memoria_id)
+
+    def buscar_texto(self, consulta: str, k: int = 10) -> List[Memoria]:
+        """As k memórias mais relevantes para a consulta."""
+        return [self._memorias[memoria_id] for memoria_id, _ in self._indice.buscar(consulta, k)]
+
+
 class MemoriaBuilder:
     def __init__(self):
         self._titulo = None
@@ -104,7 +162,10 @@ class MemoriaBuilder:
             memoria.adicionar_tag(tag)
         return memoria
 
-def criar_memoria():
+
+acervo_memorias = AcervoMemorias()
+
+def criar_memoria(acervo: AcervoMemorias = acervo_memorias) -> Memoria:
     print("=== Criação de Memória ===")
 
     nome_autor = input("Digite o nome do autor: ")
@@ -159,9 +220,10 @@ def criar_memoria():
             print("Digite 's' ou 'n'.")
 
     memoria = builder.build()
+    memoria_id = acervo.adicionar(memoria)
 
     # Resumo
-    print("\n=== Memória criada com sucesso ===")
+    print(f"\n=== Memória criada com sucesso (ID {memoria_id} no acervo) ===")
     print(f"Título: {memoria.titulo}")
     print(f"Descrição: {memoria.descricao}")
     print(f"Status: {memoria.status}")
@@ -173,6 +235,23 @@ def criar_memoria():
         print(f" - {tipo} (ID: {midia.id}, Formato: {midia.formato}, Legenda: {midia.legenda})")
 
     print(f"Tags ({len(memoria.tags)}): {[tag.nome for tag in memoria.tags]}")
+    return memoria
+
+def buscar_no_acervo(acervo: AcervoMemorias = acervo_memorias):
+    print(f"\n=== Busca no acervo ({len(acervo)} memórias) ===")
+    while True:
+        consulta = input("Buscar por título, descrição ou legenda (Enter para sair): ")
+        if not consulta:
+            break
+        encontradas = acervo.buscar_texto(consulta)
+        if not encontradas:
+            print("Nenhuma memória encontrada.")
+        for memoria in encontradas:
+            print(f" - {memoria.titulo}: {memoria.descricao} ({memoria.autor.nome})")
 
 if __name__ == "__main__":
-    criar_memoria()
\ No newline at end of file
+    while True:
+        criar_memoria()
+        if input("\nCriar outra memória? (s/n): ").lower() != "s":
+            break
+    buscar_no_acervo()
\ No newline at end of file
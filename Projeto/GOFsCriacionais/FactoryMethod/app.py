@@ -1,11 +1,24 @@
 from flask import Flask, request, jsonify, render_template_string
 from abc import ABC, abstractmethod
 from typing import Optional, Any, Dict
+import os
+import sys
+
+# `comum` fica em Projeto/: entra no sys.path para o exemplo rodar direto da pasta dele
+_PROJETO = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if _PROJETO not in sys.path:
+    sys.path.append(_PROJETO)
+from comum.medidas_midia import (ColunasMidias, formatar_duracao, interpretar_duracao, interpretar_resolucao,
+                                 medidas, validar_medidas)
 
 app = Flask(__name__)
+# Resolução e duração numéricas das mídias enviadas (chave: id da mídia)
+colunas_midias = ColunasMidias()
 
 # Produto
 class MidiaDigital(ABC):
+    __slots__ = ("id", "url", "formato", "legenda")
+
     def __init__(self, id: int, url: str, formato: str, legenda: Optional[str] = None):
         self.id = id
         self.url = url
@@ -17,19 +30,25 @@ class Video(MidiaDigital):
     """
     Representa um arquivo de vídeo, um tipo de MidiaDigital.
     """
+    __slots__ = ("duracao", "segundos")
+
     def __init__(self, id: int, url: str, formato: str, legenda: Optional[str] = None, duracao: str = "00:00"):
         super().__init__(id, url, formato, legenda)
         self.duracao = duracao
+        self.segundos = interpretar_duracao(duracao)
 
 # Produto Concreto 2
 class Imagem(MidiaDigital):
     """
     Representa um arquivo de imagem, um tipo de MidiaDigital.
     """
+    __slots__ = ("resolucao", "textoAlternativo", "largura", "altura")
+
     def __init__(self, id: int, url: str, formato: str, legenda: Optional[str] = None, resolucao: str = "N/A", textoAlternativo: Optional[str] = None):
         super().__init__(id, url, formato, legenda)
         self.resolucao = resolucao
         self.textoAlternativo = textoAlternativo if textoAlternativo and textoAlternativo.strip() else "Imagem sem texto alternativo"
+        self.largura, self.altura = interpretar_resolucao(resolucao)
 
 # Creator (fábrica abstrata)
 class CreateMidiaDigital(ABC):
@@ -308,11 +327,30 @@ def criar_midia_endpoint():
         return jsonify({'message': 'Tipo de mídia inválido.'}), 400
 
     if midia_criada and criador:
+        try:
+            validar_medidas(*medidas(midia_criada))
+        except ValueError as erro:
+            return jsonify({'message': str(erro)}), 400
         msg = criador.enviar()
+        colunas_midias.adicionar(midia_criada.id, *medidas(midia_criada))
         return jsonify({'message': msg, 'status': 'success'})
     else:
         return jsonify({'message': 'Erro ao processar a mídia.'}), 500
 
+@app.route('/midias', methods=['GET'])
+def filtrar_midias_endpoint():
+    """Ids e totais das mídias enviadas, ex.: /midias?resolucao=>=1080p&duracao=mais de 10 min"""
+    filtros = {'resolucao': request.args.get('resolucao', '').strip(),
+               'duracao': request.args.get('duracao', '').strip()}
+    try:
+        ids = colunas_midias.filtrar(**filtros)
+        totais = colunas_midias.totais(**filtros)
+    except ValueError as erro:
+        return jsonify({'message': str(erro)}), 400
+    return jsonify({'ids': sorted(ids), 'quantidade': totais.quantidade,
+                    'duracao_total_segundos': totais.segundos, 'duracao_total': formatar_duracao(totais.segundos),
+                    'pixels_total': totais.pixels})
+
 
 if __name__ == '__main__':
     app.run(debug=True) 
\ No newline at end of file
@@ -1,12 +1,37 @@
-from flask import Flask, request, render_template_string
+from flask import Flask, request, render_template_string, make_response
 from abc import ABC, abstractmethod
 from datetime import date
+from itertools import count
 from typing import List
+import hashlib
+import os
+import sys
+import uuid
+
+# `comum` fica em Projeto/: entra no sys.path para o exemplo rodar direto da pasta dele
+_PROJETO = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if _PROJETO not in sys.path:
+    sys.path.append(_PROJETO)
+from comum.busca_textual import IndiceInvertido
+from comum.medidas_midia import (ColunasMidias, formatar_duracao, interpretar_duracao, interpretar_resolucao,
+                                 medidas, validar_medidas)
 
 app = Flask(__name__)
 memorias_salvas = {}
+# Busca textual nas memórias salvas (título, legendas e textos alternativos)
+indice_memorias = IndiceInvertido()
+# Resolução e duração numéricas das mídias salvas, chave (id da memória, posição da mídia)
+colunas_midias = ColunasMidias()
+# Versões globais: cada memória criada ou alterada recebe um número novo (usado no ETag)
+# (o token do processo evita repetir ETags depois de um restart)
+_versoes_memoria = count(1)
+TOKEN_INSTANCIA = uuid.uuid4().hex[:8]
+# Versão da coleção: a da última memória salva (listagem, busca e filtros dependem de todas)
+versao_colecao = 0
 
 class MidiaDigital(ABC):
+    __slots__ = ("formato", "legenda")
+
     def __init__(self, formato: str, legenda: str):
         self.formato = formato
         self.legenda = legenda
@@ -15,26 +40,35 @@ class MidiaDigital(ABC):
     def exibir(self):
         pass
 
+
 class Video(MidiaDigital):
+    __slots__ = ("urlArquivo", "duracao", "segundos")
+
     def __init__(self, formato: str, legenda: str, urlArquivo: str, duracao: str):
         super().__init__(formato, legenda)
         self.urlArquivo = urlArquivo
         self.duracao = duracao
+        self.segundos = interpretar_duracao(duracao)
 
     def exibir(self):
         return f"[Vídeo] URL: {self.urlArquivo}, Duração: {self.duracao}, Legenda: {self.legenda}, Formato: {self.formato}"
 
 class Imagem(MidiaDigital):
+    __slots__ = ("urlArquivo", "textoAlternativo", "resolucao", "largura", "altura")
+
     def __init__(self, formato: str, legenda: str, urlArquivo: str, textoAlternativo: str, resolucao: str):
         super().__init__(formato, legenda)
         self.urlArquivo = urlArquivo
         self.textoAlternativo = textoAlternativo
         self.resolucao = resolucao
+        self.largura, self.altura = interpretar_resolucao(resolucao)
 
     def exibir(self):
         return f"[Imagem] URL: {self.urlArquivo}, Resolução: {self.resolucao}, Texto Alt: {self.textoAlternativo}, Legenda: {self.legenda}"
 
 class Memoria:
+    __slots__ = ("id", "titulo", "legenda", "status", "autor", "dataEnvio", "midias", "tags", "versao")
+
     def __init__(self, id: int, titulo: str, legenda: str, status: str, autor: str, dataEnvio: date):
         self.id = id
         self.titulo = titulo
@@ -44,12 +78,33 @@ class Memoria:
         self.dataEnvio = dataEnvio
         self.midias: List[MidiaDigital] = []
         self.tags = []
+        self.versao = next(_versoes_memoria)
 
     def addMidiaDigital(self, midia: MidiaDigital):
         self.midias.append(midia)
+        self.versao = next(_versoes_memoria)
 
     def adicionarTag(self, tag: str):
         self.tags.append(tag)
+        self.versao = next(_versoes_memoria)
+
+    def indexar(self, indice: IndiceInvertido) -> None:
+        """(Re)indexa a memória com os textos dela e das suas mídias."""
+        indice.adicionar(self.id, titulo=self.titulo,
+                         legenda=[self.legenda] + [midia.legenda for midia in self.midias],
+                         texto_alternativo=[getattr(midia, 'textoAlternativo', '') for midia in self.midias])
+
+    def registrar_medidas(self, colunas: ColunasMidias) -> None:
+        """Grava resolução e duração das mídias nas colunas (chave: (id, posição))."""
+        for posicao, midia in enumerate(self.midias):
+            colunas.adicionar((self.id, posicao), *medidas(midia))
+
+    def remover_medidas(self, colunas: ColunasMidias) -> None:
+        for posicao in range(len(self.midias)):
+            colunas.remover((self.id, posicao))
+
+    def etag(self) -> str:
+        return f"memoria-{self.id}-{TOKEN_INSTANCIA}-v{self.versao}"
 
     def exibir(self):
         media_exibidas = [midia.exibir() for midia in self.midias]
@@ -64,6 +119,11 @@ class Memoria:
             "midias": media_exibidas
         }
 
+def etag_colecao() -> str:
+    """ETag das páginas que leem a coleção inteira: versão da coleção + parâmetros da query string."""
+    consulta = hashlib.sha1(request.query_string).hexdigest()[:12]
+    return f"colecao-{TOKEN_INSTANCIA}-v{versao_colecao}-{consulta}"
+
 HTML = """
 <!DOCTYPE html>
 <html lang="pt-br">
@@ -116,6 +176,44 @@ HTML = """
         <button type="submit">Buscar</button>
     </form>
 
+    <h1>Buscar por Texto</h1>
+    <form method="GET">
+        <label>Palavras (título, legendas, texto alternativo)</label>
+        <input name="q" value="{{ consulta or '' }}" required>
+        <button type="submit">Buscar</button>
+    </form>
+
+    {% if resultados is not none %}
+    <div class="output">
+        <h2>{{ resultados | length }} resultado(s) para "{{ consulta }}":</h2>
+        {% for item in resultados %}
+        <p>#{{ item.id }} - {{ item.titulo }} ({{ item.pontuacao }})</p>
+        {% endfor %}
+    </div>
+    {% endif %}
+
+    <h1>Filtrar Mídias</h1>
+    <form method="GET">
+        <label>Resolução (ex.: &gt;= 1080p, &lt; 1920x1080)</label>
+        <input name="resolucao" value="{{ filtro.resolucao if filtro else '' }}">
+        <label>Duração (ex.: mais de 10 min, &lt;= 00:05:00)</label>
+        <input name="duracao" value="{{ filtro.duracao if filtro else '' }}">
+        <button type="submit">Filtrar</button>
+    </form>
+
+    {% if filtro %}
+    <div class="output">
+        {% if filtro.erro %}
+        <h2>{{ filtro.erro }}</h2>
+        {% else %}
+        <h2>{{ filtro.totais.quantidade }} mídia(s) - duração total {{ filtro.duracao_total }}, {{ "%.1f" | format(filtro.totais.pixels / 1000000) }} megapixels</h2>
+        {% for item in filtro.midias %}
+        <p>Memória #{{ item.memoria }}: {{ item.descricao }}</p>
+        {% endfor %}
+        {% endif %}
+    </div>
+    {% endif %}
+
     {% if memoria %}
     <div class="output">
         <h2>Memória encontrada:</h2>
@@ -164,7 +262,21 @@ function adicionarMidia() {
 
 @app.route('/', methods=['GET', 'POST'])
 def index():
+    global versao_colecao
     memoria = None
+    consulta = None
+    resultados = None
+    filtro = None
+    etag = None
+    if request.method == 'GET' and 'id' not in request.args:
+        # GET condicional da listagem, da busca (?q=) e dos filtros: nenhuma memória
+        # salva desde a última visita -> 304 sem buscar nem renderizar
+        etag = etag_colecao()
+        if request.if_none_match.contains_weak(etag):
+            resposta = make_response('', 304)
+            resposta.set_etag(etag, weak=True)
+            return resposta
+
     if request.method == 'POST':
         data = request.form
         id = int(data['id'])
@@ -196,14 +308,57 @@ def index():
         for tag in tags.split(','):
             memoria.adicionarTag(tag.strip())
 
+        try:
+            for midia in memoria.midias: # Antes de salvar: nada é gravado pela metade
+                validar_medidas(*medidas(midia))
+        except ValueError as erro:
+            return make_response(str(erro), 400)
+
+        anterior = memorias_salvas.get(id)
+        if anterior:
+            anterior.remover_medidas(colunas_midias)
         memorias_salvas[id] = memoria
+        memoria.indexar(indice_memorias) # Substitui a entrada anterior com o mesmo id
+        memoria.registrar_medidas(colunas_midias)
+        versao_colecao = memoria.versao
+
+    elif request.method == 'GET' and request.args.get('q', '').strip():
+        consulta = request.args['q'].strip()
+        resultados = [{"id": memoria_id, "titulo": memorias_salvas[memoria_id].titulo, "pontuacao": round(pontuacao, 3)}
+                      for memoria_id, pontuacao in indice_memorias.buscar(consulta, k=20)]
+
+    elif request.method == 'GET' and (request.args.get('resolucao', '').strip() or
+                                      request.args.get('duracao', '').strip()):
+        # Filtros de faixa sobre as colunas numéricas (nenhuma string é reinterpretada aqui)
+        filtros = {"resolucao": request.args.get('resolucao', '').strip(),
+                   "duracao": request.args.get('duracao', '').strip()}
+        try:
+            chaves = colunas_midias.filtrar(**filtros)
+            totais = colunas_midias.totais(**filtros)
+            filtro = dict(filtros, erro=None, totais=totais, duracao_total=formatar_duracao(totais.segundos),
+                          midias=[{"memoria": memoria_id, "descricao": memorias_salvas[memoria_id].midias[posicao].exibir()}
+                                  for memoria_id, posicao in sorted(chaves)])
+        except ValueError as erro:
+            filtro = dict(filtros, erro=str(erro))
 
     elif request.method == 'GET' and 'id' in request.args:
         id_param = request.args.get('id')
         if id_param and id_param.isdigit():
             memoria = memorias_salvas.get(int(id_param))
-
-    return render_template_string(HTML, memoria=memoria.exibir() if memoria else None)
+            # GET condicional por memória: sem mudanças desde a última busca -> 304 sem renderizar
+            if memoria and request.if_none_match.contains_weak(memoria.etag()):
+                resposta = make_response('', 304)
+                resposta.set_etag(memoria.etag(), weak=True)
+                return resposta
+
+    resposta = make_response(render_template_string(HTML, memoria=memoria.exibir() if memoria else None,
+                                                    consulta=consulta, resultados=resultados, filtro=filtro))
+    if memoria and request.method == 'GET':
+        etag = memoria.etag()
+    if etag:
+        resposta.set_etag(etag, weak=True)
+        resposta.headers['Cache-Control'] = 'no-cache' # Sempre revalidar com o ETag
+    return resposta
 
 if __name__ == '__main__':
     app.run(debug=True)
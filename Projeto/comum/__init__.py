@@ -0,0 +1,5 @@
+"""Código compartilhado entre os módulos dos padrões (Strategy, Composite, Builder...).
+
+Importável com Projeto/ no PYTHONPATH; `python Projeto/executar.py <exemplo>`
+faz isso por você.
+"""
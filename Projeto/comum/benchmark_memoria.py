@@ -0,0 +1,158 @@
+"""Benchmark de memória das classes de domínio com `__slots__`.
+
+As classes de domínio dos exemplos declaram `__slots__` para não carregar um
+`__dict__` por instância: em coleções com milhões de mídias isso ocupa bem
+menos memória. Este script mede quanto.
+
+Para cada classe (MidiaDigital, Video, Imagem, Memoria, Tag, Usuario dos
+módulos Builder, Composite, FactoryMethod e Strategy) compara quantos bytes
+cada objeto ocupa:
+
+- antes: uma classe comum (com `__dict__` por instância), preenchida com os
+  mesmos atributos na mesma ordem do `__init__` original;
+- depois: a própria classe do módulo, que declara `__slots__`.
+
+Os valores dos atributos (strings, listas...) são compartilhados entre as
+cópias, então a diferença medida é só a "casca" de cada objeto, que é o que
+muda com `__slots__`. A medição usa tracemalloc sobre N objetos vivos.
+
+Uso: python Projeto/executar.py benchmark-memoria [quantidade]
+"""
+import gc
+import importlib.util
+import os
+import sys
+import tracemalloc
+from datetime import date
+from typing import Callable, Dict, List, NamedTuple, Tuple
+
+QUANTIDADE_PADRAO = 100_000
+
+PROJETO = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+_classes_com_dict: Dict[type, type] = {}
+
+
+class Medicao(NamedTuple):
+    modulo: str
+    classe: str
+    bytes_com_dict: float
+    bytes_com_slots: float
+
+    @property
+    def economia(self) -> float:
+        return 1 - self.bytes_com_slots / self.bytes_com_dict
+
+
+def atributos_slots(classe: type) -> List[str]:
+    """Atributos declarados em `__slots__` na hierarquia, da base para a subclasse."""
+    nomes = []
+    for base in reversed(classe.__mro__):
+        slots = base.__dict__.get("__slots__", ())
+        for nome in (slots,) if isinstance(slots, str) else slots:
+            if nome not in ("__dict__", "__weakref__") and nome not in nomes:
+                nomes.append(nome)
+    return nomes
+
+
+def _copiar_atributos(origem, destino) -> None:
+    for nome in atributos_slots(type(origem)):
+        if hasattr(origem, nome):
+            setattr(destino, nome, getattr(origem, nome))
+
+
+def copia_com_slots(objeto):
+    copia = object.__new__(type(objeto))
+    _copiar_atributos(objeto, copia)
+    return copia
+
+
+def copia_com_dict(objeto):
+    """O mesmo objeto como seria sem `__slots__` (instância comum, com `__dict__`)."""
+    classe = type(objeto)
+    if classe not in _classes_com_dict:
+        _classes_com_dict[classe] = type(classe.__name__, (), {})
+    copia = _classes_com_dict[classe]()
+    _copiar_atributos(objeto, copia)
+    return copia
+
+
+def bytes_por_objeto(criar: Callable[[], object], quantidade: int) -> float:
+    """Memória alocada por objeto para manter `quantidade` objetos vivos."""
+    objetos = [None] * quantidade
+    gc.collect()
+    tracemalloc.start()
+    try:
+        inicio = tracemalloc.get_traced_memory()[0]
+        for i in range(quantidade):
+            objetos[i] = criar()
+        fim = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    return (fim - inicio) / quantidade
+
+
+def medir(modulo: str, objeto, quantidade: int = QUANTIDADE_PADRAO) -> Medicao:
+    if hasattr(objeto, "__dict__"):
+        raise TypeError(f"{modulo}.{type(objeto).__name__} ainda tem __dict__ por instância")
+    copia_com_dict(objeto) # Monta a classe (e as chaves compartilhadas) fora da medição
+    return Medicao(modulo, type(objeto).__name__,
+                   bytes_por_objeto(lambda: copia_com_dict(objeto), quantidade),
+                   bytes_por_objeto(lambda: copia_com_slots(objeto), quantidade))
+
+
+def _carregar_modulo(nome: str, caminho_relativo: str):
+    """Importa um módulo pelo caminho (vários apps se chamam app.py)."""
+    caminho = os.path.join(PROJETO, caminho_relativo)
+    pasta = os.path.dirname(caminho)
+    if pasta not in sys.path:
+        sys.path.insert(0, pasta) # Módulos auxiliares ao lado do app (ex.: processamento_imagem)
+    especificacao = importlib.util.spec_from_file_location(nome, caminho)
+    modulo = importlib.util.module_from_spec(especificacao)
+    especificacao.loader.exec_module(modulo)
+    return modulo
+
+
+def exemplos() -> List[Tuple[str, object]]:
+    """(módulo, objeto de exemplo) para cada classe de domínio medida."""
+    builder = _carregar_modulo("builder_final", "GOFsCriacionais/Builder/BuilderFinal.py")
+    composite = _carregar_modulo("composite_app", "GOFsEstruturais/Composite/app.py")
+    factory = _carregar_modulo("factory_method_app", "GOFsCriacionais/FactoryMethod/app.py")
+    strategy = _carregar_modulo("strategy_app", "GOFsComportamentais/Strategy/app.py")
+
+    autor = builder.Usuario("Ana")
+    memoria_builder = builder.Memoria("Formatura", "Colação de grau", "Pendente", autor, date.today())
+    memoria_composite = composite.Memoria(1, "Formatura", "Colação de grau", "Pendente", "Ana", date.today())
+    return [
+        ("Builder", autor),
+        ("Builder", builder.Tag(1, "formatura")),
+        ("Builder", builder.Imagem(1, "jpg", "Turma", "turma.jpg", "Foto da turma", "1920x1080")),
+        ("Builder", builder.Video(2, "mp4", "Discurso", "discurso.mp4", 225)),
+        ("Builder", memoria_builder),
+        ("Composite", composite.Imagem("jpg", "Turma", "turma.jpg", "Foto da turma", "1920x1080")),
+        ("Composite", composite.Video("mp4", "Discurso", "discurso.mp4", "00:03:45")),
+        ("Composite", memoria_composite),
+        ("FactoryMethod", factory.Imagem(1, "turma.jpg", "jpg", "Turma", "1920x1080", "Foto da turma")),
+        ("FactoryMethod", factory.Video(2, "discurso.mp4", "mp4", "Discurso", "00:03:45")),
+        ("Strategy", strategy.Imagem(1, "JPEG", "Turma", "turma.jpg", "1920x1080")),
+        ("Strategy", strategy.Video(2, "MP4", "Discurso", "discurso.mp4", 225)),
+    ]
+
+
+def main(quantidade: int = QUANTIDADE_PADRAO) -> List[Medicao]:
+    medicoes = [medir(modulo, objeto, quantidade) for modulo, objeto in exemplos()]
+    print(f"Bytes por objeto ({quantidade} objetos vivos, sem contar os valores dos atributos)")
+    print(f"{'Módulo':<14} {'Classe':<8} {'__dict__':>9} {'__slots__':>10} {'Economia':>9}")
+    for medicao in medicoes:
+        print(f"{medicao.modulo:<14} {medicao.classe:<8} {medicao.bytes_com_dict:>9.1f} "
+              f"{medicao.bytes_com_slots:>10.1f} {medicao.economia:>9.0%}")
+    midias = [medicao for medicao in medicoes if medicao.classe in ("Imagem", "Video")]
+    antes = sum(medicao.bytes_com_dict for medicao in midias) / len(midias)
+    depois = sum(medicao.bytes_com_slots for medicao in midias) / len(midias)
+    print(f"\nMédia por mídia: {antes:.1f} -> {depois:.1f} bytes "
+          f"({1 - depois / antes:.0%} a menos; {(antes - depois) * 1_000_000 / 2**20:.0f} MiB por milhão de mídias)")
+    return medicoes
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else QUANTIDADE_PADRAO)
@@ -0,0 +1,147 @@
+"""Índice invertido em memória para busca textual em mídias e memórias.
+
+Usado pelas Memorias dos módulos Strategy, Composite e Builder para buscar
+por `legenda`, `texto_alternativo`, `titulo` e `descricao` sem varrer a
+coleção inteira:
+
+- tokenização para português: acentos e maiúsculas são ignorados
+  ("Formatura", "formatúra" e "FORMATURA" são o mesmo termo), stopwords
+  comuns (de, da, com, para...) são descartadas e plurais regulares viram
+  singular ("formaturas" -> "formatura", "emoções" -> "emocao");
+- atualização incremental: `adicionar`, `remover` e `atualizar` mexem só
+  nas listas de postings dos termos do documento;
+- resultados ranqueados (BM25) e só os k melhores são ordenados (heapq).
+
+Uma busca custa proporcional ao tamanho das listas dos termos consultados,
+não ao tamanho da coleção.
+"""
+import heapq
+import math
+import re
+import unicodedata
+from collections import Counter
+from typing import Dict, Hashable, Iterable, List, Optional, Tuple, Union
+
+STOPWORDS = frozenset("""
+    a o as os um uma uns umas de da do das dos em na no nas nos num numa
+    ao aos à às e ou que se com sem para pra por pelo pela pelos pelas
+    sobre entre ate apos mais muito meu minha seu sua nosso nossa
+""".split())
+
+# Peso de cada campo na relevância (campos não listados valem 1)
+PESOS_CAMPOS = {"titulo": 2.0, "legenda": 1.5}
+
+# Parâmetros usuais do BM25
+K1 = 1.2
+B = 0.75
+
+_PALAVRA = re.compile(r"[a-z0-9]+")
+
+# Plurais regulares (já sem acento): sufixo -> substituto, testados em ordem
+_PLURAIS = (("oes", "ao"), ("aes", "ao"), ("ais", "al"), ("eis", "el"), ("ois", "ol"),
+            ("ns", "m"), ("res", "r"), ("zes", "z"), ("s", ""))
+
+Texto = Union[str, Iterable[str], None]
+
+
+def remover_acentos(texto: str) -> str:
+    decomposto = unicodedata.normalize("NFKD", texto)
+    return "".join(caractere for caractere in decomposto if not unicodedata.combining(caractere))
+
+
+def _singular(palavra: str) -> str:
+    if len(palavra) <= 3 or palavra.isdigit():
+        return palavra
+    for sufixo, substituto in _PLURAIS:
+        if palavra.endswith(sufixo) and not palavra.endswith("ss"):
+            return palavra[:-len(sufixo)] + substituto
+    return palavra
+
+
+def tokenizar(texto: str) -> List[str]:
+    """Termos normalizados do texto (sem acento, minúsculos, sem stopwords, no singular)."""
+    palavras = _PALAVRA.findall(remover_acentos(texto).casefold())
+    return [_singular(palavra) for palavra in palavras if palavra not in STOPWORDS]
+
+
+class IndiceInvertido:
+    """Termo -> {documento: frequência ponderada}, com ranqueamento BM25.
+
+    Os documentos são identificados por qualquer valor hashable (normalmente
+    o id da mídia ou da memória); os campos são passados por nome, e cada
+    um pode ser um texto ou uma sequência de textos (ex.: as legendas de
+    todas as mídias de uma memória).
+    """
+
+    def __init__(self, pesos: Optional[Dict[str, float]] = None):
+        self.pesos = PESOS_CAMPOS if pesos is None else pesos
+        self._postings: Dict[str, Dict[Hashable, float]] = {}
+        self._termos_documento: Dict[Hashable, Dict[str, float]] = {}
+        self._tamanho_documento: Dict[Hashable, float] = {}
+        self._tamanho_total = 0.0
+
+    def __len__(self) -> int:
+        return len(self._termos_documento)
+
+    def __contains__(self, documento: Hashable) -> bool:
+        return documento in self._termos_documento
+
+    def adicionar(self, documento: Hashable, **campos: Texto) -> None:
+        """Indexa o documento (se já existir, é reindexado)."""
+        if documento in self._termos_documento:
+            self.remover(documento)
+        frequencias: Counter = Counter()
+        for nome, valor in campos.items():
+            if not valor:
+                continue
+            textos = (valor,) if isinstance(valor, str) else valor
+            peso = self.pesos.get(nome, 1.0)
+            for texto in textos:
+                for termo in tokenizar(texto or ""):
+                    frequencias[termo] += peso
+        termos = dict(frequencias)
+        self._termos_documento[documento] = termos
+        tamanho = sum(termos.values())
+        self._tamanho_documento[documento] = tamanho
+        self._tamanho_total += tamanho
+        for termo, frequencia in termos.items():
+            self._postings.setdefault(termo, {})[documento] = frequencia
+
+    atualizar = adicionar
+
+    def remover(self, documento: Hashable) -> bool:
+        """Tira o documento do índice. Retorna False se ele não estava indexado."""
+        termos = self._termos_documento.pop(documento, None)
+        if termos is None:
+            return False
+        self._tamanho_total -= self._tamanho_documento.pop(documento)
+        for termo in termos:
+            postings = self._postings[termo]
+            del postings[documento]
+            if not postings:
+                del self._postings[termo]
+        return True
+
+    def limpar(self) -> None:
+        self._postings.clear()
+        self._termos_documento.clear()
+        self._tamanho_documento.clear()
+        self._tamanho_total = 0.0
+
+    def buscar(self, consulta: str, k: int = 10) -> List[Tuple[Hashable, float]]:
+        """Os k documentos mais relevantes para a consulta: [(documento, pontuação)]."""
+        total = len(self._termos_documento)
+        if total == 0 or k <= 0:
+            return []
+        tamanho_medio = self._tamanho_total / total or 1.0
+        pontuacoes: Dict[Hashable, float] = {}
+        for termo in set(tokenizar(consulta)):
+            postings = self._postings.get(termo)
+            if not postings:
+                continue
+            idf = math.log(1 + (total - len(postings) + 0.5) / (len(postings) + 0.5))
+            for documento, frequencia in postings.items():
+                normalizacao = K1 * (1 - B + B * self._tamanho_documento[documento] / tamanho_medio)
+                pontuacoes[documento] = pontuacoes.get(documento, 0.0) + \
+                    idf * frequencia * (K1 + 1) / (frequencia + normalizacao)
+        return heapq.nlargest(k, pontuacoes.items(), key=lambda item: item[1])
@@ -0,0 +1,265 @@
+"""Resolução e duração das mídias como números, em colunas compactas.
+
+Cada módulo guarda `resolucao` e `duracao` do jeito que vieram do usuário
+("1920x1080", "1080p", "00:03:45", "05:30", "2min", 225...). Aqui esses
+valores são interpretados uma única vez, na criação da mídia, em largura,
+altura e segundos; `ColunasMidias` guarda esses números em `array`s (4
+bytes por valor, sem um objeto int por mídia) e responde filtros de faixa
+(">= 1080p", "mais de 10 min", "longer than 10 min") e totais percorrendo
+as colunas com `map`/`compress`, que rodam o laço em C, sem reinterpretar
+texto linha a linha.
+
+Valores que não dá para interpretar viram 0 (desconhecido) e nunca passam
+num filtro. Valores que não cabem nas colunas (negativos ou acima de
+VALOR_MAXIMO) são recusados com ValueError antes de qualquer alteração.
+"""
+import operator
+import re
+from array import array
+from itertools import compress, repeat
+from typing import Callable, Dict, Hashable, List, NamedTuple, Optional, Tuple, Union
+
+from comum.busca_textual import remover_acentos
+
+DESCONHECIDO = 0
+TIPO_COLUNA = "I" # Inteiro sem sinal de 4 bytes
+VALOR_MAXIMO = 2 ** (8 * array(TIPO_COLUNA).itemsize) - 1
+
+# Nomes comuns de resolução -> (largura, altura)
+RESOLUCOES_NOMEADAS: Dict[str, Tuple[int, int]] = {
+    "8k": (7680, 4320), "4k": (3840, 2160), "uhd": (3840, 2160), "2k": (2560, 1440),
+    "qhd": (2560, 1440), "fullhd": (1920, 1080), "fhd": (1920, 1080), "hd": (1280, 720),
+    "sd": (720, 480),
+}
+
+_SEGUNDOS_POR_UNIDADE = {
+    "h": 3600, "hr": 3600, "hrs": 3600, "hora": 3600, "horas": 3600, "hour": 3600, "hours": 3600,
+    "m": 60, "min": 60, "mins": 60, "minuto": 60, "minutos": 60, "minute": 60, "minutes": 60,
+    "s": 1, "seg": 1, "segs": 1, "segundo": 1, "segundos": 1, "sec": 1, "secs": 1,
+    "second": 1, "seconds": 1,
+}
+
+_LARGURA_ALTURA = re.compile(r"^(\d+)\s*[x×*]\s*(\d+)$")
+_LINHAS = re.compile(r"^(\d+)\s*[pi]?$") # "1080p", "1080i", "720"
+# "05:30", "00:03:45": só o primeiro campo passa de 59 ("90:00" = 90 min; "1:90" não vale)
+_RELOGIO = re.compile(r"^\d+(:[0-5]?\d){1,2}$")
+_QUANTIDADE_UNIDADE = re.compile(r"(\d+(?:[.,]\d+)?)\s*([a-z]+)")
+
+# Operadores dos filtros: símbolos e equivalentes por extenso (já sem acento, minúsculos)
+_OPERADORES = (
+    (">=", operator.ge), ("<=", operator.le), ("==", operator.eq),
+    (">", operator.gt), ("<", operator.lt), ("=", operator.eq),
+    ("pelo menos", operator.ge), ("no minimo", operator.ge), ("at least", operator.ge),
+    ("no maximo", operator.le), ("ate", operator.le), ("at most", operator.le),
+    ("mais longo que", operator.gt), ("mais longos que", operator.gt), ("longer than", operator.gt),
+    ("mais de", operator.gt), ("acima de", operator.gt), ("more than", operator.gt),
+    ("above", operator.gt),
+    ("mais curto que", operator.lt), ("mais curtos que", operator.lt), ("shorter than", operator.lt),
+    ("menos de", operator.lt), ("abaixo de", operator.lt), ("less than", operator.lt),
+    ("below", operator.lt),
+)
+
+Comparacao = Callable[[int, int], bool]
+
+
+def _normalizar(texto: str) -> str:
+    return " ".join(remover_acentos(texto).casefold().split())
+
+
+def interpretar_resolucao(valor: Union[str, Tuple[int, int], None]) -> Tuple[int, int]:
+    """(largura, altura) de "1920x1080", "1080p", "4K"...; (0, 0) se não reconhecer."""
+    if isinstance(valor, tuple):
+        return int(valor[0]), int(valor[1])
+    texto = _normalizar(str(valor or "")).replace(" ", "")
+    if texto in RESOLUCOES_NOMEADAS:
+        return RESOLUCOES_NOMEADAS[texto]
+    encontrado = _LARGURA_ALTURA.match(texto)
+    if encontrado:
+        return int(encontrado.group(1)), int(encontrado.group(2))
+    encontrado = _LINHAS.match(texto)
+    if encontrado:
+        altura = int(encontrado.group(1))
+        return round(altura * 16 / 9), altura # Só as linhas: supõe 16:9
+    return DESCONHECIDO, DESCONHECIDO
+
+
+def interpretar_duracao(valor: Union[str, int, float, None]) -> int:
+    """Segundos de 225, "225", "05:30" (mm:ss), "00:03:45", "2min", "1h30min"...; 0 se não reconhecer."""
+    if isinstance(valor, (int, float)):
+        return max(0, round(valor))
+    texto = _normalizar(str(valor or ""))
+    if texto.isdigit():
+        return int(texto)
+    if _RELOGIO.match(texto):
+        segundos = 0
+        for parte in texto.split(":"):
+            segundos = segundos * 60 + int(parte)
+        return segundos
+    partes = _QUANTIDADE_UNIDADE.findall(texto)
+    if not partes or _QUANTIDADE_UNIDADE.sub("", texto).strip():
+        return DESCONHECIDO # Nada reconhecido, ou sobrou texto sem sentido
+    segundos = 0.0
+    for quantidade, unidade in partes:
+        if unidade not in _SEGUNDOS_POR_UNIDADE:
+            return DESCONHECIDO
+        segundos += float(quantidade.replace(",", ".")) * _SEGUNDOS_POR_UNIDADE[unidade]
+    return round(segundos)
+
+
+def medidas(midia) -> Tuple[int, int, int]:
+    """(largura, altura, segundos) de uma mídia de qualquer um dos módulos.
+
+    As mídias interpretam `resolucao`/`duracao` uma única vez, no __init__, e
+    guardam o resultado em `largura`/`altura` (imagens) ou `segundos`
+    (vídeos); o que não se aplica ou não foi reconhecido vale 0 (desconhecido).
+    """
+    return (getattr(midia, "largura", DESCONHECIDO), getattr(midia, "altura", DESCONHECIDO),
+            getattr(midia, "segundos", DESCONHECIDO))
+
+
+def validar_medidas(largura: int, altura: int, segundos: int) -> None:
+    """Levanta ValueError se algum valor não couber nas colunas de ColunasMidias."""
+    for nome, valor in (("largura", largura), ("altura", altura), ("duração (s)", segundos)):
+        if not 0 <= valor <= VALOR_MAXIMO:
+            raise ValueError(f"{nome} fora do intervalo aceito (0 a {VALOR_MAXIMO}): {valor}")
+
+
+def linhas_resolucao(largura: int, altura: int) -> int:
+    """Lado menor da imagem: o número do "1080p" (vale também para mídias na vertical)."""
+    return min(largura, altura)
+
+
+def formatar_duracao(segundos: int) -> str:
+    horas, resto = divmod(segundos, 3600)
+    return f"{horas:02d}:{resto // 60:02d}:{resto % 60:02d}"
+
+
+def interpretar_filtro(texto: str, interpretar_valor: Callable[[str], int]) -> Tuple[Comparacao, int]:
+    """(comparação, limite) de um filtro como ">= 1080p" ou "mais de 10 min" (sem operador: >=)."""
+    normalizado = _normalizar(texto)
+    comparacao: Comparacao = operator.ge
+    for prefixo, operador in _OPERADORES:
+        if normalizado.startswith(prefixo):
+            comparacao = operador
+            normalizado = normalizado[len(prefixo):].strip()
+            break
+    limite = interpretar_valor(normalizado)
+    if limite == DESCONHECIDO and not (normalizado.isdigit() and int(normalizado) == 0): # "> 0" vale
+        raise ValueError(f"Filtro inválido: {texto!r}")
+    return comparacao, limite
+
+
+def filtro_resolucao(texto: str) -> Tuple[Comparacao, int]:
+    return interpretar_filtro(texto, lambda valor: linhas_resolucao(*interpretar_resolucao(valor)))
+
+
+def filtro_duracao(texto: str) -> Tuple[Comparacao, int]:
+    return interpretar_filtro(texto, interpretar_duracao)
+
+
+class Totais(NamedTuple):
+    quantidade: int
+    segundos: int
+    pixels: int
+
+
+class ColunasMidias:
+    """Largura, altura e duração de cada mídia em colunas `array('I')`.
+
+    Cada mídia é uma linha identificada por uma chave hashable (o id da
+    mídia, ou (id da memória, posição)). Remover troca a linha com a última,
+    então inserir e remover custam O(1) e as colunas ficam sempre contíguas.
+    """
+
+    def __init__(self):
+        self._chaves: List[Hashable] = []
+        self._linha: Dict[Hashable, int] = {}
+        self.larguras = array(TIPO_COLUNA)
+        self.alturas = array(TIPO_COLUNA)
+        self.linhas = array(TIPO_COLUNA) # Lado menor (o "1080" de 1080p)
+        self.segundos = array(TIPO_COLUNA)
+
+    def __len__(self) -> int:
+        return len(self._chaves)
+
+    def __contains__(self, chave: Hashable) -> bool:
+        return chave in self._linha
+
+    def adicionar(self, chave: Hashable, largura: int = 0, altura: int = 0, segundos: int = 0) -> None:
+        """Grava os números da mídia (se a chave já existir, a linha é sobrescrita).
+
+        Levanta ValueError, sem alterar nada, se algum valor não couber nas colunas.
+        """
+        validar_medidas(largura, altura, segundos) # Antes de mexer: as colunas nunca desalinham
+        linha = self._linha.get(chave)
+        if linha is None:
+            self._linha[chave] = len(self._chaves)
+            self._chaves.append(chave)
+            self.larguras.append(largura)
+            self.alturas.append(altura)
+            self.linhas.append(linhas_resolucao(largura, altura))
+            self.segundos.append(segundos)
+        else:
+            self.larguras[linha] = largura
+            self.alturas[linha] = altura
+            self.linhas[linha] = linhas_resolucao(largura, altura)
+            self.segundos[linha] = segundos
+
+    def remover(self, chave: Hashable) -> bool:
+        linha = self._linha.pop(chave, None)
+        if linha is None:
+            return False
+        ultima = len(self._chaves) - 1
+        if linha != ultima:
+            self._chaves[linha] = self._chaves[ultima]
+            self._linha[self._chaves[linha]] = linha
+            for coluna in (self.larguras, self.alturas, self.linhas, self.segundos):
+                coluna[linha] = coluna[ultima]
+        self._chaves.pop()
+        for coluna in (self.larguras, self.alturas, self.linhas, self.segundos):
+            coluna.pop()
+        return True
+
+    def limpar(self) -> None:
+        self._chaves.clear()
+        self._linha.clear()
+        for coluna in (self.larguras, self.alturas, self.linhas, self.segundos):
+            del coluna[:]
+
+    @staticmethod
+    def _comparar(coluna: array, comparacao: Comparacao, limite: int) -> bytes:
+        """Máscara (um byte 0/1 por linha) de `coluna comparacao limite`, ignorando desconhecidos."""
+        mascara = map(comparacao, coluna, repeat(limite))
+        if comparacao(DESCONHECIDO, limite): # Ex.: "< 10 min" aceitaria os desconhecidos (0)
+            mascara = map(operator.and_, mascara, map(operator.truth, coluna))
+        return bytes(mascara)
+
+    def mascara(self, resolucao: Optional[str] = None, duracao: Optional[str] = None) -> Optional[bytes]:
+        """Linhas que passam nos filtros (None = sem filtro, todas). Levanta ValueError se um filtro for inválido."""
+        mascaras = []
+        if resolucao:
+            mascaras.append(self._comparar(self.linhas, *filtro_resolucao(resolucao)))
+        if duracao:
+            mascaras.append(self._comparar(self.segundos, *filtro_duracao(duracao)))
+        if not mascaras:
+            return None
+        if len(mascaras) == 1:
+            return mascaras[0]
+        return bytes(map(operator.and_, *mascaras))
+
+    def filtrar(self, resolucao: Optional[str] = None, duracao: Optional[str] = None) -> List[Hashable]:
+        """Chaves das mídias que passam nos filtros, ex.: filtrar(resolucao=">= 1080p", duracao="> 10min")."""
+        mascara = self.mascara(resolucao, duracao)
+        return list(self._chaves) if mascara is None else list(compress(self._chaves, mascara))
+
+    def totais(self, resolucao: Optional[str] = None, duracao: Optional[str] = None) -> Totais:
+        """Quantidade, duração somada e pixels somados das mídias que passam nos filtros."""
+        mascara = self.mascara(resolucao, duracao)
+        if mascara is None:
+            larguras, alturas, segundos = self.larguras, self.alturas, self.segundos
+            quantidade = len(self._chaves)
+        else:
+            larguras, alturas, segundos = (compress(coluna, mascara)
+                                           for coluna in (self.larguras, self.alturas, self.segundos))
+            quantidade = mascara.count(1)
+        return Totais(quantidade, sum(segundos), sum(map(operator.mul, larguras, alturas)))
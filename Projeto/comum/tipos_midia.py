@@ -0,0 +1,28 @@
+"""Nomes de tipo de mídia aceitos nas buscas e filtros por tipo.
+
+Cada módulo nomeia seus tipos do seu jeito (a classe "Video" no versaoFinal,
+o `tipo()` "Vídeo" no app da Strategy); `resolver_tipo` leva o que o usuário
+digitou ("video", "VÍDEOS", "fotos"...) ao nome usado ali, sem diferenciar
+maiúsculas nem acentos.
+"""
+from typing import Dict, Iterable, Optional
+
+from comum.busca_textual import remover_acentos
+
+# Nomes aceitos (minúsculos, sem acento) -> tipo canônico, comparado do mesmo jeito
+ALIASES_TIPO: Dict[str, str] = {
+    "video": "video", "videos": "video",
+    "imagem": "imagem", "imagens": "imagem", "image": "imagem", "images": "imagem",
+    "foto": "imagem", "fotos": "imagem",
+}
+
+
+def _normalizar(nome: str) -> str:
+    return remover_acentos(nome.strip().lower())
+
+
+def resolver_tipo(criterio: str, tipos_conhecidos: Iterable[str]) -> Optional[str]:
+    """O nome em `tipos_conhecidos` que o critério designa, ou None."""
+    chave = _normalizar(criterio)
+    chave = ALIASES_TIPO.get(chave, chave) # Tipos sem alias (ex.: subclasses novas) valem pelo nome
+    return next((tipo for tipo in tipos_conhecidos if _normalizar(tipo) == chave), None)
@@ -0,0 +1,54 @@
+"""Ponto de entrada dos exemplos que importam o pacote `comum`.
+
+Cada exemplo que importa `comum` acrescenta Projeto/ ao sys.path ao ser
+carregado, então também roda direto da pasta dele (`python app.py`). Este
+script roda o exemplo escolhido com o PYTHONPATH já ajustado, para que o
+processo filho e os que ele criar (reloader do Flask, workers do
+ProcessPoolExecutor) já comecem enxergando `comum`:
+
+    python Projeto/executar.py strategy            # Flask, porta 5002
+    python Projeto/executar.py composite
+    python Projeto/executar.py benchmark-memoria 10000
+    python Projeto/executar.py GOFsEstruturais/Facade/FacadeFinal.py   # Qualquer outro arquivo
+
+Equivale a `PYTHONPATH=Projeto python Projeto/<caminho do exemplo>`.
+"""
+import os
+import subprocess
+import sys
+from typing import Optional
+
+PROJETO = os.path.dirname(os.path.abspath(__file__))
+
+EXEMPLOS = {
+    "strategy": "GOFsComportamentais/Strategy/app.py",
+    "strategy-final": "GOFsComportamentais/Strategy/versaoFinal.py",
+    "composite": "GOFsEstruturais/Composite/app.py",
+    "factory-method": "GOFsCriacionais/FactoryMethod/app.py",
+    "builder": "GOFsCriacionais/Builder/BuilderFinal.py",
+    "benchmark-memoria": "comum/benchmark_memoria.py",
+}
+
+
+def caminho_exemplo(nome: str) -> Optional[str]:
+    """Arquivo do exemplo: um nome de EXEMPLOS ou um caminho (relativo à pasta atual ou a Projeto/)."""
+    if nome in EXEMPLOS:
+        return os.path.join(PROJETO, EXEMPLOS[nome])
+    for caminho in (os.path.abspath(nome), os.path.join(PROJETO, nome)):
+        if os.path.isfile(caminho):
+            return caminho
+    return None
+
+
+def executar(caminho: str, argumentos: list) -> int:
+    ambiente = dict(os.environ)
+    ambiente["PYTHONPATH"] = os.pathsep.join(filter(None, (PROJETO, ambiente.get("PYTHONPATH"))))
+    return subprocess.call([sys.executable, caminho] + argumentos, env=ambiente)
+
+
+if __name__ == "__main__":
+    caminho = caminho_exemplo(sys.argv[1]) if len(sys.argv) > 1 else None
+    if caminho is None:
+        print(f"Uso: python {sys.argv[0]} {{{','.join(EXEMPLOS)}}} | <arquivo.py> [argumentos]")
+        sys.exit(2)
+    sys.exit(executar(caminho, sys.argv[2:]))